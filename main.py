@@ -16,6 +16,7 @@ from src.config.config import (
     handle_uncaught_exception, asyncio_exception_handler
 )
 from src.database.db_manager import Database
+from src.database.async_db import AsyncDatabase
 from src.core.process_manager import ProcessManager
 from src.handlers.bot_handlers import BotHandlers, WAIT_FILE_UPLOAD, WAIT_MANUAL_TOKEN, WAIT_FEEDBACK, WAIT_GITHUB_URL, WAIT_DEPLOY_CONFIRM
 
@@ -26,7 +27,7 @@ def main():
     if not os.path.exists(BOTS_DIR): os.makedirs(BOTS_DIR)
     
     # Initialize components
-    db = Database(DB_FILE)
+    db = AsyncDatabase(Database(DB_FILE))
     pm = ProcessManager(db)
     handlers = BotHandlers(db, pm)
     
@@ -51,7 +52,7 @@ def main():
     gh_conv = ConversationHandler(
         entry_points=[CallbackQueryHandler(handlers.deploy_github_start, pattern="^deploy_github$")],
         states={
-            WAIT_GITHUB_URL: [MessageHandler(filters.TEXT & ~filters.COMMAND, handlers.handle_github_url)],
+            WAIT_GITHUB_URL: [MessageHandler(filters.TEXT & ~filters.COMMAND, handlers.handle_github_url, block=False)],
             WAIT_DEPLOY_CONFIRM: [CallbackQueryHandler(handlers.handle_gh_confirm, pattern="^gh_confirm$"), CallbackQueryHandler(handlers.handle_gh_cancel, pattern="^gh_cancel$")]
         },
         fallbacks=[CommandHandler("cancel", lambda u, c: ConversationHandler.END)]
@@ -61,9 +62,16 @@ def main():
     app.add_handler(CommandHandler("start", handlers.start))
     
     async def post_init(application):
+        await pm.reconcile(application)
         await pm.start_background_tasks(application)
     
+    async def post_shutdown(application):
+        if pm.output is not None:
+            await pm.output.flush()
+        await db.close()
+
     app.post_init = post_init
+    app.post_shutdown = post_shutdown
     app.add_handler(add_bot_conv)
     app.add_handler(feedback_conv)
     app.add_handler(gh_conv)
@@ -76,9 +84,12 @@ def main():
     app.add_handler(CallbackQueryHandler(handlers.confirm_delete, pattern="^confirm_del_"))
     app.add_handler(CallbackQueryHandler(handlers.delete_bot_action, pattern="^del_"))
     app.add_handler(CallbackQueryHandler(handlers.view_logs, pattern="^logs_"))
+    app.add_handler(CallbackQueryHandler(handlers.live_output, pattern="^output_"))
     app.add_handler(CallbackQueryHandler(handlers.sys_status, pattern="^sys_status$"))
     app.add_handler(CallbackQueryHandler(handlers.bot_details, pattern="^bot_details$"))
     app.add_handler(CallbackQueryHandler(handlers.admin_panel, pattern="^admin_panel$"))
+    app.add_handler(CallbackQueryHandler(handlers.bulk_panel, pattern="^bulk_panel$"))
+    app.add_handler(CallbackQueryHandler(handlers.bulk_action, pattern="^bulk_"))
     app.add_handler(CallbackQueryHandler(handlers.list_pending_users, pattern="^pending_users$"))
     app.add_handler(CallbackQueryHandler(handlers.handle_approval, pattern="^(approve|reject)_"))
     app.add_handler(CallbackQueryHandler(handlers.list_files, pattern="^files_"))
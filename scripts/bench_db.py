@@ -0,0 +1,66 @@
+"""Database ops/second before and after the pooled WAL connection layer.
+
+The "before" side is src/database/db_manager.py as it was right before the
+pooling commit, loaded from git history, so the comparison needs a git
+checkout. The "after" side is the current tree, so later changes such as
+the bot cache also show up in its numbers. Run from the repository root:
+
+    python scripts/bench_db.py [--bots 50] [--ops 3000] [--dir /dev/shm]
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import subprocess
+import importlib.util
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+def baseline_module():
+    """db_manager.py from the parent of the [user-001] commit, imported under another name."""
+    rev = subprocess.run(["git", "log", "--format=%H", "--grep=^\\[user-001\\]", "-n", "1"],
+                         cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    if not rev:
+        sys.exit("baseline commit not found in git history")
+    source = subprocess.run(["git", "show", f"{rev}^:src/database/db_manager.py"],
+                            cwd=ROOT, capture_output=True, text=True, check=True).stdout
+    spec = importlib.util.spec_from_loader("baseline_db_manager", loader=None)
+    module = importlib.util.module_from_spec(spec)
+    exec(compile(source, "baseline_db_manager.py", "exec"), module.__dict__)
+    return module
+
+def run(label, module, folder, bots, ops):
+    db = module.Database(os.path.join(folder, f"{label}.db"))
+    db.add_user(5, "u")
+    ids = [db.add_bot(5, "t", f"b{i}", f"f{i}") for i in range(bots)]
+    results = []
+    for name, op in (
+        ("get_bot", lambda i: db.get_bot(ids[i % bots])),
+        ("update_bot_status", lambda i: db.update_bot_status(ids[i % bots], "running", 100 + i)),
+        ("update_bot_resources", lambda i: db.update_bot_resources(ids[i % bots], remaining_seconds=i, power_remaining=50.0,
+                                                                   last_checked="2026-01-01T00:00:00")),
+    ):
+        start = time.perf_counter()
+        for i in range(ops):
+            op(i)
+        results.append(f"{name} {ops / (time.perf_counter() - start):,.0f}/s")
+    if hasattr(db, "close"):
+        db.close()
+    print(f"{label:>6}: " + "  ".join(results))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--bots", type=int, default=50)
+    parser.add_argument("--ops", type=int, default=3000)
+    parser.add_argument("--dir", default=None, help="where to put the database files (default: a temp dir)")
+    args = parser.parse_args()
+
+    from src.database import db_manager
+    folder = tempfile.mkdtemp(dir=args.dir)
+    run("before", baseline_module(), folder, args.bots, args.ops)
+    run("after", db_manager, folder, args.bots, args.ops)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Stderr classification cost on a multi-megabyte synthetic log: old line filter vs ErrorStream.
+
+The log mixes httpx INFO lines (85%), ERROR logging lines (12%) and
+five-frame tracebacks (3%), and is fed in tailer-sized batches. The old
+filter is the per-line substring check that ran in the error consumer
+before tracebacks were grouped; it produced one error_logs row and one
+alert per batch with anything kept. Run from the repository root:
+
+    python scripts/bench_error_classifier.py [--mb 8] [--batch 200]
+"""
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.error_classifier import ErrorStream
+
+TRACEBACK = """Traceback (most recent call last):
+  File "/srv/bots/b/main.py", line {n}, in handler
+    await api.call(x)
+  File "/usr/lib/python3/site-packages/telegram/_bot.py", line 512, in call
+    raise NetworkError(msg)
+telegram.error.NetworkError: httpx.ReadError at 0x{a:x}""".split("\n")
+
+def synthetic_log(size):
+    rnd = random.Random(1)
+    lines, total = [], 0
+    while total < size:
+        r = rnd.random()
+        if r < 0.85:
+            new = [f'2024-05-01 12:00:{rnd.randint(0, 59):02d},123 - httpx - INFO - HTTP Request: POST '
+                   f'https://api.telegram.org/bot123/getUpdates "HTTP/1.1 200 OK"']
+        elif r < 0.97:
+            new = [f"2024-05-01 12:00:00,123 - root - ERROR - handler failed for user {rnd.randint(1, 10**9)}"]
+        else:
+            new = [line.format(n=rnd.randint(1, 999), a=rnd.getrandbits(40)) for line in TRACEBACK]
+        lines.extend(new)
+        total += sum(len(line) + 1 for line in new)
+    return lines, total
+
+def old_filter(batches):
+    kept, reports = 0, 0
+    for lines in batches:
+        errors = []
+        for line in lines:
+            upper = line.upper()
+            if any(x in upper for x in ["ERROR", "CRITICAL", "TRACEBACK", "EXCEPTION"]):
+                errors.append(line)
+            elif not any(x in upper for x in ["INFO", "DEBUG", "HTTP REQUEST"]):
+                errors.append(line)
+        kept += len(errors)
+        reports += bool("\n".join(errors).strip())
+    return f"{kept:,} lines kept, {reports} mixed DB rows and alerts"
+
+def error_stream(batches):
+    stream = ErrorStream(1)
+    events = []
+    for lines in batches:
+        events += stream.feed(lines)
+    events += stream.flush()
+    fingerprints = {e.fingerprint for e in events}
+    return f"{len(events):,} events -> {len(fingerprints)} error_logs rows, {len(fingerprints)} alerts within the cooldown"
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mb", type=float, default=8.0)
+    parser.add_argument("--batch", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    lines, size = synthetic_log(int(args.mb * 1e6))
+    batches = [lines[i:i + args.batch] for i in range(0, len(lines), args.batch)]
+    print(f"{size / 1e6:.1f} MB, {len(lines):,} lines, {len(batches):,} batches")
+    for name, run in (("old filter", old_filter), ("ErrorStream", error_stream)):
+        best = None
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            summary = run(batches)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        print(f"{name:>11}: {best * 1000:.0f} ms ({len(lines) / best / 1e6:.2f} M lines/s), {summary}")
+
+if __name__ == "__main__":
+    main()
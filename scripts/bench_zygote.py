@@ -0,0 +1,116 @@
+"""Time from launch to a hosted bot's first getUpdates: cold Popen vs the zygote fork server.
+
+A local fake Bot API records when each getUpdates arrives; the bot is a
+minimal python-telegram-bot polling app pointed at it. Needs
+python-telegram-bot and a POSIX host. Run from the repository root:
+
+    python scripts/bench_zygote.py [--runs 8]
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import tempfile
+import threading
+import statistics
+import subprocess
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.zygote import ZygoteClient
+
+BOT_SOURCE = """import os
+from telegram.ext import Application
+app = Application.builder().token(os.environ['BOT_TOKEN']).base_url(os.environ['TG_BASE']).build()
+app.run_polling()
+"""
+
+class FakeBotAPI(BaseHTTPRequestHandler):
+    hits = []  # arrival times of getUpdates
+
+    def log_message(self, *args): pass
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        method = self.path.rsplit('/', 1)[-1]
+        if method == 'getMe':
+            result = {"id": 1, "is_bot": True, "first_name": "b", "username": "b"}
+        elif method == 'getUpdates':
+            self.hits.append(time.time())
+            time.sleep(0.5)
+            result = []
+        else:
+            result = True
+        body = json.dumps({"ok": True, "result": result}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        try:
+            self.end_headers()
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # the bot was terminated mid long-poll
+
+    do_GET = do_POST
+
+async def first_hit_after(t0, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        hit = next((t for t in FakeBotAPI.hits if t > t0), None)
+        if hit is not None:
+            return hit - t0
+        await asyncio.sleep(0.005)
+    raise TimeoutError("the bot never called getUpdates")
+
+def summary(values):
+    return (f"median {statistics.median(values) * 1000:.0f} ms "
+            f"(min {min(values) * 1000:.0f}, max {max(values) * 1000:.0f})")
+
+async def main(runs):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FakeBotAPI)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    work = tempfile.mkdtemp()
+    bot_dir = os.path.join(work, 'bot')
+    os.makedirs(bot_dir)
+    main_file = os.path.join(bot_dir, 'main.py')
+    with open(main_file, 'w') as f:
+        f.write(BOT_SOURCE)
+    out, err = os.path.join(work, 'stdout.log'), os.path.join(work, 'stderr.log')
+    env = dict(os.environ, BOT_TOKEN='1:x', TG_BASE=f'http://127.0.0.1:{server.server_address[1]}/bot')
+
+    cold, warm = [], []
+    try:
+        for _ in range(runs):
+            t0 = time.time()
+            with open(out, 'a') as o, open(err, 'a') as e:
+                p = subprocess.Popen([sys.executable, main_file], cwd=bot_dir, env=env, stdout=o, stderr=e, start_new_session=True)
+            cold.append(await first_hit_after(t0))
+            p.terminate()
+            p.wait()
+
+        zygote = ZygoteClient(['telegram', 'telegram.ext', 'httpx'])
+        t0 = time.time()
+        await zygote.start()
+        warm_up = time.time() - t0
+        for _ in range(runs):
+            t0 = time.time()
+            child = await zygote.spawn([main_file], bot_dir, env, out, err)
+            exited = asyncio.Event()
+            child.notify_exit(exited.set)
+            warm.append(await first_hit_after(t0))
+            child.terminate()
+            await asyncio.wait_for(exited.wait(), 10)
+        zygote.close()
+    finally:
+        server.shutdown()
+
+    print(f"Popen : {summary(cold)}")
+    print(f"zygote: {summary(warm)}, one-off warm-up {warm_up * 1000:.0f} ms (preloaded {', '.join(zygote.preloaded)})")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=8)
+    asyncio.run(main(parser.parse_args().runs))
@@ -14,6 +14,90 @@ DB_FILE = "neurohost_v3_5.db"
 BOTS_DIR = "bots"
 ERROR_LOG_FILE = os.getenv("NEUROHOST_ERROR_LOG", "neurohost_errors.log")
 
+# SQLite connection pool / pragmas
+DB_POOL_SIZE = int(os.getenv("NEUROHOST_DB_POOL_SIZE", "4"))
+DB_CACHE_SIZE_KB = int(os.getenv("NEUROHOST_DB_CACHE_KB", "16384"))
+DB_MMAP_SIZE = int(os.getenv("NEUROHOST_DB_MMAP_BYTES", str(128 * 1024 * 1024)))
+DB_STATEMENT_CACHE = 256
+# Reader threads of the async facade; one pooled connection is left for the writer thread
+DB_READ_WORKERS = int(os.getenv("NEUROHOST_DB_READ_WORKERS", str(max(1, DB_POOL_SIZE - 1))))
+# Seconds between flushes of buffered enforcement-loop writes
+DB_FLUSH_INTERVAL = float(os.getenv("NEUROHOST_DB_FLUSH_INTERVAL", "10"))
+# Max bot records held in the in-memory bot state cache (LRU)
+BOT_CACHE_SIZE = int(os.getenv("NEUROHOST_BOT_CACHE_SIZE", "4096"))
+
+# Seconds between background host CPU/memory samples for the status screen
+HOST_STATS_INTERVAL = float(os.getenv("NEUROHOST_HOST_STATS_INTERVAL", "5"))
+# Seconds between batched per-bot CPU/memory samples
+BOT_STATS_INTERVAL = float(os.getenv("NEUROHOST_BOT_STATS_INTERVAL", "5"))
+
+# error_logs retention, enforced incrementally in the background
+ERROR_LOG_MAX_ROWS_PER_BOT = int(os.getenv("NEUROHOST_ERROR_LOG_MAX_ROWS", "200"))
+ERROR_LOG_MAX_AGE_DAYS = int(os.getenv("NEUROHOST_ERROR_LOG_MAX_AGE_DAYS", "14"))
+ERROR_LOG_PRUNE_BATCH = int(os.getenv("NEUROHOST_ERROR_LOG_PRUNE_BATCH", "100"))
+ERROR_LOG_PRUNE_INTERVAL = float(os.getenv("NEUROHOST_ERROR_LOG_PRUNE_INTERVAL", "60"))
+
+# Exit polling interval, only used where pidfd_open is unavailable
+SUPERVISOR_POLL_INTERVAL = float(os.getenv("NEUROHOST_SUPERVISOR_POLL_INTERVAL", "1"))
+
+# Hosted-bot log tailing; polling is only used where inotify is unavailable
+LOG_TAIL_POLL_INTERVAL = float(os.getenv("NEUROHOST_LOG_TAIL_POLL_INTERVAL", "2"))
+LOG_TAIL_MAX_READ = int(os.getenv("NEUROHOST_LOG_TAIL_MAX_READ", str(256 * 1024)))
+# Seconds a finished traceback waits for a chained exception before it is reported
+ERROR_TRACEBACK_SETTLE = float(os.getenv("NEUROHOST_ERROR_TRACEBACK_SETTLE", "3"))
+# Seconds before the same error (by fingerprint) alerts the bot owner again
+ERROR_ALERT_COOLDOWN = float(os.getenv("NEUROHOST_ERROR_ALERT_COOLDOWN", "300"))
+
+# Shared virtualenvs for hosted-bot requirements, one per distinct requirements.txt
+VENV_DIR = os.getenv("NEUROHOST_VENV_DIR", "envs")
+PIP_CACHE_DIR = os.getenv("NEUROHOST_PIP_CACHE_DIR", os.path.join(VENV_DIR, ".pip-cache"))
+VENV_BUILD_CONCURRENCY = int(os.getenv("NEUROHOST_VENV_BUILD_CONCURRENCY", "2"))
+VENV_BUILD_TIMEOUT = float(os.getenv("NEUROHOST_VENV_BUILD_TIMEOUT", "900"))
+
+# Hosted-bot stdout/stderr logs: copy-truncated into (gzipped) segments at BOT_LOG_MAX_BYTES,
+# BOT_LOG_BACKUPS segments per stream, oldest dropped while a bot's logs exceed BOT_LOG_DISK_CAP
+BOT_LOG_MAX_BYTES = int(os.getenv("NEUROHOST_BOT_LOG_MAX_BYTES", str(5 * 1024 * 1024)))
+BOT_LOG_BACKUPS = int(os.getenv("NEUROHOST_BOT_LOG_BACKUPS", "3"))
+BOT_LOG_COMPRESS = os.getenv("NEUROHOST_BOT_LOG_COMPRESS", "1") == "1"
+BOT_LOG_DISK_CAP = int(os.getenv("NEUROHOST_BOT_LOG_DISK_CAP", str(32 * 1024 * 1024)))
+BOT_LOG_CHECK_INTERVAL = float(os.getenv("NEUROHOST_BOT_LOG_CHECK_INTERVAL", "30"))
+
+# Optional pipe capture of hosted-bot output: the last OUTPUT_RING_BYTES per bot stay in
+# memory for the live output view; files are appended in batches every OUTPUT_FLUSH_INTERVAL
+# seconds or OUTPUT_FLUSH_BYTES. If NeuroHost restarts, captured bots lose the read end of
+# their pipes and their next write fails, so they usually exit and are restarted.
+OUTPUT_CAPTURE = os.getenv("NEUROHOST_OUTPUT_CAPTURE", "0") == "1"
+OUTPUT_RING_BYTES = int(os.getenv("NEUROHOST_OUTPUT_RING_BYTES", str(64 * 1024)))
+OUTPUT_FLUSH_INTERVAL = float(os.getenv("NEUROHOST_OUTPUT_FLUSH_INTERVAL", "1"))
+OUTPUT_FLUSH_BYTES = int(os.getenv("NEUROHOST_OUTPUT_FLUSH_BYTES", str(256 * 1024)))
+OUTPUT_PENDING_MAX = int(os.getenv("NEUROHOST_OUTPUT_PENDING_MAX", str(4 * 1024 * 1024)))
+
+# Seconds a stopping bot gets between SIGTERM and SIGKILL
+BOT_STOP_TIMEOUT = float(os.getenv("NEUROHOST_BOT_STOP_TIMEOUT", "10"))
+
+# Bulk start/stop/restart (admin panel, boot restarts): BULK_RAMP_START operations at
+# once, doubling every BULK_RAMP_INTERVAL seconds up to BULK_CONCURRENCY; the ramp
+# holds while host CPU is above BULK_RAMP_MAX_HOST_CPU percent
+BULK_CONCURRENCY = int(os.getenv("NEUROHOST_BULK_CONCURRENCY", "8"))
+BULK_RAMP_START = int(os.getenv("NEUROHOST_BULK_RAMP_START", "2"))
+BULK_RAMP_INTERVAL = float(os.getenv("NEUROHOST_BULK_RAMP_INTERVAL", "2"))
+BULK_RAMP_MAX_HOST_CPU = float(os.getenv("NEUROHOST_BULK_RAMP_MAX_HOST_CPU", "85"))
+
+# Optional warm fork server for bots on the host interpreter; preloads these modules once
+ZYGOTE_ENABLED = os.getenv("NEUROHOST_ZYGOTE", "0") == "1"
+ZYGOTE_PRELOAD = [m for m in os.getenv("NEUROHOST_ZYGOTE_PRELOAD", "telegram,telegram.ext,httpx").split(",") if m]
+ZYGOTE_START_TIMEOUT = float(os.getenv("NEUROHOST_ZYGOTE_START_TIMEOUT", "60"))
+
+# Optional cgroup v2 isolation of hosted bots (needs root or a delegated subtree)
+CGROUPS_ENABLED = os.getenv("NEUROHOST_CGROUPS", "0") == "1"
+CGROUP_ROOT = os.getenv("NEUROHOST_CGROUP_ROOT", "/sys/fs/cgroup/neurohost")
+# Per-plan limits: cpu in CPUs (cpu.max), memory in MB (memory.max), pids (pids.max)
+BOT_RESOURCE_LIMITS = {
+    'free': {'cpu': 0.25, 'memory_mb': 256, 'pids': 64},
+    'pro': {'cpu': 1.0, 'memory_mb': 1024, 'pids': 256},
+    'ultra': {'cpu': 2.0, 'memory_mb': 4096, 'pids': 1024},
+}
+
 # Logging setup
 logging.basicConfig(
     format="%(asctime)s - %(name)s - %(levelname)s - %(message)s", level=logging.INFO
@@ -0,0 +1,87 @@
+import time
+import asyncio
+import logging
+from collections import deque
+
+from src.config.config import BULK_CONCURRENCY, BULK_RAMP_START, BULK_RAMP_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+class BulkJob:
+    """Progress of one bulk start/stop/restart; read by the admin panel while it runs."""
+
+    def __init__(self, action, bot_ids):
+        self.action = action
+        self.bot_ids = list(bot_ids)
+        self.total = len(self.bot_ids)
+        self.done = 0
+        self.succeeded = 0
+        self.failed = []  # (bot_id, message)
+        self.concurrency = 0
+        self.started_at = time.time()
+        self.finished_at = None
+        self.cancelled = False
+        self.task = None
+
+    @property
+    def running(self):
+        return self.finished_at is None
+
+    @property
+    def percent(self):
+        return 100.0 * self.done / self.total if self.total else 100.0
+
+    def cancel(self):
+        # Operations already in flight finish; nothing new is picked up
+        self.cancelled = True
+
+    def _record(self, bot_id, ok, msg):
+        self.done += 1
+        if ok:
+            self.succeeded += 1
+        else:
+            self.failed.append((bot_id, msg))
+
+async def run_bulk(job, operation, concurrency=BULK_CONCURRENCY, ramp_start=BULK_RAMP_START,
+                   ramp_interval=BULK_RAMP_INTERVAL, may_ramp=None):
+    """Run `await operation(bot_id)` for every bot of `job` through a ramping worker pool.
+
+    `ramp_start` workers begin at once and the pool doubles every
+    `ramp_interval` seconds up to `concurrency`, unless `may_ramp()` says the
+    host is too busy. `operation` returns `(ok, message)` or a bare truth value.
+    """
+    queue = deque(job.bot_ids)
+
+    async def worker():
+        while queue and not job.cancelled:
+            bot_id = queue.popleft()
+            try:
+                result = await operation(bot_id)
+                ok, msg = result if isinstance(result, tuple) else (bool(result), "")
+            except Exception as e:
+                logger.warning("Bulk %s of bot %s failed: %s", job.action, bot_id, e)
+                ok, msg = False, str(e)
+            job._record(bot_id, ok, msg)
+
+    concurrency = max(1, concurrency)
+    limit = max(1, min(ramp_start, concurrency))
+    workers = []
+    try:
+        while True:
+            while len(workers) < min(limit, job.total):
+                workers.append(asyncio.get_running_loop().create_task(worker()))
+            job.concurrency = len(workers)
+            if not queue or job.cancelled or limit >= concurrency:
+                break
+            await asyncio.sleep(ramp_interval)
+            if may_ramp is None or may_ramp():
+                limit = min(concurrency, limit * 2)
+        await asyncio.gather(*workers)
+    except asyncio.CancelledError:
+        for w in workers:
+            w.cancel()
+        raise
+    finally:
+        job.concurrency = 0
+        job.finished_at = time.time()
+    return job
@@ -0,0 +1,164 @@
+import os
+import logging
+try:
+    import resource
+except ImportError:
+    resource = None
+
+from src.config.config import CGROUPS_ENABLED, CGROUP_ROOT, BOT_RESOURCE_LIMITS
+
+logger = logging.getLogger(__name__)
+
+_CGROUP_MOUNT = '/sys/fs/cgroup'
+_CONTROLLERS = ('cpu', 'memory', 'pids')
+# Leaf that NeuroHost moves into when it sits in a group whose controllers it must delegate
+_SUPERVISOR_LEAF = 'supervisor'
+_CPU_PERIOD_US = 100000
+# RLIMIT_AS caps address space, not resident memory; interpreters and thread
+# stacks reserve far more than they touch, so the fallback allows headroom.
+_AS_HEADROOM = 4
+
+def _write(path, value):
+    with open(path, 'w') as f:
+        f.write(value)
+
+def read_cpu_seconds(path):
+    """usage_usec from a cgroup's cpu.stat, in seconds; None if unreadable."""
+    try:
+        with open(os.path.join(path, 'cpu.stat')) as f:
+            for line in f:
+                if line.startswith('usage_usec '):
+                    return int(line.split()[1]) / 1e6
+    except (OSError, ValueError):
+        pass
+    return None
+
+def read_memory_bytes(path):
+    try:
+        with open(os.path.join(path, 'memory.current')) as f:
+            return int(f.read())
+    except (OSError, ValueError):
+        return None
+
+class CgroupManager:
+    """Optional per-bot cgroup v2 isolation with limits taken from the owner's plan.
+
+    Each bot gets `<CGROUP_ROOT>/bot-<id>` with cpu.max, memory.max and
+    pids.max set from BOT_RESOURCE_LIMITS; the child joins it from its
+    preexec_fn, before the bot's code runs. If the mode is enabled but the
+    hierarchy is not cgroup v2 or not writable (no root / no delegation), bots
+    get an RLIMIT_AS cap instead. With the mode off nothing changes.
+
+    In a delegated subtree (e.g. a systemd unit with `Delegate=yes`) the
+    parent of CGROUP_ROOT is usually the service's own cgroup, which holds
+    NeuroHost. cgroup v2 does not let a group with member processes hand
+    controllers to its children, so those processes are first moved into a
+    `supervisor` leaf next to CGROUP_ROOT.
+    """
+
+    def __init__(self, root=CGROUP_ROOT, enabled=CGROUPS_ENABLED, limits=BOT_RESOURCE_LIMITS):
+        self.root = root
+        self.limits = limits
+        self.requested = enabled and os.name != 'nt'
+        self.enabled = self.requested and self._setup()
+
+    def _setup(self):
+        if not os.path.exists(os.path.join(_CGROUP_MOUNT, 'cgroup.controllers')):
+            logger.warning("cgroup v2 is not mounted; limiting hosted bots with setrlimit instead")
+            return False
+        try:
+            os.makedirs(self.root, exist_ok=True)
+            for path in (os.path.dirname(self.root), self.root):
+                with open(os.path.join(path, 'cgroup.controllers')) as f:
+                    available = set(f.read().split())
+                missing = [c for c in _CONTROLLERS if c not in available]
+                if missing:
+                    raise OSError(f"controllers {missing} not available in {path}")
+                # Delegate the controllers down to the per-bot groups
+                self._evacuate(path)
+                _write(os.path.join(path, 'cgroup.subtree_control'), ' '.join('+' + c for c in _CONTROLLERS))
+            return True
+        except OSError as e:
+            logger.warning("Cannot use cgroup root %s (%s); limiting hosted bots with setrlimit instead", self.root, e)
+            return False
+
+    @staticmethod
+    def _evacuate(path):
+        """Move the processes of `path` into a leaf below it (the root group is exempt from the rule)."""
+        if os.path.realpath(path) == os.path.realpath(_CGROUP_MOUNT): return
+        with open(os.path.join(path, 'cgroup.procs')) as f:
+            pids = f.read().split()
+        if not pids: return
+        leaf = os.path.join(path, _SUPERVISOR_LEAF)
+        os.makedirs(leaf, exist_ok=True)
+        for pid in pids:
+            try:
+                _write(os.path.join(leaf, 'cgroup.procs'), pid)
+            except ProcessLookupError:
+                pass  # exited in the meantime
+        logger.info("Moved %d process(es) from %s into %s to delegate its controllers", len(pids), path, leaf)
+
+    def limits_for(self, plan):
+        return self.limits.get(plan) or self.limits['free']
+
+    def path_for(self, bot_id):
+        return os.path.join(self.root, f"bot-{int(bot_id)}")
+
+    def prepare(self, bot_id, plan):
+        """Create/refresh the bot's cgroup and apply its plan limits; None if cgroups are off or failed."""
+        if not self.enabled: return None
+        limits = self.limits_for(plan)
+        path = self.path_for(bot_id)
+        try:
+            os.makedirs(path, exist_ok=True)
+            _write(os.path.join(path, 'cpu.max'), f"{int(limits['cpu'] * _CPU_PERIOD_US)} {_CPU_PERIOD_US}")
+            _write(os.path.join(path, 'memory.max'), str(int(limits['memory_mb']) * 1024 * 1024))
+            _write(os.path.join(path, 'pids.max'), str(int(limits['pids'])))
+            return path
+        except OSError as e:
+            logger.warning("Failed to prepare cgroup for bot %s: %s", bot_id, e)
+            return None
+
+    def child_limits(self, cgroup, plan):
+        """(cgroup.procs path to join, RLIMIT_AS fallback) for a child about to exec."""
+        procs_file = os.path.join(cgroup, 'cgroup.procs') if cgroup else None
+        mem_limit = None
+        if self.requested and resource is not None:
+            mem_limit = int(self.limits_for(plan)['memory_mb']) * 1024 * 1024 * _AS_HEADROOM
+        return procs_file, mem_limit
+
+    def preexec_fn(self, cgroup, plan):
+        """preexec_fn for Popen: new session, then join `cgroup` (or apply the rlimit fallback)."""
+        procs_file, mem_limit = self.child_limits(cgroup, plan)
+
+        def setup():
+            os.setsid()
+            if procs_file:
+                try:
+                    fd = os.open(procs_file, os.O_WRONLY)
+                    try:
+                        os.write(fd, b"0")
+                    finally:
+                        os.close(fd)
+                    return
+                except OSError:
+                    pass
+            # RLIMIT_NPROC is per-user rather than per-bot, so there is no pids fallback
+            if mem_limit:
+                resource.setrlimit(resource.RLIMIT_AS, (mem_limit, mem_limit))
+        return setup
+
+    def contains(self, cgroup, pid):
+        try:
+            with open(os.path.join(cgroup, 'cgroup.procs')) as f:
+                return str(pid) in f.read().split()
+        except OSError:
+            return False
+
+    def remove(self, bot_id):
+        """Drop the bot's cgroup once it is empty; a still-populated one is reused next start."""
+        if not self.enabled: return
+        try:
+            os.rmdir(self.path_for(bot_id))
+        except OSError:
+            pass
@@ -0,0 +1,96 @@
+import os
+import threading
+import logging
+
+from src.core.cgroups import read_cpu_seconds
+
+logger = logging.getLogger(__name__)
+
+class CpuAccountant:
+    """Exact CPU-seconds used by each hosted bot, read from /proc in one pass.
+
+    Bots lead their own session (`setsid`), so a bot's process tree is every
+    process whose session id is the bot's pid. A pass reads `/proc/<pid>/stat`
+    once per host process and sums utime+stime+cutime+cstime per tracked
+    session; the child terms keep the total continuous when a process in the
+    tree exits and is reaped by its parent. `collect()` returns the CPU-seconds
+    used since the previous pass for each bot. Bots confined to their own
+    cgroup are read from its cpu.stat instead.
+    """
+
+    def __init__(self, proc_root='/proc'):
+        self.proc_root = proc_root
+        self.available = os.path.exists(os.path.join(proc_root, 'self', 'stat'))
+        try:
+            self._ticks = os.sysconf('SC_CLK_TCK')
+        except (ValueError, OSError, AttributeError):
+            self._ticks = 100
+        self._sessions = {}  # bot_id -> session id
+        self._cgroups = {}  # bot_id -> cgroup path
+        self._last = {}  # bot_id -> cumulative CPU-seconds at the previous pass
+        self._lock = threading.Lock()
+
+    def track(self, bot_id, sid, baseline=0.0, cgroup=None):
+        """Start accounting `bot_id`; `baseline` is CPU time already paid for (0 for a fresh process)."""
+        with self._lock:
+            self._sessions[bot_id] = sid
+            self._last[bot_id] = baseline
+            if cgroup:
+                self._cgroups[bot_id] = cgroup
+            else:
+                self._cgroups.pop(bot_id, None)
+
+    def untrack(self, bot_id):
+        with self._lock:
+            self._sessions.pop(bot_id, None)
+            self._cgroups.pop(bot_id, None)
+            self._last.pop(bot_id, None)
+
+    def is_tracked(self, bot_id):
+        return bot_id in self._sessions
+
+    @property
+    def usable(self):
+        return self.available or bool(self._cgroups)
+
+    def read_sessions(self, sids):
+        """{sid: cumulative CPU-seconds} over all live processes of the given sessions."""
+        totals = dict.fromkeys(sids, 0)
+        try:
+            pids = [name for name in os.listdir(self.proc_root) if name.isdigit()]
+        except OSError as e:
+            logger.warning("Cannot list %s: %s", self.proc_root, e)
+            return {}
+        for pid in pids:
+            try:
+                with open(f"{self.proc_root}/{pid}/stat", 'rb') as f:
+                    data = f.read()
+            except OSError:
+                continue  # exited since listdir
+            # comm may contain spaces and parens; the fields after the last ')' are fixed
+            fields = data[data.rfind(b')') + 2:].split()
+            try:
+                sid = int(fields[3])
+                if sid not in totals: continue
+                totals[sid] += int(fields[11]) + int(fields[12]) + int(fields[13]) + int(fields[14])
+            except (IndexError, ValueError):
+                continue
+        return {sid: ticks / self._ticks for sid, ticks in totals.items()}
+
+    def collect(self, bot_ids=None):
+        """CPU-seconds each tracked bot used since the last pass; advances the baselines."""
+        with self._lock:
+            sessions = self._sessions if bot_ids is None else {b: self._sessions[b] for b in bot_ids if b in self._sessions}
+            if not sessions:
+                return {}
+            scan = {sid for bot_id, sid in sessions.items() if bot_id not in self._cgroups}
+            totals = self.read_sessions(scan) if scan and self.available else {}
+            deltas = {}
+            for bot_id, sid in sessions.items():
+                cgroup = self._cgroups.get(bot_id)
+                total = read_cpu_seconds(cgroup) if cgroup else totals.get(sid)
+                if total is None: continue
+                # A tree member exiting unreaped lowers the sum; restart from the new base
+                deltas[bot_id] = max(0.0, total - self._last.get(bot_id, 0.0))
+                self._last[bot_id] = total
+            return deltas
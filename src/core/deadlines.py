@@ -0,0 +1,77 @@
+import time
+import heapq
+import asyncio
+import itertools
+import logging
+
+logger = logging.getLogger(__name__)
+
+class DeadlineScheduler:
+    """Min-heap of per-bot deadlines (wall-clock epoch seconds) served by one task.
+
+    `schedule(bot_id, {kind: when})` replaces everything previously scheduled
+    for the bot; superseded heap entries are skipped lazily when they surface
+    and compacted away once they dominate the heap. The runner sleeps until the
+    earliest deadline, or until an earlier one is scheduled, then calls
+    `handler(bot_id, kind)` in its own task for each one that is due.
+    """
+
+    def __init__(self):
+        self._heap = []  # (when, token, bot_id, kind)
+        self._tokens = {}  # bot_id -> token of its live entries
+        self._counter = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._tasks = set()
+
+    def schedule(self, bot_id, deadlines):
+        token = next(self._counter)
+        self._tokens[bot_id] = token
+        head = self._heap[0][0] if self._heap else None
+        for kind, when in deadlines.items():
+            if when is not None:
+                heapq.heappush(self._heap, (when, token, bot_id, kind))
+        if self._heap and (head is None or self._heap[0][0] < head):
+            self._wakeup.set()
+        if len(self._heap) > 2 * len(self._tokens) * max(1, len(deadlines)) + 64:
+            self._compact()
+
+    def cancel(self, bot_id):
+        self._tokens.pop(bot_id, None)
+
+    def __contains__(self, bot_id):
+        return bot_id in self._tokens
+
+    def bot_ids(self):
+        return list(self._tokens)
+
+    def next_deadline(self):
+        while self._heap and self._tokens.get(self._heap[0][2]) != self._heap[0][1]:
+            heapq.heappop(self._heap)
+        return self._heap[0][0] if self._heap else None
+
+    def _compact(self):
+        self._heap = [e for e in self._heap if self._tokens.get(e[2]) == e[1]]
+        heapq.heapify(self._heap)
+
+    async def run(self, handler):
+        while True:
+            now = time.time()
+            while self._heap and self._heap[0][0] <= now:
+                _, token, bot_id, kind = heapq.heappop(self._heap)
+                if self._tokens.get(bot_id) != token:
+                    continue
+                task = asyncio.get_running_loop().create_task(self._call(handler, bot_id, kind))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+            when = self.next_deadline()
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), None if when is None else max(0.0, when - time.time()))
+            except asyncio.TimeoutError:
+                pass
+
+    async def _call(self, handler, bot_id, kind):
+        try:
+            await handler(bot_id, kind)
+        except Exception as e:
+            logger.warning("Deadline handler failed for bot %s (%s): %s", bot_id, kind, e)
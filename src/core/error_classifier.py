@@ -0,0 +1,144 @@
+import re
+from collections import namedtuple
+
+from src.utils.helpers import error_fingerprint
+
+# One structured error out of a hosted bot's stderr. `text` is the full block
+# (whole traceback, or the single line) as stored in error_logs.
+ErrorEvent = namedtuple('ErrorEvent', 'bot_id type message fingerprint count text')
+
+# Single matcher per (upper-cased) line. The leftmost keyword decides, which for
+# logging-formatted lines is the level, so an INFO line that merely mentions an
+# error stays noise. No keyword at all is plain stderr output.
+_LINE_RE = re.compile(r"(ERROR|CRITICAL|EXCEPTION|TRACEBACK)|INFO|DEBUG|HTTP REQUEST")
+_TRACEBACK_START = "Traceback (most recent call last):"
+_CHAIN_MARKERS = (
+    "During handling of the above exception, another exception occurred:",
+    "The above exception was the direct cause of the following exception:",
+)
+# Final line of a traceback: "pkg.module.SomeError: message" (message optional)
+_EXCEPTION_LINE_RE = re.compile(r"(?P<type>[A-Za-z_][\w.]*)(?::\s?(?P<message>.*))?$")
+
+MAX_TRACEBACK_LINES = 200
+
+class ErrorStream:
+    """Incremental classifier for one bot's stderr.
+
+    `feed(lines)` consumes complete lines and returns the `ErrorEvent`s that
+    finished in them, with identical fingerprints in the same batch collapsed
+    into one event carrying a `count`. Python tracebacks (including chained
+    ones) become a single event typed by their exception class; a traceback
+    whose final line was the last line fed stays pending, since a chained
+    exception may follow, until the next feed or `flush()`.
+    """
+
+    def __init__(self, bot_id):
+        self.bot_id = bot_id
+        self._block = None  # lines of the traceback being collected
+        self._block_size = 0
+        self._complete = False  # exception line seen; only a chain marker can extend it
+        self._chained = False
+
+    @property
+    def pending(self):
+        return self._block is not None
+
+    def feed(self, lines):
+        events = []
+        for line in lines:
+            line = line.rstrip('\r')
+            if self._block is not None:
+                if self._extend_block(line, events):
+                    continue
+            stripped = line.strip()
+            if not stripped:
+                continue
+            if stripped == _TRACEBACK_START:
+                self._start_block(line)
+                continue
+            m = _LINE_RE.search(line.upper())
+            if m is None:
+                etype = 'stderr'
+            elif m.group(1) is None:
+                continue
+            else:
+                etype = m.group(1)
+            events.append(self._event(etype, stripped, stripped))
+        return self._collapse(events)
+
+    def flush(self):
+        """Emit a pending traceback, complete or not (e.g. the process died mid-write)."""
+        events = []
+        if self._block is not None:
+            events.append(self._finish_block())
+        return self._collapse(events)
+
+    def _start_block(self, line):
+        self._block = [line]
+        self._block_size = 1
+        self._complete = self._chained = False
+
+    def _append(self, line):
+        self._block_size += 1
+        if len(self._block) < MAX_TRACEBACK_LINES:
+            self._block.append(line)
+        elif line.strip():
+            # Keep the head and the newest line, which ends up being the exception
+            self._block[-1] = line
+
+    def _extend_block(self, line, events):
+        """Add `line` to the open traceback; False means it starts something new."""
+        stripped = line.strip()
+        if self._complete:
+            if not stripped:
+                self._append(line)
+                return True
+            if stripped in _CHAIN_MARKERS:
+                self._append(line)
+                self._chained = True
+                return True
+            if stripped == _TRACEBACK_START and self._chained:
+                self._append(line)
+                self._complete = self._chained = False
+                return True
+            events.append(self._finish_block())
+            return False
+        if not stripped or line[0] in ' \t' or stripped == _TRACEBACK_START or stripped in _CHAIN_MARKERS:
+            self._append(line)
+            return True
+        # First unindented line is the exception itself
+        self._append(line)
+        self._complete = True
+        return True
+
+    def _finish_block(self):
+        block = self._block
+        omitted = self._block_size - len(block)
+        while block and not block[-1].strip():
+            block.pop()
+        if omitted > 0:
+            block.insert(len(block) - 1, f"  ... ({omitted} lines omitted)")
+        self._block = None
+        text = "\n".join(block)
+        if self._complete:
+            m = _EXCEPTION_LINE_RE.match(block[-1].strip())
+            etype = m.group('type').rsplit('.', 1)[-1] if m else 'Traceback'
+            message = (m.group('message') or '') if m else block[-1].strip()
+        else:
+            etype, message = 'Traceback', 'incomplete traceback'
+        self._complete = self._chained = False
+        return self._event(etype, message, text)
+
+    def _event(self, etype, message, text):
+        return ErrorEvent(self.bot_id, etype, message, error_fingerprint(text), 1, text)
+
+    @staticmethod
+    def _collapse(events):
+        if len(events) < 2:
+            return events
+        merged = {}
+        for ev in events:
+            prev = merged.get(ev.fingerprint)
+            # Keep the latest text; it is what error_logs shows as last seen
+            merged[ev.fingerprint] = ev._replace(count=prev.count + 1) if prev else ev
+        return list(merged.values())
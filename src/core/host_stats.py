@@ -0,0 +1,43 @@
+import time
+import asyncio
+import logging
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+from src.config.config import HOST_STATS_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+class HostStatsSampler:
+    """Samples host CPU/memory in the background so readers get an O(1) snapshot."""
+
+    def __init__(self, interval=HOST_STATS_INTERVAL):
+        self.interval = interval
+        self._snapshot = {'cpu': None, 'mem': None, 'ts': 0.0}
+        self._task = None
+
+    def snapshot(self):
+        return self._snapshot
+
+    def sample(self):
+        if not psutil: return self._snapshot
+        # cpu_percent(None) compares against the previous call, so it never sleeps
+        self._snapshot = {'cpu': psutil.cpu_percent(interval=None), 'mem': psutil.virtual_memory().percent, 'ts': time.time()}
+        return self._snapshot
+
+    async def _loop(self):
+        # Prime the CPU counter so the first published value covers a real interval
+        psutil.cpu_percent(interval=None)
+        await asyncio.sleep(1)
+        while True:
+            try:
+                self.sample()
+            except Exception as e:
+                logger.warning("Host stats sampling failed: %s", e)
+            await asyncio.sleep(self.interval)
+
+    def start(self, application):
+        if self._task is None and psutil:
+            self._task = application.create_task(self._loop())
@@ -0,0 +1,149 @@
+import os
+import gzip
+import shutil
+import asyncio
+import logging
+
+from src.config.config import BOT_LOG_MAX_BYTES, BOT_LOG_BACKUPS, BOT_LOG_COMPRESS, BOT_LOG_DISK_CAP, BOT_LOG_CHECK_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+LOG_NAMES = ('stdout.log', 'stderr.log')
+
+def segments(path):
+    """Rotated segments of `path` as sorted (index, file) pairs; `.N` and `.N.gz` alike."""
+    folder, base = os.path.split(path)
+    found = []
+    try:
+        names = os.listdir(folder or '.')
+    except OSError:
+        return found
+    for name in names:
+        if not name.startswith(base + '.'): continue
+        index = name[len(base) + 1:].split('.', 1)[0]
+        if index.isdigit():
+            found.append((int(index), os.path.join(folder, name)))
+    return sorted(found)
+
+def rotate(path, backups=BOT_LOG_BACKUPS, compress=BOT_LOG_COMPRESS):
+    """Copy `path` into segment 1 (shifting older ones up) and truncate it in place.
+
+    The bot keeps writing through its own O_APPEND descriptor, so the file is
+    never renamed under it: output continues at the start of the emptied file.
+    Anything written between the copy and the truncate is lost, as with
+    logrotate's copytruncate.
+    """
+    for index, seg in reversed(segments(path)):
+        if index >= backups:
+            os.remove(seg)
+        else:
+            suffix = seg[len(f"{path}.{index}"):]
+            os.replace(seg, f"{path}.{index + 1}{suffix}")
+    if backups > 0:
+        target = f"{path}.1.gz" if compress else f"{path}.1"
+        with open(path, 'rb') as src:
+            dst = gzip.open(target, 'wb', compresslevel=6) if compress else open(target, 'wb')
+            with dst:
+                shutil.copyfileobj(src, dst, 1024 * 1024)
+    os.truncate(path, 0)
+
+def enforce_cap(logs_dir, cap=BOT_LOG_DISK_CAP):
+    """Delete the oldest rotated segments until the bot's logs fit in `cap` bytes; returns bytes freed."""
+    total, rotated = 0, []
+    for name in LOG_NAMES:
+        path = os.path.join(logs_dir, name)
+        try:
+            total += os.path.getsize(path)
+        except OSError:
+            pass
+        for _, seg in segments(path):
+            try:
+                st = os.stat(seg)
+            except OSError:
+                continue
+            total += st.st_size
+            rotated.append((st.st_mtime, st.st_size, seg))
+    freed = 0
+    for _, size, seg in sorted(rotated):
+        if total <= cap: break
+        try:
+            os.remove(seg)
+        except OSError:
+            continue
+        total -= size
+        freed += size
+    return freed
+
+class LogRotator:
+    """Keeps each hosted bot's stdout/stderr logs bounded.
+
+    Every BOT_LOG_CHECK_INTERVAL seconds the live log files of tracked bots
+    are stat'ed off the event loop; one that reached BOT_LOG_MAX_BYTES is
+    copy-truncated into a (gzipped) segment, at most BOT_LOG_BACKUPS are kept
+    per stream, and the oldest segments are dropped while the bot's logs
+    exceed BOT_LOG_DISK_CAP. `before_rotate(bot_id, path)` runs on the loop
+    just before a file is truncated, so a reader can catch up first.
+    """
+
+    def __init__(self, max_bytes=BOT_LOG_MAX_BYTES, backups=BOT_LOG_BACKUPS, compress=BOT_LOG_COMPRESS,
+                 disk_cap=BOT_LOG_DISK_CAP, interval=BOT_LOG_CHECK_INTERVAL, before_rotate=None):
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.compress = compress
+        self.disk_cap = disk_cap
+        self.interval = interval
+        self.before_rotate = before_rotate
+        self._dirs = {}  # bot_id -> logs dir
+        self._task = None
+
+    def track(self, bot_id, logs_dir):
+        self._dirs[bot_id] = logs_dir
+
+    def untrack(self, bot_id):
+        self._dirs.pop(bot_id, None)
+
+    def due(self, dirs):
+        """(bot_id, path) for every live log file at or over the size limit."""
+        out = []
+        for bot_id, logs_dir in dirs.items():
+            for name in LOG_NAMES:
+                path = os.path.join(logs_dir, name)
+                try:
+                    if os.path.getsize(path) >= self.max_bytes:
+                        out.append((bot_id, path))
+                except OSError:
+                    continue
+        return out
+
+    def rotate(self, path):
+        rotate(path, self.backups, self.compress)
+        if self.disk_cap:
+            enforce_cap(os.path.dirname(path), self.disk_cap)
+
+    def prepare(self, logs_dir):
+        """Rotate oversized logs left by an earlier run; call before starting the bot."""
+        for _, path in self.due({None: logs_dir}):
+            self.rotate(path)
+
+    async def check(self, dirs=None):
+        loop = asyncio.get_running_loop()
+        for bot_id, path in await loop.run_in_executor(None, self.due, dict(dirs if dirs is not None else self._dirs)):
+            if self.before_rotate is not None:
+                try:
+                    self.before_rotate(bot_id, path)
+                except Exception as e:
+                    logger.warning("Pre-rotation hook for %s failed: %s", path, e)
+            try:
+                await loop.run_in_executor(None, self.rotate, path)
+            except Exception as e:
+                logger.warning("Failed to rotate %s: %s", path, e)
+
+    async def _loop(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            if self._dirs:
+                await self.check()
+
+    def start(self, application):
+        if self._task is None:
+            self._task = application.create_task(self._loop())
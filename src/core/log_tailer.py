@@ -0,0 +1,224 @@
+import os
+import struct
+import ctypes
+import ctypes.util
+import asyncio
+import logging
+
+from src.config.config import LOG_TAIL_POLL_INTERVAL, LOG_TAIL_MAX_READ
+
+logger = logging.getLogger(__name__)
+
+# <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+_EVENT = struct.Struct('iIII')  # wd, mask, cookie, len
+
+class _Inotify:
+    def __init__(self):
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self._rm_watch = libc.inotify_rm_watch
+        self._rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+
+    def add_watch(self, path, mask):
+        wd = self._add_watch(self.fd, os.fsencode(path), mask)
+        if wd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err), path)
+        return wd
+
+    def rm_watch(self, wd):
+        self._rm_watch(self.fd, wd)
+
+    def read_events(self):
+        events = []
+        while True:
+            try:
+                data = os.read(self.fd, 65536)
+            except BlockingIOError:
+                return events
+            pos = 0
+            while pos + _EVENT.size <= len(data):
+                wd, mask, _, length = _EVENT.unpack_from(data, pos)
+                pos += _EVENT.size
+                name = data[pos:pos + length].rstrip(b'\0')
+                pos += length
+                events.append((wd, mask, name))
+
+    def close(self):
+        os.close(self.fd)
+
+class _Tail:
+    __slots__ = ('bot_id', 'path', 'name', 'consumer', 'on_close', 'offset', 'inode', 'carry', 'wd')
+
+    def __init__(self, bot_id, path, consumer, on_close=None):
+        self.bot_id = bot_id
+        self.path = path
+        self.name = os.fsencode(os.path.basename(path))
+        self.consumer = consumer
+        self.on_close = on_close
+        self.offset = 0
+        self.inode = None
+        self.carry = b''
+        self.wd = None
+
+class LogTailer:
+    """One shared tailer for every hosted bot's log file.
+
+    Each log's directory is watched with inotify (so rotation and re-creation
+    are seen too) and only files that actually changed are read, so the cost
+    follows log volume rather than the number of bots. New bytes are read in
+    binary from the last offset; a trailing partial line is carried over to the
+    next read. Complete lines are passed to `consumer(bot_id, lines)`, and
+    `on_close(bot_id)` runs after the final drain when the bot is removed.
+    Without inotify, one task polls all files every few seconds.
+    """
+
+    def __init__(self, poll_interval=LOG_TAIL_POLL_INTERVAL, max_read=LOG_TAIL_MAX_READ):
+        self.poll_interval = poll_interval
+        self.max_read = max_read
+        self._tails = {}  # bot_id -> _Tail
+        self._by_wd = {}  # wd -> set of bot_ids
+        self._inotify = None
+        self._inotify_failed = False
+        self._poll_task = None
+
+    def add(self, bot_id, path, consumer, from_end=True, on_close=None):
+        self.remove(bot_id, drain=False)
+        tail = _Tail(bot_id, path, consumer, on_close)
+        try:
+            st = os.stat(path)
+            tail.inode = st.st_ino
+            tail.offset = st.st_size if from_end else 0
+        except OSError:
+            pass
+        self._tails[bot_id] = tail
+        if self._ensure_inotify():
+            try:
+                tail.wd = self._inotify.add_watch(os.path.dirname(path) or '.', IN_MODIFY | IN_CREATE | IN_MOVED_TO)
+                self._by_wd.setdefault(tail.wd, set()).add(bot_id)
+                return
+            except OSError as e:
+                logger.warning("inotify watch failed for %s: %s; polling instead", path, e)
+        self._ensure_polling()
+
+    def remove(self, bot_id, drain=True):
+        tail = self._tails.pop(bot_id, None)
+        if tail is None: return
+        if drain:
+            # Deliver whatever was written before the process went away
+            self._read(tail, final=True)
+        if tail.on_close is not None:
+            try:
+                tail.on_close(bot_id)
+            except Exception as e:
+                logger.warning("Log close handler for bot %s failed: %s", bot_id, e)
+        if tail.wd is not None:
+            bots = self._by_wd.get(tail.wd)
+            if bots is not None:
+                bots.discard(bot_id)
+                if not bots:
+                    del self._by_wd[tail.wd]
+                    try:
+                        self._inotify.rm_watch(tail.wd)
+                    except Exception: pass
+
+    def catch_up(self, bot_id):
+        """Deliver everything written so far (a trailing partial line included), e.g. before a truncation."""
+        tail = self._tails.get(bot_id)
+        if tail is not None:
+            self._read(tail, final=True)
+
+    def is_tailing(self, bot_id):
+        return bot_id in self._tails
+
+    def _ensure_inotify(self):
+        if self._inotify is not None: return True
+        if self._inotify_failed: return False
+        try:
+            self._inotify = _Inotify()
+            asyncio.get_running_loop().add_reader(self._inotify.fd, self._on_inotify)
+            return True
+        except Exception as e:
+            logger.info("inotify unavailable (%s); log tailing falls back to polling", e)
+            self._inotify, self._inotify_failed = None, True
+            return False
+
+    def _ensure_polling(self):
+        if self._poll_task is None or self._poll_task.done():
+            self._poll_task = asyncio.get_running_loop().create_task(self._poll_loop())
+
+    def _on_inotify(self):
+        changed = set()
+        for wd, mask, name in self._inotify.read_events():
+            if mask & IN_Q_OVERFLOW:
+                # Events were dropped; check every file once
+                changed.update(self._tails)
+                continue
+            if mask & IN_IGNORED:
+                continue
+            for bot_id in self._by_wd.get(wd, ()):
+                tail = self._tails.get(bot_id)
+                if tail is not None and name == tail.name:
+                    changed.add(bot_id)
+        for bot_id in changed:
+            tail = self._tails.get(bot_id)
+            if tail is not None:
+                self._read(tail)
+
+    async def _poll_loop(self):
+        while any(t.wd is None for t in self._tails.values()):
+            await asyncio.sleep(self.poll_interval)
+            for tail in list(self._tails.values()):
+                if tail.wd is None:
+                    self._read(tail)
+
+    def _read(self, tail, final=False):
+        try:
+            with open(tail.path, 'rb') as f:
+                st = os.fstat(f.fileno())
+                if tail.inode != st.st_ino or st.st_size < tail.offset:
+                    # Rotated, re-created or truncated: start from the top of the new file
+                    tail.inode, tail.offset, tail.carry = st.st_ino, 0, b''
+                if st.st_size == tail.offset:
+                    data = b''
+                else:
+                    f.seek(tail.offset)
+                    data = f.read(self.max_read)
+                    tail.offset += len(data)
+                more = tail.offset < st.st_size
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            logger.warning("Failed to read %s: %s", tail.path, e)
+            return
+        chunk = tail.carry + data
+        lines = chunk.split(b'\n')
+        tail.carry = lines.pop()
+        if final and tail.carry:
+            lines.append(tail.carry)
+            tail.carry = b''
+        if lines:
+            try:
+                tail.consumer(tail.bot_id, [l.decode('utf-8', 'replace') for l in lines])
+            except Exception as e:
+                logger.warning("Log consumer for bot %s failed: %s", tail.bot_id, e)
+        if more:
+            # Large bursts are consumed in bounded slices so the loop stays responsive
+            if final:
+                self._read(tail, final=True)
+            else:
+                asyncio.get_running_loop().call_soon(self._read_if_tailing, tail)
+
+    def _read_if_tailing(self, tail):
+        if self._tails.get(tail.bot_id) is tail:
+            self._read(tail)
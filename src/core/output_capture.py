@@ -0,0 +1,222 @@
+import os
+import asyncio
+import logging
+from collections import deque
+
+from src.config.config import OUTPUT_RING_BYTES, OUTPUT_FLUSH_INTERVAL, OUTPUT_FLUSH_BYTES, OUTPUT_PENDING_MAX
+
+logger = logging.getLogger(__name__)
+
+class RingBuffer:
+    """The last `capacity` bytes appended, kept as a deque of chunks."""
+
+    def __init__(self, capacity=OUTPUT_RING_BYTES):
+        self.capacity = capacity
+        self._chunks = deque()
+        self._size = 0
+        self.total = 0  # bytes ever appended
+
+    def append(self, data):
+        if not data: return
+        if len(data) >= self.capacity:
+            self._chunks.clear()
+            data = data[-self.capacity:]
+            self._size = 0
+        self._chunks.append(data)
+        self._size += len(data)
+        self.total += len(data)
+        while self._size - len(self._chunks[0]) >= self.capacity:
+            self._size -= len(self._chunks.popleft())
+
+    def tail(self, nbytes=None):
+        data = b''.join(self._chunks)
+        limit = self.capacity if nbytes is None else min(nbytes, self.capacity)
+        return data[-limit:]
+
+class _Stream:
+    __slots__ = ('bot_id', 'path', 'fd', 'pending', 'pending_size', 'dropped')
+
+    def __init__(self, bot_id, path, fd):
+        self.bot_id = bot_id
+        self.path = path
+        self.fd = fd
+        self.pending = []
+        self.pending_size = 0
+        self.dropped = 0
+
+class OutputCapture:
+    """Reads hosted-bot stdout/stderr through pipes instead of letting the bot write files.
+
+    Every chunk goes into the bot's RingBuffer (both streams interleaved, in
+    arrival order), so recent output can be shown without touching the disk,
+    and is queued for its log file. Queued chunks are appended to the files
+    in batches from an executor, every OUTPUT_FLUSH_INTERVAL seconds or once
+    OUTPUT_FLUSH_BYTES are waiting. If the disk falls behind, the oldest
+    queued output beyond OUTPUT_PENDING_MAX is dropped and a marker written.
+    Rings outlive the process, so the last output of a crashed bot stays
+    viewable; a restart keeps appending to the same ring.
+    """
+
+    def __init__(self, ring_bytes=OUTPUT_RING_BYTES, flush_interval=OUTPUT_FLUSH_INTERVAL, flush_bytes=OUTPUT_FLUSH_BYTES,
+                 pending_max=OUTPUT_PENDING_MAX):
+        self.ring_bytes = ring_bytes
+        self.flush_interval = flush_interval
+        self.flush_bytes = flush_bytes
+        self.pending_max = pending_max
+        self._rings = {}  # bot_id -> RingBuffer
+        self._streams = {}  # read fd -> _Stream
+        self._child_fds = {}  # bot_id -> write ends still held for the child
+        self._closed = []  # closed streams whose queued output is not on disk yet
+        self._pending_total = 0
+        self._flush_handle = None
+        self._flushing = None
+
+    def attach(self, bot_id, stdout_path, stderr_path):
+        """Pipes for a bot about to start; returns the (stdout, stderr) write ends to hand to the child."""
+        self.detach(bot_id)
+        loop = asyncio.get_running_loop()
+        if bot_id not in self._rings:
+            self._rings[bot_id] = RingBuffer(self.ring_bytes)
+        ends = []
+        for path in (stdout_path, stderr_path):
+            r, w = os.pipe()
+            os.set_blocking(r, False)
+            stream = _Stream(bot_id, path, r)
+            self._streams[r] = stream
+            loop.add_reader(r, self._on_readable, stream)
+            ends.append(w)
+        self._child_fds[bot_id] = ends
+        return ends[0], ends[1]
+
+    def spawned(self, bot_id):
+        """Close our copies of the write ends once the child has its own; EOF then means the bot exited."""
+        for fd in self._child_fds.pop(bot_id, ()):
+            try:
+                os.close(fd)
+            except OSError: pass
+
+    def detach(self, bot_id):
+        """Stop reading the bot's pipes now (queued output is still written)."""
+        self.spawned(bot_id)
+        for stream in [s for s in self._streams.values() if s.bot_id == bot_id]:
+            self._close(stream)
+
+    def forget(self, bot_id):
+        self.detach(bot_id)
+        self._rings.pop(bot_id, None)
+
+    def is_capturing(self, bot_id):
+        return any(s.bot_id == bot_id for s in self._streams.values())
+
+    def tail(self, bot_id, nbytes=None):
+        """Recent output of the bot from memory; None if nothing was captured for it."""
+        ring = self._rings.get(bot_id)
+        return ring.tail(nbytes) if ring is not None else None
+
+    def _on_readable(self, stream):
+        try:
+            data = os.read(stream.fd, 65536)
+        except BlockingIOError:
+            return
+        except OSError:
+            data = b''
+        if not data:
+            self._close(stream)
+            return
+        ring = self._rings.get(stream.bot_id)
+        if ring is not None:
+            ring.append(data)
+        stream.pending.append(data)
+        stream.pending_size += len(data)
+        self._pending_total += len(data)
+        while stream.pending_size > self.pending_max and len(stream.pending) > 1:
+            old = stream.pending.pop(0)
+            stream.pending_size -= len(old)
+            self._pending_total -= len(old)
+            stream.dropped += len(old)
+        self._schedule_flush(self._pending_total >= self.flush_bytes)
+
+    def _close(self, stream):
+        if self._streams.pop(stream.fd, None) is None: return
+        try:
+            asyncio.get_running_loop().remove_reader(stream.fd)
+        except Exception: pass
+        try:
+            os.close(stream.fd)
+        except OSError: pass
+        # Keep it reachable until its last bytes are on disk
+        if stream.pending or stream.dropped:
+            self._closed.append(stream)
+        self._schedule_flush(True)
+
+    def _schedule_flush(self, now=False):
+        loop = asyncio.get_running_loop()
+        if self._flushing is not None:
+            return  # the running flush reschedules itself if more is waiting
+        if now:
+            if self._flush_handle is not None:
+                self._flush_handle.cancel()
+            self._flush_handle = None
+            self._flushing = loop.create_task(self._flush())
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.flush_interval, self._flush_due)
+
+    def _flush_due(self):
+        self._flush_handle = None
+        self._schedule_flush(True)
+
+    def _take_batches(self):
+        batches = {}
+        streams = list(self._streams.values()) + self._closed
+        self._closed = []
+        for stream in streams:
+            if not stream.pending and not stream.dropped: continue
+            parts = batches.setdefault(stream.path, [])
+            if stream.dropped:
+                parts.append(f"\n[... {stream.dropped} bytes of output dropped ...]\n".encode())
+                stream.dropped = 0
+            parts.extend(stream.pending)
+            self._pending_total -= stream.pending_size
+            stream.pending, stream.pending_size = [], 0
+        return batches
+
+    @staticmethod
+    def _write(batches):
+        for path, parts in batches.items():
+            try:
+                with open(path, 'ab') as f:
+                    f.write(b''.join(parts))
+            except OSError as e:
+                logger.warning("Failed to write captured output to %s: %s", path, e)
+
+    async def _flush(self):
+        try:
+            batches = self._take_batches()
+            if batches:
+                await asyncio.get_running_loop().run_in_executor(None, self._write, batches)
+        except Exception as e:
+            logger.warning("Output flush failed: %s", e)
+        finally:
+            self._flushing = None
+        if self._pending_total > 0 or self._closed:
+            self._schedule_flush(bool(self._closed) or self._pending_total >= self.flush_bytes)
+
+    async def flush(self):
+        """Write everything queued so far."""
+        while self._flushing is not None:
+            await self._flushing
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batches = self._take_batches()
+        if batches:
+            await asyncio.get_running_loop().run_in_executor(None, self._write, batches)
+
+    async def drain(self, bot_id, timeout=1.0):
+        """Wait briefly for an exited bot's pipes to reach EOF, then write everything queued."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        # A child the bot left behind may hold the pipe open; do not wait for it
+        while self.is_capturing(bot_id) and loop.time() < deadline:
+            await asyncio.sleep(0.02)
+        await self.flush()
@@ -7,13 +7,24 @@ import subprocess
 import logging
 import html
 from datetime import datetime
-try:
-    import psutil
-except ImportError:
-    psutil = None
-
-from src.config.config import BOTS_DIR, ERROR_LOG_FILE
-from src.utils.helpers import seconds_to_human
+from src.config.config import BOTS_DIR, BOT_STOP_TIMEOUT, OUTPUT_CAPTURE, ZYGOTE_ENABLED, BULK_RAMP_MAX_HOST_CPU, ERROR_LOG_FILE, DB_FLUSH_INTERVAL, ERROR_LOG_PRUNE_INTERVAL, ERROR_TRACEBACK_SETTLE, ERROR_ALERT_COOLDOWN
+from src.core.host_stats import HostStatsSampler
+from src.core.usage_sampler import BotUsageSampler
+from src.core.cpu_accounting import CpuAccountant
+from src.core.cgroups import CgroupManager, read_cpu_seconds
+from src.core.venvs import EnvManager
+from src.core.zygote import ZygoteClient
+from src.core.reconciler import ExternalProcess, find_survivors, process_start_time
+from src.core.bulk import BulkJob, run_bulk
+from src.core.restart_policy import RestartPolicy
+from src.core.supervisor import ProcessSupervisor
+from src.core.log_tailer import LogTailer
+from src.core.log_rotation import LogRotator
+from src.core.output_capture import OutputCapture
+from src.core.error_classifier import ErrorStream
+from src.core.deadlines import DeadlineScheduler
+from src.database.models import BOT_ENFORCE_COLUMNS, BOT_RECONCILE_COLUMNS
+from src.utils.helpers import seconds_to_human, effective_remaining, utc_timestamp, read_file_tail
 
 logger = logging.getLogger(__name__)
 
@@ -22,29 +33,79 @@ class ProcessManager:
         self.db = db
         self.processes = {}
         self._enforce_task = None
-        self.restart_cooldown = 60  # seconds
+        self._power_task = None
+        self._zygote_task = None
+        self._flush_task = None
+        self._prune_task = None
+        self.host_stats = HostStatsSampler()
+        self.usage = BotUsageSampler()
+        self.cpu = CpuAccountant()
+        self.cgroups = CgroupManager()
+        self.envs = EnvManager()
+        self.zygote = ZygoteClient() if ZYGOTE_ENABLED and hasattr(os, 'fork') else None
+        self._starting = set()
+        self._stops = {}  # bot_id -> Task of an in-progress stop
+        self.bulk_job = None  # the current or last BulkJob
+        self.supervisor = ProcessSupervisor()
+        self.tailer = LogTailer()
+        self.logs = LogRotator(before_rotate=self._before_log_rotate)
+        self.output = OutputCapture() if OUTPUT_CAPTURE and os.name != 'nt' else None
+        self.deadlines = DeadlineScheduler()
+        self._power_charged_at = {}  # bot_id -> epoch seconds power was last charged up to
         self.restart_power_cost = 2.0  # percent
         self.restart_time_cost = 60  # seconds
         self.restart_anti_loop_limit = 5  # max restarts in window
         self.restart_window_seconds = 3600  # 1 hour window for anti-loop
+        self.restart_backoff_base = 5  # seconds before the first restart; doubles per restart in the window
+        self.restart_backoff_max = 600  # seconds
+        self.restart_healthy_uptime = 300  # a run this long clears the restart history
+        self.restarts = RestartPolicy(self.restart_anti_loop_limit, self.restart_window_seconds, self.restart_backoff_base,
+                                      self.restart_backoff_max, self.restart_healthy_uptime)
+        self._pending_restarts = {}  # bot_id -> TimerHandle of a scheduled automatic restart
         self.power_drain_factor = 0.02  # multiplier for cpu*seconds -> power%
+        self.power_check_interval = 30  # seconds between power charges
+        self.low_time_warning = 600  # warn the owner this many seconds before expiry
 
-    async def start_bot(self, bot_id, application, use_recovery=False):
-        bot_data = self.db.get_bot(bot_id)
+    async def start_bot(self, bot_id, application, use_recovery=False, auto=False):
+        running = self.processes.get(bot_id)
+        if running is not None and running.poll() is None:
+            # A double tap or a bulk start overlapping a manual one; never spawn a second copy
+            return False, "✅ البوت يعمل بالفعل."
+        if not auto:
+            # A start by hand overrides any scheduled restart and clears the crash history
+            self._cancel_restart(bot_id)
+            self.restarts.reset(bot_id)
+        stopping = self._stops.get(bot_id)
+        if stopping is not None:
+            # Let the previous run finish exiting before deciding anything
+            await asyncio.shield(stopping)
+        bot_data = await self.db.get_bot(bot_id)
         if not bot_data: return False, "البوت غير موجود."
         
-        # indices based on DB schema
-        _, user_id, token, name, status, folder, main_file, _, _, start_time, total_seconds, remaining_seconds, power_max, power_remaining, last_checked, sleep_mode, auto_recovery_used, restart_count, last_restart_at, last_sleep_reason, warned_low = bot_data
+        remaining_seconds, power_remaining, sleep_mode = bot_data.remaining_seconds, bot_data.power_remaining, bot_data.sleep_mode
 
         if sleep_mode:
             return False, "⚠️ البوت في وضع السكون. أضف وقتًا لإعادة تشغيله."
         if remaining_seconds <= 0 or power_remaining <= 0:
             return False, "⚠️ انتهى وقت الاستضافة أو الطاقة. أضف وقتًا أو طاقة لإعادة التشغيل."
 
+        if bot_id in self._starting:
+            return False, "⏳ البوت قيد التشغيل بالفعل."
+        self._starting.add(bot_id)
+        try:
+            return await self._spawn(bot_id, bot_data, application, auto)
+        finally:
+            self._starting.discard(bot_id)
+
+    async def _spawn(self, bot_id, bot_data, application, auto=False):
+        user_id, token, folder, main_file, start_time = bot_data.user_id, bot_data.token, bot_data.folder, bot_data.main_file, bot_data.start_time
         bot_path = os.path.abspath(os.path.join(BOTS_DIR, folder))
-        req_path = os.path.join(bot_path, "requirements.txt")
-        if os.path.exists(req_path):
-            subprocess.Popen([sys.executable, "-m", "pip", "install", "-r", "requirements.txt"], cwd=bot_path)
+        try:
+            python = await self.envs.ensure(bot_path)
+        except Exception as e:
+            logger.warning("Environment for bot %s failed: %s", bot_id, e)
+            await self.db.add_error_log(bot_id, f"Dependency install failed: {e}")
+            return False, f"❌ فشل تثبيت المتطلبات: {e}"
 
         try:
             env = os.environ.copy()
@@ -52,212 +113,584 @@ class ProcessManager:
 
             logs_path = os.path.join(bot_path, "logs")
             os.makedirs(logs_path, exist_ok=True)
+            await asyncio.get_running_loop().run_in_executor(None, self.logs.prepare, logs_path)
             stderr_file = os.path.join(logs_path, "stderr.log")
 
-            p = subprocess.Popen(
-                [sys.executable, main_file],
-                cwd=bot_path, env=env,
-                stdout=open(os.path.join(logs_path, "stdout.log"), "a"),
-                stderr=open(stderr_file, "a"),
-                preexec_fn=os.setsid if os.name != 'nt' else None
-            )
+            plan = await self.db.get_user_plan(user_id)
+            cgroup = self.cgroups.prepare(bot_id, plan)
+            # A reused cgroup keeps its counters; only charge what this run uses
+            cpu_base = (read_cpu_seconds(cgroup) or 0.0) if cgroup else 0.0
+
+            stdout_file = os.path.join(logs_path, "stdout.log")
+            p = None
+            # The zygote runs the host interpreter, so bots with their own env still cold-start;
+            # it opens the log files in the child, so captured bots cannot use it either
+            if self.zygote is not None and self.zygote.alive and python == sys.executable and self.output is None:
+                try:
+                    procs_file, mem_limit = self.cgroups.child_limits(cgroup, plan)
+                    p = await self.zygote.spawn([main_file], bot_path, env, stdout_file, stderr_file, procs_file, mem_limit)
+                except Exception as e:
+                    logger.warning("Zygote spawn failed for bot %s (%s); using Popen", bot_id, e)
+            def launch(out, err):
+                return subprocess.Popen(
+                    [python, main_file],
+                    cwd=bot_path, env=env,
+                    stdout=out,
+                    stderr=err,
+                    preexec_fn=self.cgroups.preexec_fn(cgroup, plan) if os.name != 'nt' else None
+                )
+
+            if p is None and self.output is not None:
+                out, err = self.output.attach(bot_id, stdout_file, stderr_file)
+                try:
+                    p = launch(out, err)
+                except Exception:
+                    self.output.detach(bot_id)
+                    raise
+                finally:
+                    self.output.spawned(bot_id)
+            elif p is None:
+                # The child gets its own copies; ours are closed right after the spawn
+                with open(stdout_file, "a") as out, open(stderr_file, "a") as err:
+                    p = launch(out, err)
+            if cgroup and not self.cgroups.contains(cgroup, p.pid):
+                logger.warning("Bot %s could not join cgroup %s; running with rlimits only", bot_id, cgroup)
+                cgroup = None
             self.processes[bot_id] = p
-            self.db.update_bot_status(bot_id, "running", p.pid)
+            self.usage.track(bot_id, p.pid, cgroup)
+            self.cpu.track(bot_id, p.pid, baseline=cpu_base, cgroup=cgroup)
+            self.logs.track(bot_id, logs_path)
+            await self.db.update_bot_status(bot_id, "running", p.pid, process_start_time(p.pid))
             
             now = int(time.time())
             if not start_time:
-                self.db.update_bot_resources(bot_id, last_checked=datetime.utcnow().isoformat())
-                # Update start_time separately since update_bot_resources doesn't handle it
-                import sqlite3
-                with sqlite3.connect(self.db.db_file) as conn:
-                    conn.execute("UPDATE bots SET start_time = ? WHERE id = ?", (now, bot_id))
+                await self.db.update_bot_resources(bot_id, last_checked=datetime.utcnow().isoformat())
+                await self.db.set_bot_start_time(bot_id, now)
             else:
-                self.db.update_last_checked(bot_id)
+                await self.db.update_last_checked(bot_id)
 
-            self.db.reset_restart_count(bot_id)
+            if not auto:
+                await self.db.reset_restart_count(bot_id)
+            self.restarts.started(bot_id)
+            await self.reschedule(bot_id)
 
-            application.create_task(self.watch_errors(bot_id, stderr_file, user_id, application))
-            application.create_task(self._watch_process_exit(bot_id, p, user_id, application))
+            consume, close = self._error_pipeline(bot_id, user_id, application)
+            self.tailer.add(bot_id, stderr_file, consume, on_close=close)
+            self.supervisor.watch(bot_id, p, lambda bid, proc, code: self._on_process_exit(bid, proc, code, user_id, application))
             return True, "🚀 تم التشغيل بنجاح."
         except Exception as e:
             logger.exception("Failed to start bot %s: %s", bot_id, e)
             return False, str(e)
 
-    async def _watch_process_exit(self, bot_id, process, user_id, application):
-        while True:
-            await asyncio.sleep(1)
-            if process.poll() is not None:
-                code = process.returncode
-                self.db.add_error_log(bot_id, f"Process exited with code {code}")
-                if bot_id in self.processes: del self.processes[bot_id]
-                if code != 0:
-                    await asyncio.sleep(2)
-                    await self._handle_unexpected_exit(bot_id, user_id, application, exit_code=code)
-                else:
-                    self.db.update_bot_status(bot_id, "stopped", None)
-                break
-
-    async def _handle_unexpected_exit(self, bot_id, user_id, application, exit_code=1):
-        bot = self.db.get_bot(bot_id)
-        if not bot: return
-        
-        sleep_mode = bot[15]
-        remaining_seconds = bot[11]
-        power_remaining = bot[13]
-        auto_recovery_used = bot[16]
-        restart_count = bot[17]
-        last_restart_at = bot[18]
-
-        if restart_count >= self.restart_anti_loop_limit:
-            self.db.set_sleep_mode(bot_id, True, reason="anti_loop")
-            self.db.log_restart_event(bot_id, "Auto-restart disabled due to too many restarts.")
+    async def reconcile(self, application):
+        """Re-attach bots that outlived a restart of NeuroHost; restart or stop the rest.
+
+        Every DB-running bot's pid is checked against the process table in one
+        pass (start time, then cwd/cmdline, so a reused pid is not mistaken for
+        the bot). Survivors are adopted into the supervisor, tailer, samplers
+        and deadlines as if we had just started them. The others are marked
+        stopped, and the ones with time and power left are restarted in the
+        background as a bulk start.
+        """
+        bots = [bot for bot in await self.db.get_all_running_bots(columns=BOT_RECONCILE_COLUMNS) if bot.id not in self.processes]
+        if not bots: return
+        loop = asyncio.get_running_loop()
+        try:
+            survivors = await loop.run_in_executor(None, find_survivors, bots, BOTS_DIR)
+        except Exception as e:
+            logger.warning("Boot reconciliation scan failed: %s", e)
+            return
+        dead = []
+        for bot in bots:
+            info = survivors.get(bot.id)
+            if info is None:
+                dead.append(bot)
+                continue
             try:
-                await application.bot.send_message(chat_id=bot[1], text=f"⚠️ البوت {bot[3]} تم إيقافه آلياً بسبب تكرار الإعادات.")
-            except Exception: pass
+                self._adopt(bot, info, application)
+            except Exception as e:
+                logger.warning("Could not adopt bot %s (pid %s): %s", bot.id, bot.pid, e)
+                dead.append(bot)
+        adopted = [bot.id for bot in bots if bot.id in self.processes]
+        if adopted and self.cpu.usable:
+            # Set the CPU baselines to the current totals; time before the restart is not re-charged
+            await loop.run_in_executor(None, self.cpu.collect, adopted)
+        # A running bot's remaining time is a checkpoint at last_checked, so the run that ended
+        # while NeuroHost was down is charged here; its CPU use is unknown, so power is left as is
+        now, stamp = time.time(), datetime.utcnow().isoformat()
+        for bot in dead:
+            bot.remaining_seconds = effective_remaining(bot, now)
+
+        async def settle(bot):
+            await self.db.update_bot_resources(bot.id, remaining_seconds=bot.remaining_seconds, last_checked=stamp)
+            await self.db.update_bot_status(bot.id, "stopped", None)
+
+        await asyncio.gather(*(settle(bot) for bot in dead))
+        logger.info("Boot reconciliation: %d bot(s) adopted, %d found dead", len(adopted), len(dead))
+        restart = [bot.id for bot in dead if self._startable(bot)]
+        if restart:
+            self._launch_bulk('start', restart, lambda bot_id: self._restart_after_boot(bot_id, application), application)
+
+    def _adopt(self, bot, info, application):
+        p = ExternalProcess(bot.pid, info.create_time)
+        cgroup = self.cgroups.path_for(bot.id) if self.cgroups.enabled else None
+        if cgroup and not self.cgroups.contains(cgroup, p.pid):
+            cgroup = None
+        logs_path = os.path.join(os.path.abspath(os.path.join(BOTS_DIR, bot.folder)), "logs")
+        stderr_file = os.path.join(logs_path, "stderr.log")
+        self.processes[bot.id] = p
+        self.restarts.started(bot.id, uptime=time.time() - bot.launched_at if bot.launched_at else 0.0)
+        self.logs.track(bot.id, logs_path)
+        self.usage.track(bot.id, p.pid, cgroup)
+        self.cpu.track(bot.id, p.pid, cgroup=cgroup)
+        consume, close = self._error_pipeline(bot.id, bot.user_id, application)
+        self.tailer.add(bot.id, stderr_file, consume, on_close=close)
+        user_id = bot.user_id
+        self.supervisor.watch(bot.id, p, lambda bid, proc, code: self._on_process_exit(bid, proc, code, user_id, application))
+
+    async def recent_output(self, bot, nbytes=4096):
+        """(stdout, stderr) tails of the bot's output; from memory when captured, else read from its log files.
+
+        Captured output has both streams interleaved in arrival order, so it
+        comes back whole as the first item and the second is None.
+        """
+        data = self.output.tail(bot.id, nbytes) if self.output is not None else None
+        if data is not None:
+            return data, None
+        # Not captured (capture off, or a bot adopted after a NeuroHost restart)
+        logs_path = os.path.join(BOTS_DIR, bot.folder, "logs")
+        loop = asyncio.get_running_loop()
+        out = await loop.run_in_executor(None, read_file_tail, os.path.join(logs_path, "stdout.log"), nbytes // 2)
+        err = await loop.run_in_executor(None, read_file_tail, os.path.join(logs_path, "stderr.log"), nbytes // 2)
+        return out, err
+
+    async def _restart_after_boot(self, bot_id, application):
+        success, msg = await self.start_bot(bot_id, application)
+        await self.db.log_restart_event(bot_id, "Restarted after host restart." if success else f"Restart after host restart failed: {msg}")
+        return success, msg
+
+    @staticmethod
+    def _startable(bot):
+        return not bot.sleep_mode and (bot.remaining_seconds or 0) > 0 and (bot.power_remaining or 0) > 0
+
+    def _host_has_headroom(self):
+        cpu = self.host_stats.snapshot().get('cpu')
+        return cpu is None or cpu < BULK_RAMP_MAX_HOST_CPU
+
+    def _launch_bulk(self, action, bot_ids, operation, application, concurrency=None):
+        """Start a BulkJob in the background; None while another one is still running.
+
+        A fixed `concurrency` runs that many operations from the start instead of ramping up.
+        """
+        if self.bulk_job is not None and self.bulk_job.running:
+            return None
+        job = BulkJob(action, bot_ids)
+        if concurrency:
+            runner = run_bulk(job, operation, concurrency=concurrency, ramp_start=concurrency)
+        else:
+            runner = run_bulk(job, operation, may_ramp=self._host_has_headroom)
+        job.task = application.create_task(runner)
+        self.bulk_job = job
+        return job
+
+    async def start_all_eligible(self, application):
+        """Bulk-start every stopped bot that has time and power left and is not asleep."""
+        bots = await self.db.find_bots(status='stopped')
+        return self._launch_bulk('start', [bot.id for bot in bots if self._startable(bot)],
+                                 lambda bot_id: self.start_bot(bot_id, application), application)
+
+    async def stop_all_for_user(self, user_id, application):
+        """Bulk-stop every running bot of `user_id`, all at once."""
+        bots = await self.db.find_bots(status='running', user_id=user_id)
+        # Stopping frees resources and mostly waits, so there is nothing to ramp
+        return self._launch_bulk('stop', [bot.id for bot in bots], self.stop_bot, application, concurrency=max(1, len(bots)))
+
+    async def restart_where(self, application, status='running', user_id=None, plan=None):
+        """Bulk stop+start of the bots matching the filters (`plan` is the owner's plan)."""
+        bots = await self.db.find_bots(status=status, user_id=user_id, plan=plan)
+
+        async def restart(bot_id):
+            await self.stop_bot(bot_id)
+            return await self.start_bot(bot_id, application)
+
+        return self._launch_bulk('restart', [bot.id for bot in bots], restart, application)
+
+    async def _on_process_exit(self, bot_id, process, code, user_id, application):
+        if self.processes.get(bot_id) is process:
+            if self.output is not None:
+                # The traceback may still be in the pipe or the write queue
+                await self.output.drain(bot_id)
+            self.tailer.remove(bot_id)
+            self.logs.untrack(bot_id)
+            await self.checkpoint(bot_id)
+            self.usage.untrack(bot_id)
+            self.cpu.untrack(bot_id)
+        # Also after requested stops; fails harmlessly if a new run already joined it
+        self.cgroups.remove(bot_id)
+        # An adopted bot is not our child, so its exit status cannot be collected
+        adopted = isinstance(process, ExternalProcess)
+        await self.db.add_error_log(bot_id, "Process exited (exit code unknown: started before NeuroHost restarted)" if adopted else f"Process exited with code {code}")
+        # stop_bot drops the handle before signalling, so a requested stop is not a crash
+        if self.processes.get(bot_id) is not process:
             return
+        del self.processes[bot_id]
+        uptime = self.restarts.exited(bot_id)
+        if adopted:
+            # A clean exit or a stop from outside looks the same as a crash; do not restart on a guess
+            await self.db.update_bot_status(bot_id, "stopped", None)
+        elif code != 0:
+            await self._handle_unexpected_exit(bot_id, user_id, application, exit_code=code, uptime=uptime)
+        else:
+            await self.db.update_bot_status(bot_id, "stopped", None)
+
+    async def _handle_unexpected_exit(self, bot_id, user_id, application, exit_code=1, uptime=None):
+        bot = await self.db.get_bot(bot_id)
+        if not bot: return
 
-        if last_restart_at:
+        sleep_mode = bot.sleep_mode
+        remaining_seconds = bot.remaining_seconds
+        power_remaining = bot.power_remaining
+        auto_recovery_used = bot.auto_recovery_used
+
+        if uptime is not None and uptime >= self.restart_healthy_uptime and bot.restart_count:
+            await self.db.reset_restart_count(bot_id)
+
+        delay = self.restarts.next_delay(bot_id)
+        if delay is None:
+            await self.db.set_sleep_mode(bot_id, True, reason="anti_loop")
+            await self.db.log_restart_event(bot_id, f"Auto-restart disabled after {self.restart_anti_loop_limit} restarts within {seconds_to_human(self.restart_window_seconds)}.")
             try:
-                lr = datetime.fromisoformat(last_restart_at)
-                if (datetime.utcnow() - lr).total_seconds() < self.restart_cooldown:
-                    self.db.log_restart_event(bot_id, "Restart skipped due to cooldown.")
-                    return
+                await application.bot.send_message(chat_id=bot.user_id, text=f"⚠️ البوت {bot.name} تم إيقافه آلياً بسبب تكرار الإعادات.")
             except Exception: pass
+            return
 
-        if (remaining_seconds <= 0 or power_remaining <= 0) and self.db.can_user_recover(bot[1]) and auto_recovery_used == 0:
-            self.db.use_user_recovery(bot[1])
-            self.db.mark_bot_auto_recovery_used(bot_id)
-            self.db.log_restart_event(bot_id, "Auto-recovery used to restart bot for free.")
-            success, msg = await self.start_bot(bot_id, application, use_recovery=True)
+        if (remaining_seconds <= 0 or power_remaining <= 0) and await self.db.can_user_recover(bot.user_id) and auto_recovery_used == 0:
+            await self.db.use_user_recovery(bot.user_id)
+            await self.db.mark_bot_auto_recovery_used(bot_id)
+            await self.db.log_restart_event(bot_id, "Auto-recovery used to restart bot for free.")
+            self.restarts.record_restart(bot_id)
+            success, msg = await self.start_bot(bot_id, application, use_recovery=True, auto=True)
             if success:
                 try:
-                    await application.bot.send_message(chat_id=bot[1], text=f"🔄 تم استعادة {bot[3]} باستخدام Auto-Recovery المجانية.")
+                    await application.bot.send_message(chat_id=bot.user_id, text=f"🔄 تم استعادة {bot.name} باستخدام Auto-Recovery المجانية.")
                 except Exception: pass
                 return
 
         if remaining_seconds <= 0 or power_remaining <= 0 or sleep_mode:
-            self.db.set_sleep_mode(bot_id, True, reason="expired_or_no_power")
+            await self.db.set_sleep_mode(bot_id, True, reason="expired_or_no_power")
             try:
-                await application.bot.send_message(chat_id=bot[1], text=f"⚠️ البوت {bot[3]} توقف بسبب نفاد الوقت أو الطاقة ودخل وضع السكون.")
+                await application.bot.send_message(chat_id=bot.user_id, text=f"⚠️ البوت {bot.name} توقف بسبب نفاد الوقت أو الطاقة ودخل وضع السكون.")
             except Exception: pass
             return
 
         new_power = max(0.0, power_remaining - self.restart_power_cost)
         new_remaining = max(0, remaining_seconds - self.restart_time_cost)
-        self.db.update_bot_resources(bot_id, remaining_seconds=new_remaining, power_remaining=new_power, last_checked=datetime.utcnow().isoformat())
-        self.db.increment_restart(bot_id)
-        self.db.log_restart_event(bot_id, f"Auto-restarting after exit code {exit_code}")
-        await asyncio.sleep(3)
-        success, msg = await self.start_bot(bot_id, application)
+        await self.db.update_bot_resources(bot_id, remaining_seconds=new_remaining, power_remaining=new_power, last_checked=datetime.utcnow().isoformat())
+        await self.db.increment_restart(bot_id)
+        # Not running while it waits; a manual start or stop cancels the pending restart
+        await self.db.update_bot_status(bot_id, "stopped", None)
+        await self.db.log_restart_event(bot_id, f"Auto-restarting in {delay:.0f}s after exit code {exit_code}")
+        self.restarts.record_restart(bot_id)
+        self._cancel_restart(bot_id)
+        loop = asyncio.get_running_loop()
+        self._pending_restarts[bot_id] = loop.call_later(delay, self._fire_restart, bot_id, application)
+
+    def _fire_restart(self, bot_id, application):
+        if self._pending_restarts.pop(bot_id, None) is None: return
+        application.create_task(self._auto_restart(bot_id, application))
+
+    def _cancel_restart(self, bot_id):
+        handle = self._pending_restarts.pop(bot_id, None)
+        if handle is not None: handle.cancel()
+
+    async def _auto_restart(self, bot_id, application):
+        success, msg = await self.start_bot(bot_id, application, auto=True)
         if success:
+            bot = await self.db.get_bot(bot_id)
             try:
-                await application.bot.send_message(chat_id=bot[1], text=f"♻️ تم إعادة تشغيل البوت {bot[3]} تلقائياً.")
+                await application.bot.send_message(chat_id=bot.user_id, text=f"♻️ تم إعادة تشغيل البوت {bot.name} تلقائياً.")
             except Exception: pass
         else:
-            self.db.log_restart_event(bot_id, f"Auto-restart failed: {msg}")
+            await self.db.log_restart_event(bot_id, f"Auto-restart failed: {msg}")
 
-    async def watch_errors(self, bot_id, log_file, user_id, application):
-        last_pos = os.path.getsize(log_file) if os.path.exists(log_file) else 0
-        while bot_id in self.processes and self.processes[bot_id].poll() is None:
-            await asyncio.sleep(2)
-            if os.path.exists(log_file) and os.path.getsize(log_file) > last_pos:
-                try:
-                    with open(log_file, 'r') as f:
-                        f.seek(last_pos)
-                        lines = f.readlines()
-                        new_errors = []
-                        for line in lines:
-                            if any(x in line.upper() for x in ["ERROR", "CRITICAL", "TRACEBACK", "EXCEPTION"]):
-                                new_errors.append(line)
-                            elif not any(x in line.upper() for x in ["INFO", "DEBUG", "HTTP REQUEST"]):
-                                new_errors.append(line)
-                        if new_errors:
-                            error_text = "".join(new_errors).strip()
-                            if error_text:
-                                self.db.add_error_log(bot_id, error_text)
-                                try:
-                                    bot_info = self.db.get_bot(bot_id)
-                                    safe_error = html.escape(error_text[:500])
-                                    await application.bot.send_message(
-                                        chat_id=user_id,
-                                        text=f"⚠️ <b>تنبيه خطأ حقيقي في البوت: {html.escape(bot_info[3])}</b>\n\n<code>{safe_error}</code>",
-                                        parse_mode="HTML"
-                                    )
-                                except Exception: pass
-                    last_pos = os.path.getsize(log_file)
-                except Exception: pass
+    def _before_log_rotate(self, bot_id, path):
+        # stderr is about to be truncated; feed the error pipeline what it has not read yet
+        if os.path.basename(path) == "stderr.log":
+            self.tailer.catch_up(bot_id)
 
-    def stop_bot(self, bot_id):
-        bot_data = self.db.get_bot(bot_id)
-        pid = bot_data[7] if bot_data else None
-        if pid:
-            try:
-                if psutil and psutil.pid_exists(pid):
-                    os.killpg(os.getpgid(pid), signal.SIGTERM)
-            except Exception: pass
-        if bot_id in self.processes: del self.processes[bot_id]
-        self.db.update_bot_status(bot_id, "stopped", None)
+    def _error_pipeline(self, bot_id, user_id, application):
+        """Tailer callbacks that turn stderr lines into reported `ErrorEvent`s."""
+        stream = ErrorStream(bot_id)
+        loop = asyncio.get_running_loop()
+        settle = None
+        alerted = {}  # fingerprint -> loop time of the last alert
+
+        def emit(events):
+            if not events: return
+            now = loop.time()
+            if len(alerted) > 256:
+                for fp in [fp for fp, ts in alerted.items() if now - ts >= ERROR_ALERT_COOLDOWN]:
+                    del alerted[fp]
+            alerts = [ev for ev in events if now - alerted.get(ev.fingerprint, -ERROR_ALERT_COOLDOWN) >= ERROR_ALERT_COOLDOWN]
+            for ev in alerts:
+                alerted[ev.fingerprint] = now
+            application.create_task(self._report_errors(bot_id, user_id, events, alerts, application))
+
+        def flush(_bot_id=None):
+            nonlocal settle
+            if settle is not None:
+                settle.cancel()
+                settle = None
+            emit(stream.flush())
+
+        def consume(_bot_id, lines):
+            nonlocal settle
+            if settle is not None:
+                settle.cancel()
+                settle = None
+            emit(stream.feed(lines))
+            if stream.pending:
+                settle = loop.call_later(ERROR_TRACEBACK_SETTLE, flush)
+
+        return consume, flush
+
+    async def _report_errors(self, bot_id, user_id, events, alerts, application):
+        try:
+            for ev in events:
+                await self.db.add_error_log(bot_id, ev.text, fingerprint=ev.fingerprint, count=ev.count)
+            if not alerts: return
+            bot_info = await self.db.get_bot(bot_id)
+            parts = []
+            for ev in alerts[:3]:
+                times = f" (×{ev.count})" if ev.count > 1 else ""
+                parts.append(f"<b>{html.escape(ev.type)}</b>{times}\n<code>{html.escape(ev.text[-500:])}</code>")
+            await application.bot.send_message(
+                chat_id=user_id,
+                text=f"⚠️ <b>تنبيه خطأ حقيقي في البوت: {html.escape(bot_info.name)}</b>\n\n" + "\n\n".join(parts),
+                parse_mode="HTML"
+            )
+        except Exception: pass
+
+    async def stop_bot(self, bot_id):
+        """Stop the bot and wait until it is gone; concurrent calls share one stop."""
+        task = self._stops.get(bot_id)
+        if task is None:
+            task = asyncio.get_running_loop().create_task(self._stop(bot_id))
+            self._stops[bot_id] = task
+            task.add_done_callback(lambda _t, b=bot_id: self._stops.pop(b, None))
+        return await asyncio.shield(task)
+
+    async def _stop(self, bot_id):
+        self._cancel_restart(bot_id)
+        self.restarts.forget(bot_id)
+        bot_data = await self.db.get_bot(bot_id)
+        process = self.processes.pop(bot_id, None)
+        self.tailer.remove(bot_id)
+        self.logs.untrack(bot_id)
+        await self.checkpoint(bot_id)
+        self.usage.untrack(bot_id)
+        self.cpu.untrack(bot_id)
+        if process is None and bot_data and bot_data.pid:
+            # No handle (e.g. adoption failed); the recorded start time guards against pid reuse
+            process = ExternalProcess(bot_data.pid, bot_data.launched_at)
+        if process is not None and process.poll() is None:
+            await self._terminate(bot_id, process)
+        await self.db.update_bot_status(bot_id, "stopped", None)
         return True
 
-    def get_bot_usage(self, bot_id):
-        if not psutil: return 0, 0
-        bot_data = self.db.get_bot(bot_id)
-        pid = bot_data[7] if bot_data else None
-        if pid:
+    async def _terminate(self, bot_id, process, timeout=BOT_STOP_TIMEOUT):
+        """SIGTERM the bot's process group, wait up to `timeout`, then SIGKILL whatever is left."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        self._signal_group(process, signal.SIGTERM)
+        code = await self.supervisor.wait(process, timeout)
+        # Processes the bot spawned share its group; they get the rest of the grace period
+        while code is not None and self._group_alive(process.pid) and loop.time() < deadline:
+            await asyncio.sleep(0.1)
+        if code is None or self._group_alive(process.pid):
+            self._signal_group(process, signal.SIGKILL)
+            await self.db.add_error_log(bot_id, f"Stop timed out after {timeout:g}s; killed with SIGKILL")
+            if code is None:
+                code = await self.supervisor.wait(process, 5)
+            # Killed children are reaped by init; give it a moment so the stop reports a clean state
+            settle = loop.time() + 1
+            while self._group_alive(process.pid) and loop.time() < settle:
+                await asyncio.sleep(0.05)
+        return code
+
+    @staticmethod
+    def _signal_group(process, sig):
+        # Bots lead their own session, so the group id is the bot's pid
+        try:
+            os.killpg(process.pid, sig)
+            return
+        except ProcessLookupError:
+            return
+        except Exception: pass
+        try:
+            process.send_signal(sig)
+        except Exception: pass
+
+    @staticmethod
+    def _group_alive(pgid):
+        try:
+            os.killpg(pgid, 0)
+        except ProcessLookupError:
+            return False
+        except Exception: pass
+        return True
+
+    async def get_bot_usage(self, bot_id):
+        """(cpu_percent, rss_mb) of the bot's whole process group, from the background sampler."""
+        return self.usage.usage(bot_id)
+
+    def _charge_power(self, bot, now, cpu_seconds=None):
+        """Power left after charging CPU use since the last charge; updates the charge mark.
+
+        `cpu_seconds` comes from a /proc (or cgroup) pass the caller ran off
+        the loop; without it the use is estimated from the sampled CPU%.
+        """
+        power = float(bot.power_remaining or 0.0)
+        elapsed = now - self._power_charged_at.get(bot.id, now)
+        self._power_charged_at[bot.id] = now
+        if elapsed <= 0: return power
+        if cpu_seconds is None:
+            cpu, _ = self.usage.usage(bot.id)
+            cpu_seconds = (cpu / 100.0) * elapsed
+        drain_factor = self.power_drain_factor
+        if cpu_seconds / elapsed < 0.02: drain_factor *= 0.2  # under 2% CPU on average
+        return max(0.0, power - cpu_seconds * drain_factor)
+
+    async def checkpoint(self, bot_id):
+        """Persist the derived remaining time and power of a running bot as its new baseline."""
+        bot = await self.db.get_bot(bot_id)
+        self.deadlines.cancel(bot_id)
+        if not bot or bot.status != 'running':
+            self._power_charged_at.pop(bot_id, None)
+            return
+        cpu_seconds = None
+        if self.cpu.is_tracked(bot_id) and self.cpu.usable:
+            # Reading the bot's tree scans /proc and may wait for a running batched pass
+            used = await asyncio.get_running_loop().run_in_executor(None, self.cpu.collect, [bot_id])
+            cpu_seconds = used.get(bot_id)
+        now = time.time()
+        power = self._charge_power(bot, now, cpu_seconds)
+        self._power_charged_at.pop(bot_id, None)
+        await self.db.update_bot_resources(bot_id, remaining_seconds=effective_remaining(bot, now), power_remaining=power, last_checked=datetime.utcnow().isoformat())
+
+    def _schedule(self, bot, now):
+        # Project from the checkpoint itself; effective_remaining rounds down to whole seconds
+        since = utc_timestamp(bot.last_checked) if bot.status == 'running' else None
+        expire_at = max(now, (now if since is None else since) + (bot.remaining_seconds or 0))
+        remaining = expire_at - now
+        deadlines = {'expire': expire_at}
+        if remaining > 0 and not bot.warned_low:
+            deadlines['warn'] = max(now, expire_at - self.low_time_warning)
+        self.deadlines.schedule(bot.id, deadlines)
+        self._power_charged_at.setdefault(bot.id, now)
+
+    async def reschedule(self, bot_id):
+        """Recompute a bot's warning/expiry deadlines; call after its time changes."""
+        bot = await self.db.get_bot(bot_id)
+        if not bot or bot.status != 'running':
+            self.deadlines.cancel(bot_id)
+            return
+        self._schedule(bot, time.time())
+
+    async def _expire(self, bot, application):
+        await self.checkpoint(bot.id)
+        await self.db.set_sleep_mode(bot.id, True, reason="expired")
+        try:
+            await application.bot.send_message(chat_id=bot.user_id, text=f"⚠️ البوت {bot.name} دخل وضع السكون بسبب نفاد الوقت أو الطاقة.")
+        except Exception: pass
+        await self.stop_bot(bot.id)
+
+    async def _on_deadline(self, bot_id, kind, application):
+        bot = await self.db.get_bot(bot_id)
+        if not bot or bot.status != 'running':
+            self.deadlines.cancel(bot_id)
+            return
+        now = time.time()
+        remaining = effective_remaining(bot, now)
+        if kind == 'warn':
+            if bot.warned_low or remaining <= 0: return
             try:
-                if psutil.pid_exists(pid):
-                    proc = psutil.Process(pid)
-                    if proc.is_running():
-                        return proc.cpu_percent(interval=0.1), proc.memory_info().rss / 1024 / 1024
+                await application.bot.send_message(chat_id=bot.user_id, text=f"⚠️ تنبيه: البوت {bot.name} سيتوقف خلال {seconds_to_human(remaining)}. يرجى إضافة وقت لتجنب السكون.")
+                await self.db.buffer_bot_resources(bot_id, warned_low=True)
             except Exception: pass
-        return 0, 0
+        elif remaining > 0:
+            # Time was added without a reschedule reaching us first
+            self._schedule(bot, now)
+        else:
+            await self._expire(bot, application)
 
     async def _enforce_loop(self, application):
+        # One pass over the running set at boot; afterwards only due deadlines wake us
+        try:
+            now = time.time()
+            for bot in await self.db.get_all_running_bots(columns=BOT_ENFORCE_COLUMNS):
+                self._schedule(bot, now)
+        except Exception as e:
+            logger.warning("Failed to schedule running bots: %s", e)
+        await self.deadlines.run(lambda bot_id, kind: self._on_deadline(bot_id, kind, application))
+
+    async def _power_loop(self, application):
         while True:
+            await asyncio.sleep(self.power_check_interval)
+            used = {}
+            if self.cpu.usable:
+                try:
+                    # One /proc pass for every tracked bot, off the event loop
+                    used = await asyncio.get_running_loop().run_in_executor(None, self.cpu.collect)
+                except Exception as e:
+                    logger.warning("CPU accounting pass failed: %s", e)
+            now = time.time()
+            for bot_id in self.deadlines.bot_ids():
+                try:
+                    bot = await self.db.get_bot(bot_id)
+                    if not bot or bot.status != 'running': continue
+                    new_power = self._charge_power(bot, now, used.get(bot_id))
+                    if new_power != bot.power_remaining:
+                        await self.db.buffer_bot_resources(bot_id, power_remaining=new_power)
+                    if new_power == 0.0:
+                        await self._expire(bot, application)
+                except Exception as e:
+                    logger.warning("Power accounting failed for bot %s: %s", bot_id, e)
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(DB_FLUSH_INTERVAL)
             try:
-                running = self.db.get_all_running_bots()
-                now = time.time()
-                for bot in running:
-                    bot_id = bot[0]
-                    remaining = bot[11] or 0
-                    power = bot[13] or 0.0
-                    last_checked = bot[14]
-                    warned_low = bot[20]
-
-                    try:
-                        last_ts = int(datetime.fromisoformat(last_checked).timestamp())
-                    except Exception:
-                        last_ts = int(now)
-                    elapsed = int(now - last_ts)
-                    if elapsed <= 0: continue
-
-                    cpu, _ = self.get_bot_usage(bot_id)
-                    drain_factor = self.power_drain_factor
-                    if cpu < 2.0: drain_factor *= 0.2
-
-                    new_remaining = max(0, int(remaining - elapsed))
-                    power_drain = (cpu / 100.0) * elapsed * drain_factor
-                    new_power = max(0.0, float(power - power_drain))
-
-                    self.db.update_bot_resources(bot_id, remaining_seconds=new_remaining, power_remaining=new_power, last_checked=datetime.utcnow().isoformat())
-
-                    if new_remaining > 0 and new_remaining <= 600 and not warned_low:
-                        try:
-                            await application.bot.send_message(chat_id=bot[1], text=f"⚠️ تنبيه: البوت {bot[3]} سيتوقف خلال {seconds_to_human(new_remaining)}. يرجى إضافة وقت لتجنب السكون.")
-                            import sqlite3
-                            with sqlite3.connect(self.db.db_file) as conn:
-                                conn.execute("UPDATE bots SET warned_low = 1 WHERE id = ?", (bot_id,))
-                        except Exception: pass
-
-                    if new_remaining == 0 or new_power == 0.0:
-                        self.db.set_sleep_mode(bot_id, True, reason="expired")
-                        try:
-                            await application.bot.send_message(chat_id=bot[1], text=f"⚠️ البوت {bot[3]} دخل وضع السكون بسبب نفاد الوقت أو الطاقة.")
-                        except Exception: pass
-                        self.stop_bot(bot_id)
-            except Exception: pass
-            await asyncio.sleep(30)
+                await self.db.flush_bot_resources()
+            except Exception as e:
+                logger.warning("Failed to flush buffered bot resources: %s", e)
+
+    async def _prune_loop(self):
+        while True:
+            await asyncio.sleep(ERROR_LOG_PRUNE_INTERVAL)
+            try:
+                deleted = await self.db.prune_error_logs()
+                if deleted: logger.info("Pruned %s error_logs rows", deleted)
+            except Exception as e:
+                logger.warning("Failed to prune error logs: %s", e)
 
     async def start_background_tasks(self, application):
         if self._enforce_task is None:
             self._enforce_task = application.create_task(self._enforce_loop(application))
+        if self._power_task is None:
+            self._power_task = application.create_task(self._power_loop(application))
+        if self._flush_task is None:
+            self._flush_task = application.create_task(self._flush_loop())
+        if self._prune_task is None:
+            self._prune_task = application.create_task(self._prune_loop())
+        self.host_stats.start(application)
+        self.usage.start(application)
+        self.logs.start(application)
+        if self.zygote is not None and self._zygote_task is None:
+            self._zygote_task = application.create_task(self._start_zygote())
+
+    async def _start_zygote(self):
+        try:
+            await self.zygote.start()
+        except Exception as e:
+            logger.warning("Zygote unavailable (%s); bots start with Popen", e)
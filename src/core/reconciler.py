@@ -0,0 +1,137 @@
+import os
+import signal
+import logging
+from collections import namedtuple
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+logger = logging.getLogger(__name__)
+
+# What the host knows about a pid a bot row points at
+ProcessInfo = namedtuple('ProcessInfo', 'pid create_time cmdline cwd')
+
+# Slack between the recorded launch time and the kernel's start time (jiffy rounding, clock steps)
+_START_TIME_SLACK = 1.0
+
+def process_start_time(pid):
+    """Kernel start time of `pid` as an epoch timestamp; None when it cannot be read."""
+    if psutil is None: return None
+    try:
+        return psutil.Process(pid).create_time()
+    except (psutil.Error, OSError):
+        return None
+
+def _read_proc(pid):
+    # psutil-less fallback: enough of /proc to recognise the bot, no start time
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return None
+    except PermissionError:
+        pass
+    try:
+        with open(f"/proc/{pid}/stat", 'rb') as f:
+            stat = f.read()
+        if stat[stat.rfind(b')') + 2:][:1] == b'Z':
+            return None
+        with open(f"/proc/{pid}/cmdline", 'rb') as f:
+            cmdline = [a.decode(errors='replace') for a in f.read().split(b'\0') if a]
+        cwd = os.readlink(f"/proc/{pid}/cwd")
+    except OSError:
+        return None
+    return ProcessInfo(pid, None, cmdline, cwd)
+
+def scan_processes(pids):
+    """{pid: ProcessInfo} for the live (non-zombie) processes among `pids`, in one pass over the process table."""
+    wanted = set(pids)
+    found = {}
+    if not wanted: return found
+    if psutil is None:
+        for pid in wanted:
+            info = _read_proc(pid)
+            if info: found[pid] = info
+        return found
+    for proc in psutil.process_iter():
+        if proc.pid not in wanted: continue
+        try:
+            with proc.oneshot():
+                if proc.status() == psutil.STATUS_ZOMBIE: continue
+                create_time = proc.create_time()
+                cmdline = proc.cmdline()
+                try:
+                    cwd = proc.cwd()
+                except (psutil.AccessDenied, OSError):
+                    cwd = None
+        except (psutil.Error, OSError):
+            continue
+        found[proc.pid] = ProcessInfo(proc.pid, create_time, cmdline, cwd)
+    return found
+
+def is_bot_process(bot, info, bot_path):
+    """Whether `info` is the process this bot row launched rather than a pid reuse."""
+    timed = bool(bot.launched_at) and info.create_time is not None
+    if timed and abs(info.create_time - bot.launched_at) > _START_TIME_SLACK:
+        return False
+    in_folder = bool(info.cwd) and os.path.realpath(info.cwd) == os.path.realpath(bot_path)
+    script = os.path.join(bot_path, bot.main_file or 'main.py')
+    runs_script = any(arg == bot.main_file or os.path.abspath(os.path.join(bot_path, arg)) == script for arg in info.cmdline[1:2])
+    if not timed:
+        # Without a start time to compare (rows from before migration 5) any process sitting in
+        # the bot folder would match, and an adopted process is later signalled as a group
+        return in_folder and runs_script
+    # Zygote-forked bots keep the fork server's cmdline, so cwd is the primary signal
+    return in_folder or runs_script
+
+def find_survivors(bots, bots_dir):
+    """{bot_id: ProcessInfo} for the DB-running bots whose recorded pid is still that bot."""
+    candidates = [bot for bot in bots if bot.pid]
+    infos = scan_processes(bot.pid for bot in candidates)
+    survivors = {}
+    for bot in candidates:
+        info = infos.get(bot.pid)
+        if info and is_bot_process(bot, info, os.path.abspath(os.path.join(bots_dir, bot.folder))):
+            survivors[bot.id] = info
+    return survivors
+
+class ExternalProcess:
+    """Popen-like handle for a bot that outlived the NeuroHost process that started it.
+
+    It is not our child, so there is no exit status to collect: `poll()` only
+    tells that the process is gone (or a zombie, or its pid now names another
+    process) and reports -1.
+    """
+
+    def __init__(self, pid, create_time=None):
+        self.pid = pid
+        self.create_time = create_time
+        self.returncode = None
+
+    def poll(self):
+        if self.returncode is None and not self._alive():
+            self.returncode = -1
+        return self.returncode
+
+    def _alive(self):
+        if psutil is None:
+            return _read_proc(self.pid) is not None
+        try:
+            proc = psutil.Process(self.pid)
+            if self.create_time is not None and abs(proc.create_time() - self.create_time) > _START_TIME_SLACK:
+                return False
+            return proc.status() != psutil.STATUS_ZOMBIE
+        except psutil.NoSuchProcess:
+            return False
+        except psutil.Error:
+            return True
+
+    def send_signal(self, sig):
+        if self.poll() is None:
+            os.kill(self.pid, sig)
+
+    def terminate(self):
+        self.send_signal(signal.SIGTERM)
+
+    def kill(self):
+        self.send_signal(signal.SIGKILL)
@@ -0,0 +1,64 @@
+import time
+import random
+from collections import deque
+
+class RestartPolicy:
+    """Sliding-window restart budget with exponential backoff for crashing bots.
+
+    Each automatic restart is timestamped; only the ones inside the last
+    `window` seconds count. The n-th restart in the window waits
+    `base * 2**n` seconds (capped at `max_delay`), jittered down by up to half
+    so bots that crashed together do not come back together. Once `limit`
+    restarts are in the window the bot is given up on. A run that stayed up
+    for `healthy_uptime` seconds clears the bot's history.
+    """
+
+    def __init__(self, limit=5, window=3600, base=5.0, max_delay=600.0, healthy_uptime=300.0, clock=time.monotonic):
+        self.limit = limit
+        self.window = window
+        self.base = base
+        self.max_delay = max_delay
+        self.healthy_uptime = healthy_uptime
+        self.clock = clock
+        self._restarts = {}  # bot_id -> deque of restart times
+        self._started = {}  # bot_id -> start time of the current run
+
+    def started(self, bot_id, uptime=0.0):
+        """Mark the start of a run; `uptime` is how long it has already been running (adopted bots)."""
+        self._started[bot_id] = self.clock() - max(0.0, uptime)
+
+    def exited(self, bot_id):
+        """Uptime of the run that just ended (None if unknown); a healthy run resets the history."""
+        started = self._started.pop(bot_id, None)
+        if started is None: return None
+        uptime = self.clock() - started
+        if uptime >= self.healthy_uptime:
+            self._restarts.pop(bot_id, None)
+        return uptime
+
+    def recent(self, bot_id):
+        """Restarts of the bot inside the window."""
+        history = self._restarts.get(bot_id)
+        if not history: return 0
+        horizon = self.clock() - self.window
+        while history and history[0] < horizon:
+            history.popleft()
+        return len(history)
+
+    def next_delay(self, bot_id):
+        """Seconds to wait before the next automatic restart; None once the window's budget is spent."""
+        attempts = self.recent(bot_id)
+        if attempts >= self.limit:
+            return None
+        delay = min(self.max_delay, self.base * (2 ** attempts))
+        return random.uniform(delay / 2, delay)
+
+    def record_restart(self, bot_id):
+        self._restarts.setdefault(bot_id, deque()).append(self.clock())
+
+    def reset(self, bot_id):
+        self._restarts.pop(bot_id, None)
+
+    def forget(self, bot_id):
+        self._restarts.pop(bot_id, None)
+        self._started.pop(bot_id, None)
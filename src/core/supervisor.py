@@ -0,0 +1,109 @@
+import os
+import asyncio
+import logging
+
+from src.config.config import SUPERVISOR_POLL_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+class ProcessSupervisor:
+    """Single watcher that reports hosted-bot exits as events.
+
+    On Linux each watched process gets a pidfd registered with the event loop,
+    which becomes readable the moment the process exits, so nothing runs while
+    bots are idle. Where pidfds are unavailable, one shared task polls every
+    watched process instead of one timer per bot.
+    """
+
+    def __init__(self, poll_interval=SUPERVISOR_POLL_INTERVAL):
+        self.poll_interval = poll_interval
+        self._use_pidfd = hasattr(os, 'pidfd_open')
+        self._watched = {}  # pid -> (bot_id, process, callback, pidfd)
+        self._poll_task = None
+        self._tasks = set()
+        self._waiters = {}  # pid -> [Future] resolved with the exit code
+
+    def watch(self, bot_id, process, callback):
+        """Call `await callback(bot_id, process, returncode)` once `process` exits."""
+        loop = asyncio.get_running_loop()
+        if hasattr(process, 'notify_exit'):
+            # Zygote-forked bots are not our children; their exit status arrives as an event
+            self._watched[process.pid] = (bot_id, process, callback, -1)
+            process.notify_exit(lambda: self._dispatch(process.pid))
+            return
+        fd = None
+        if self._use_pidfd:
+            try:
+                fd = os.pidfd_open(process.pid)
+            except ProcessLookupError:
+                fd = None
+            except OSError as e:
+                # Kernel without pidfd support (< 5.3) or seccomp; fall back for good
+                logger.info("pidfd unavailable (%s); supervising by polling", e)
+                self._use_pidfd = False
+        self._watched[process.pid] = (bot_id, process, callback, fd)
+        if fd is not None:
+            loop.add_reader(fd, self._dispatch, process.pid)
+        elif self._poll_task is None or self._poll_task.done():
+            self._poll_task = loop.create_task(self._poll_loop())
+        # The child may already have exited before the pidfd was opened
+        if process.poll() is not None:
+            self._dispatch(process.pid)
+
+    async def wait(self, process, timeout=None):
+        """Exit code of `process` once it exits; None if it is still running after `timeout` seconds."""
+        loop = asyncio.get_running_loop()
+        if process.pid not in self._watched:
+            deadline = None if timeout is None else loop.time() + timeout
+            while process.poll() is None:
+                if deadline is not None and loop.time() >= deadline:
+                    return None
+                await asyncio.sleep(min(0.1, self.poll_interval))
+            return process.poll()
+        fut = loop.create_future()
+        waiters = self._waiters.setdefault(process.pid, [])
+        waiters.append(fut)
+        try:
+            return await asyncio.wait_for(fut, timeout)
+        except asyncio.TimeoutError:
+            return None
+        finally:
+            if fut in waiters: waiters.remove(fut)
+            if not waiters: self._waiters.pop(process.pid, None)
+
+    def unwatch(self, process):
+        entry = self._watched.pop(process.pid, None)
+        if entry: self._close_fd(entry[3])
+
+    def watched_count(self):
+        return len(self._watched)
+
+    def _close_fd(self, fd):
+        if fd is None or fd < 0: return
+        try:
+            asyncio.get_running_loop().remove_reader(fd)
+        except Exception: pass
+        try:
+            os.close(fd)
+        except OSError: pass
+
+    def _dispatch(self, pid):
+        entry = self._watched.get(pid)
+        if entry is None: return
+        bot_id, process, callback, fd = entry
+        code = process.poll()  # reaps the child
+        if code is None: return
+        del self._watched[pid]
+        self._close_fd(fd)
+        for fut in self._waiters.pop(pid, ()):
+            if not fut.done(): fut.set_result(code)
+        task = asyncio.get_running_loop().create_task(callback(bot_id, process, code))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _poll_loop(self):
+        while any(fd is None for _, _, _, fd in self._watched.values()):
+            await asyncio.sleep(self.poll_interval)
+            for pid, (_, process, _, fd) in list(self._watched.items()):
+                if fd is None and process.poll() is not None:
+                    self._dispatch(pid)
@@ -0,0 +1,103 @@
+import os
+import time
+import asyncio
+import logging
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+from src.config.config import BOT_STATS_INTERVAL
+from src.core.cgroups import read_cpu_seconds, read_memory_bytes
+
+logger = logging.getLogger(__name__)
+
+class BotUsageSampler:
+    """Per-bot CPU/memory, sampled for every hosted bot in one background pass.
+
+    Bots are started with `setsid`, so each one leads its own process group and
+    everything it spawns stays in that group. Each tick walks the host process
+    table once (psutil keeps the `Process` handles between iterations, so CPU
+    percentages are deltas since the previous tick and nothing sleeps), sums
+    CPU% and RSS per tracked group and publishes a fresh snapshot. Readers only
+    ever look at the published dict. Bots running in their own cgroup are read
+    from its cpu.stat / memory.current instead of the process table.
+    """
+
+    def __init__(self, interval=BOT_STATS_INTERVAL):
+        self.interval = interval
+        self._groups = {}  # pgid -> bot_id
+        self._pgids = {}  # bot_id -> pgid
+        self._cgroups = {}  # bot_id -> cgroup path
+        self._cg_last = {}  # bot_id -> (cpu_seconds, ts) at the previous tick
+        self._snapshot = {}  # bot_id -> (cpu_percent, rss_mb, ts)
+        self._task = None
+
+    def track(self, bot_id, pid, cgroup=None):
+        # Every bot leads its own group, so its pgid is its pid. Asking the kernel would race
+        # a zygote-forked child that has not called setsid yet and return the zygote's group.
+        pgid = pid
+        self.untrack(bot_id)
+        self._pgids[bot_id] = pgid
+        if cgroup:
+            self._cgroups[bot_id] = cgroup
+        else:
+            self._groups[pgid] = bot_id
+
+    def untrack(self, bot_id):
+        pgid = self._pgids.pop(bot_id, None)
+        if pgid is not None and self._groups.get(pgid) == bot_id:
+            del self._groups[pgid]
+        self._cgroups.pop(bot_id, None)
+        self._cg_last.pop(bot_id, None)
+        self._snapshot.pop(bot_id, None)
+
+    def usage(self, bot_id):
+        """(cpu_percent, rss_mb) from the last tick; (0, 0) for untracked bots."""
+        entry = self._snapshot.get(bot_id)
+        return (entry[0], entry[1]) if entry else (0, 0)
+
+    def snapshot(self):
+        return self._snapshot
+
+    def sample(self, groups, cgroups=None):
+        totals = {}
+        now = time.time()
+        for bot_id, path in (cgroups or {}).items():
+            cpu_s, mem = read_cpu_seconds(path), read_memory_bytes(path)
+            if cpu_s is None or mem is None: continue
+            prev = self._cg_last.get(bot_id)
+            self._cg_last[bot_id] = (cpu_s, now)
+            cpu = 100.0 * (cpu_s - prev[0]) / (now - prev[1]) if prev and now > prev[1] else 0.0
+            totals[bot_id] = [max(0.0, cpu), mem]
+        if not groups:
+            return {bot_id: (round(cpu, 1), rss / 1024 / 1024, now) for bot_id, (cpu, rss) in totals.items()}
+        for proc in psutil.process_iter():
+            try:
+                bot_id = groups.get(os.getpgid(proc.pid))
+                if bot_id is None: continue
+                with proc.oneshot():
+                    cpu = proc.cpu_percent(interval=None)
+                    rss = proc.memory_info().rss
+            except (psutil.Error, OSError):
+                continue
+            acc = totals.setdefault(bot_id, [0.0, 0])
+            acc[0] += cpu
+            acc[1] += rss
+        return {bot_id: (round(cpu, 1), rss / 1024 / 1024, now) for bot_id, (cpu, rss) in totals.items()}
+
+    async def _loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                if self._groups or self._cgroups:
+                    # The /proc walk runs off the event loop; publish only still-tracked bots
+                    fresh = await loop.run_in_executor(None, self.sample, dict(self._groups), dict(self._cgroups))
+                    self._snapshot = {bot_id: v for bot_id, v in fresh.items() if bot_id in self._pgids}
+            except Exception as e:
+                logger.warning("Bot usage sampling failed: %s", e)
+            await asyncio.sleep(self.interval)
+
+    def start(self, application):
+        if self._task is None and psutil:
+            self._task = application.create_task(self._loop())
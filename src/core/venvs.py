@@ -0,0 +1,132 @@
+import os
+import sys
+import shutil
+import hashlib
+import asyncio
+import logging
+
+from src.config.config import VENV_DIR, PIP_CACHE_DIR, VENV_BUILD_CONCURRENCY, VENV_BUILD_TIMEOUT
+
+logger = logging.getLogger(__name__)
+
+READY_MARKER = '.ready'
+
+class EnvBuildError(Exception):
+    pass
+
+def normalize_requirements(text):
+    """Requirement lines without comments, blanks or ordering differences."""
+    lines = set()
+    for line in text.splitlines():
+        line = line.split(' #', 1)[0].strip()
+        if line and not line.startswith('#'):
+            lines.add(' '.join(line.split()))
+    return sorted(lines)
+
+_LOCAL_OPTIONS = ('-r', '-c', '-e', '--requirement', '--constraint', '--editable')
+
+def refers_to_local_files(line):
+    """Whether a requirement line points at files next to requirements.txt (nested files, local packages)."""
+    if line.startswith(_LOCAL_OPTIONS) or line.startswith(('.', '/', 'file:')):
+        return True
+    return '://' not in line and line.endswith(('.whl', '.tar.gz', '.zip'))
+
+class EnvManager:
+    """Content-addressed virtualenvs shared by every bot with the same requirements.
+
+    An env lives in `VENV_DIR/<hash>`, where the hash covers the normalized
+    requirements and the host interpreter version, and is usable once its
+    `.ready` marker exists. Concurrent requests for one hash share a single
+    build, builds are capped at VENV_BUILD_CONCURRENCY and pip uses one shared
+    cache. pip installs from the bot's own requirements.txt, run in the bot's
+    folder, so relative references resolve; since their contents are not part
+    of the hash, requirements with such references get an env of their own. Envs see the host's site-packages, as bots did when pip installed
+    into the host interpreter. Bots without requirements run on the host
+    interpreter.
+    """
+
+    def __init__(self, root=VENV_DIR, pip_cache=PIP_CACHE_DIR, concurrency=VENV_BUILD_CONCURRENCY, timeout=VENV_BUILD_TIMEOUT):
+        self.root = os.path.abspath(root)
+        self.pip_cache = os.path.abspath(pip_cache)
+        self.timeout = timeout
+        self._builds = {}  # hash -> Task
+        self._slots = asyncio.Semaphore(max(1, concurrency))
+
+    def env_key(self, bot_path):
+        """(hash, requirement lines) for the bot's requirements.txt; (None, None) if there is nothing to install."""
+        try:
+            with open(os.path.join(bot_path, 'requirements.txt'), encoding='utf-8', errors='replace') as f:
+                reqs = normalize_requirements(f.read())
+        except FileNotFoundError:
+            return None, None
+        if not reqs:
+            return None, None
+        digest = hashlib.sha256()
+        digest.update(f"{sys.version_info[0]}.{sys.version_info[1]}\0{os.path.realpath(sys.executable)}\0".encode())
+        digest.update('\n'.join(reqs).encode('utf-8'))
+        if any(refers_to_local_files(line) for line in reqs):
+            digest.update(b'\0' + os.path.realpath(bot_path).encode('utf-8'))
+        return digest.hexdigest()[:16], reqs
+
+    def env_path(self, key):
+        return os.path.join(self.root, key)
+
+    def python_for(self, key):
+        if key is None: return sys.executable
+        bin_dir = 'Scripts' if os.name == 'nt' else 'bin'
+        return os.path.join(self.env_path(key), bin_dir, 'python.exe' if os.name == 'nt' else 'python')
+
+    def is_ready(self, bot_path):
+        key, _ = self.env_key(bot_path)
+        return key is None or os.path.exists(os.path.join(self.env_path(key), READY_MARKER))
+
+    async def ensure(self, bot_path):
+        """Interpreter to launch the bot with, building its env first if needed."""
+        key, reqs = self.env_key(bot_path)
+        if key is None:
+            return sys.executable
+        if os.path.exists(os.path.join(self.env_path(key), READY_MARKER)):
+            return self.python_for(key)
+        task = self._builds.get(key)
+        if task is None:
+            task = asyncio.get_running_loop().create_task(self._build(key, reqs, bot_path))
+            self._builds[key] = task
+            task.add_done_callback(lambda _t, k=key: self._builds.pop(k, None))
+        # One caller giving up must not cancel the build for the others
+        await asyncio.shield(task)
+        return self.python_for(key)
+
+    async def _run(self, log, *cmd, cwd=None):
+        proc = await asyncio.create_subprocess_exec(*cmd, stdout=log, stderr=asyncio.subprocess.STDOUT, cwd=cwd)
+        try:
+            code = await asyncio.wait_for(proc.wait(), self.timeout)
+        except asyncio.TimeoutError:
+            proc.kill()
+            await proc.wait()
+            raise EnvBuildError(f"{os.path.basename(cmd[0])} timed out after {self.timeout}s")
+        if code != 0:
+            raise EnvBuildError(f"{' '.join(cmd[1:4])} exited with code {code}")
+
+    async def _build(self, key, reqs, bot_path):
+        path = self.env_path(key)
+        async with self._slots:
+            if os.path.exists(os.path.join(path, READY_MARKER)):
+                return
+            loop = asyncio.get_running_loop()
+            # Leftovers of an interrupted build are never trusted
+            await loop.run_in_executor(None, shutil.rmtree, path, True)
+            os.makedirs(path)
+            os.makedirs(self.pip_cache, exist_ok=True)
+            bot_path = os.path.abspath(bot_path)
+            logger.info("Building env %s for %d requirement(s)", key, len(reqs))
+            try:
+                with open(os.path.join(path, 'build.log'), 'wb') as log:
+                    await self._run(log, sys.executable, '-m', 'venv', '--system-site-packages', path)
+                    await self._run(log, self.python_for(key), '-m', 'pip', 'install', '--disable-pip-version-check',
+                                    '--cache-dir', self.pip_cache, '-r', os.path.join(bot_path, 'requirements.txt'), cwd=bot_path)
+            except Exception:
+                logger.warning("Env %s failed to build; see %s", key, os.path.join(path, 'build.log'))
+                raise
+            with open(os.path.join(path, READY_MARKER), 'w') as f:
+                f.write('ok\n')
+            logger.info("Env %s ready", key)
@@ -0,0 +1,190 @@
+import os
+import sys
+import json
+import signal
+import socket
+import asyncio
+import itertools
+import subprocess
+import logging
+
+from src.config.config import ZYGOTE_PRELOAD, ZYGOTE_START_TIMEOUT
+
+logger = logging.getLogger(__name__)
+
+SERVER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'zygote_server.py')
+
+class ZygoteProcess:
+    """Popen-like handle for a bot forked by the zygote.
+
+    The zygote is the bot's parent, so the exit status arrives as an event from
+    it instead of from waitpid; `notify_exit` lets the supervisor react to it.
+    """
+
+    def __init__(self, pid):
+        self.pid = pid
+        self.returncode = None
+        self._callbacks = []
+
+    def poll(self):
+        return self.returncode
+
+    def notify_exit(self, callback):
+        if self.returncode is not None:
+            asyncio.get_running_loop().call_soon(callback)
+        else:
+            self._callbacks.append(callback)
+
+    def send_signal(self, sig):
+        if self.returncode is None:
+            os.kill(self.pid, sig)
+
+    def terminate(self):
+        self.send_signal(signal.SIGTERM)
+
+    def kill(self):
+        self.send_signal(signal.SIGKILL)
+
+    def _set_exit(self, code):
+        if self.returncode is not None: return
+        self.returncode = code
+        callbacks, self._callbacks = self._callbacks, []
+        for cb in callbacks:
+            try:
+                cb()
+            except Exception as e:
+                logger.warning("Exit callback for pid %s failed: %s", self.pid, e)
+
+class ZygoteClient:
+    """Keeps one warm fork server (src/core/zygote_server.py) and spawns bots through it.
+
+    The server preloads ZYGOTE_PRELOAD once; every bot is then a fork of that
+    interpreter instead of a cold `python main.py`. If the server dies, bots it
+    started keep running and are watched by pid until they exit, and new starts
+    go back to Popen.
+    """
+
+    def __init__(self, preload=ZYGOTE_PRELOAD):
+        self.preload = preload
+        self.preloaded = []
+        self._proc = None
+        self._sock = None
+        self._buf = b''
+        self._ids = itertools.count(1)
+        self._pending = {}  # request id -> Future
+        self._children = {}  # pid -> ZygoteProcess
+        self._ready = None
+        self._orphan_task = None
+
+    @property
+    def alive(self):
+        return self._sock is not None and self._ready is not None and self._ready.done() and not self._ready.cancelled() and self._ready.exception() is None
+
+    async def start(self, timeout=ZYGOTE_START_TIMEOUT):
+        loop = asyncio.get_running_loop()
+        parent, child = socket.socketpair()
+        try:
+            self._proc = subprocess.Popen(
+                [sys.executable, SERVER_PATH, str(child.fileno()), ','.join(self.preload)],
+                pass_fds=(child.fileno(),), start_new_session=True
+            )
+        finally:
+            child.close()
+        parent.setblocking(False)
+        self._sock = parent
+        self._ready = loop.create_future()
+        loop.add_reader(parent.fileno(), self._on_readable)
+        try:
+            await asyncio.wait_for(asyncio.shield(self._ready), timeout)
+        except Exception:
+            self.close()
+            raise
+        logger.info("Zygote %s ready (preloaded: %s)", self._proc.pid, ', '.join(self.preloaded) or 'nothing')
+
+    async def spawn(self, argv, cwd, env, stdout, stderr, cgroup_procs=None, mem_limit=None):
+        if not self.alive:
+            raise ConnectionError("zygote is not running")
+        req_id = next(self._ids)
+        fut = asyncio.get_running_loop().create_future()
+        self._pending[req_id] = fut
+        msg = {'id': req_id, 'argv': list(argv), 'cwd': cwd, 'env': dict(env), 'stdout': stdout, 'stderr': stderr,
+               'cgroup_procs': cgroup_procs, 'mem_limit': mem_limit}
+        try:
+            await asyncio.get_running_loop().sock_sendall(self._sock, json.dumps(msg).encode() + b"\n")
+            return await asyncio.wait_for(fut, 10)
+        finally:
+            self._pending.pop(req_id, None)
+
+    def _on_readable(self):
+        while True:
+            try:
+                data = self._sock.recv(65536)
+            except BlockingIOError:
+                break
+            except OSError:
+                data = b''
+            if not data:
+                self._lost()
+                return
+            self._buf += data
+        while b'\n' in self._buf:
+            line, self._buf = self._buf.split(b'\n', 1)
+            try:
+                self._handle(json.loads(line))
+            except Exception as e:
+                logger.warning("Bad message from zygote: %s", e)
+
+    def _handle(self, msg):
+        event = msg.get('event')
+        if event == 'exit':
+            handle = self._children.pop(msg['pid'], None)
+            if handle: handle._set_exit(msg['code'])
+        elif event == 'ready':
+            self.preloaded = msg.get('preloaded', [])
+            if not self._ready.done(): self._ready.set_result(True)
+        else:
+            fut = self._pending.get(msg.get('id'))
+            if fut is None or fut.done(): return
+            if 'error' in msg:
+                fut.set_exception(OSError(msg['error']))
+            else:
+                # Registered here, not in spawn(), so an exit right behind this reply is not missed
+                handle = ZygoteProcess(msg['pid'])
+                self._children[handle.pid] = handle
+                fut.set_result(handle)
+
+    def _lost(self):
+        if self._sock is None: return
+        logger.warning("Zygote exited; falling back to Popen for new bots")
+        self.close()
+        if self._children and self._orphan_task is None:
+            self._orphan_task = asyncio.get_running_loop().create_task(self._watch_orphans())
+
+    async def _watch_orphans(self):
+        # Their parent is gone, so no exit status will come; report them once the pid disappears
+        while self._children:
+            await asyncio.sleep(1)
+            for pid, handle in list(self._children.items()):
+                try:
+                    os.kill(pid, 0)
+                except ProcessLookupError:
+                    del self._children[pid]
+                    handle._set_exit(-1)
+                except PermissionError:
+                    pass
+        self._orphan_task = None
+
+    def close(self):
+        if self._sock is not None:
+            try:
+                asyncio.get_running_loop().remove_reader(self._sock.fileno())
+            except Exception: pass
+            self._sock.close()
+            self._sock = None
+        if self._ready is not None and not self._ready.done():
+            self._ready.set_exception(ConnectionError("zygote exited"))
+            self._ready.exception()  # mark retrieved
+        for fut in self._pending.values():
+            if not fut.done(): fut.set_exception(ConnectionError("zygote exited"))
+        if self._proc is not None and self._proc.poll() is None:
+            self._proc.terminate()
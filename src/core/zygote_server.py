@@ -0,0 +1,149 @@
+"""Warm fork server for hosted bots.
+
+Run by `src.core.zygote.ZygoteClient` as a standalone script (it deliberately
+imports nothing from NeuroHost, so forked bots never see our modules). It
+preloads the modules named on the command line, then serves JSON-line requests
+on the inherited socket:
+
+    -> {"id": 1, "argv": [...], "cwd": ..., "env": {...}, "stdout": ..., "stderr": ...,
+        "cgroup_procs": ... or null, "mem_limit": ... or null}
+    <- {"id": 1, "pid": 1234}                      (or {"id": 1, "error": "..."})
+    <- {"event": "exit", "pid": 1234, "code": 0}   (whenever a child exits)
+
+Each child gets its own session, optional cgroup/rlimit, cwd, environment and
+log files, then runs argv[0] as __main__. The server exits when the client
+closes the socket; children keep running, as Popen-started bots do.
+"""
+import os
+import sys
+import json
+import errno
+import runpy
+import select
+import signal
+import socket
+import importlib
+import traceback
+try:
+    import resource
+except ImportError:
+    resource = None
+
+def _send(sock, msg):
+    sock.sendall(json.dumps(msg).encode() + b"\n")
+
+def _enter_limits(procs_file, mem_limit):
+    # Same policy as CgroupManager.preexec_fn: join the cgroup, else cap address space
+    if procs_file:
+        try:
+            fd = os.open(procs_file, os.O_WRONLY)
+            try:
+                os.write(fd, b"0")
+            finally:
+                os.close(fd)
+            return
+        except OSError:
+            pass
+    if mem_limit and resource is not None:
+        resource.setrlimit(resource.RLIMIT_AS, (mem_limit, mem_limit))
+
+def _run_child(req, close_fds):
+    code = 1
+    try:
+        signal.set_wakeup_fd(-1)
+        for sig in (signal.SIGCHLD, signal.SIGINT, signal.SIGTERM, signal.SIGPIPE):
+            signal.signal(sig, signal.SIG_DFL)
+        for fd in close_fds:
+            os.close(fd)
+        os.setsid()
+        _enter_limits(req.get('cgroup_procs'), req.get('mem_limit'))
+        os.chdir(req['cwd'])
+        devnull = os.open(os.devnull, os.O_RDONLY)
+        os.dup2(devnull, 0)
+        for target, path in ((1, req['stdout']), (2, req['stderr'])):
+            fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+            os.dup2(fd, target)
+            os.close(fd)
+        os.close(devnull)
+        os.environ.clear()
+        os.environ.update(req['env'])
+        sys.argv = list(req['argv'])
+        sys.path[0] = req['cwd']
+        runpy.run_path(req['argv'][0], run_name='__main__')
+        code = 0
+    except SystemExit as e:
+        if e.code is None:
+            code = 0
+        elif isinstance(e.code, int):
+            code = e.code
+        else:
+            print(e.code, file=sys.stderr)
+            code = 1
+    except BaseException:
+        traceback.print_exc()
+        code = 1
+    finally:
+        try:
+            sys.stdout.flush()
+            sys.stderr.flush()
+        finally:
+            os._exit(code)
+
+def _reap(sock):
+    while True:
+        try:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            return
+        if pid == 0:
+            return
+        _send(sock, {'event': 'exit', 'pid': pid, 'code': os.waitstatus_to_exitcode(status)})
+
+def serve(fd, preload):
+    sock = socket.socket(fileno=fd)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    loaded = []
+    for name in preload:
+        try:
+            importlib.import_module(name)
+            loaded.append(name)
+        except Exception:
+            pass
+    wake_r, wake_w = os.pipe()
+    os.set_blocking(wake_r, False)
+    os.set_blocking(wake_w, False)
+    signal.set_wakeup_fd(wake_w)
+    signal.signal(signal.SIGCHLD, lambda *_: None)
+    _send(sock, {'event': 'ready', 'preloaded': loaded})
+    buf = b''
+    while True:
+        try:
+            readable, _, _ = select.select([sock, wake_r], [], [])
+        except InterruptedError:
+            continue
+        if wake_r in readable:
+            try:
+                while os.read(wake_r, 512): pass
+            except BlockingIOError:
+                pass
+        _reap(sock)
+        if sock not in readable:
+            continue
+        data = sock.recv(65536)
+        if not data:
+            return
+        buf += data
+        while b'\n' in buf:
+            line, buf = buf.split(b'\n', 1)
+            req = json.loads(line)
+            try:
+                pid = os.fork()
+            except OSError as e:
+                _send(sock, {'id': req['id'], 'error': os.strerror(e.errno or errno.EAGAIN)})
+                continue
+            if pid == 0:
+                _run_child(req, (sock.fileno(), wake_r, wake_w))
+            _send(sock, {'id': req['id'], 'pid': pid})
+
+if __name__ == '__main__':
+    serve(int(sys.argv[1]), [m for m in sys.argv[2].split(',') if m] if len(sys.argv) > 2 else [])
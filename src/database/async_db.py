@@ -0,0 +1,87 @@
+import asyncio
+import functools
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from src.config.config import DB_READ_WORKERS
+
+logger = logging.getLogger(__name__)
+
+class AsyncDatabase:
+    """Awaitable facade over `Database`.
+
+    Every public `Database` method is exposed as a coroutine with the same name
+    and arguments. Writes are funnelled through a single dedicated thread so they
+    execute in submission order and never fight each other for the SQLite write
+    lock; reads run on a small pool and proceed in parallel thanks to WAL.
+    """
+
+    READ_METHODS = frozenset({
+        'get_user', 'get_pending_users', 'get_user_bots', 'get_bot',
+        'get_bot_logs', 'get_all_running_bots', 'can_user_recover',
+        'get_user_plan', 'get_user_auth', 'get_system_stats', 'find_bots',
+    })
+
+    # Memory-only operations that are cheap enough to run directly on the loop
+    INLINE_METHODS = frozenset({
+        'buffer_bot_resources', 'get_cached_bot', 'get_bot_version', 'get_cache_stats',
+        'peek_user_auth', 'count_pending_users', 'get_auth_cache_stats',
+    })
+
+    def __init__(self, db, read_workers=DB_READ_WORKERS):
+        self.db = db
+        self.db_file = db.db_file
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="neurohost-db-writer")
+        self._readers = ThreadPoolExecutor(max_workers=max(1, read_workers), thread_name_prefix="neurohost-db-reader")
+
+    def __getattr__(self, name):
+        attr = getattr(self.db, name)
+        if name.startswith('_') or not callable(attr):
+            return attr
+        executor = self._readers if name in self.READ_METHODS else self._writer
+
+        if name in self.INLINE_METHODS:
+            @functools.wraps(attr)
+            async def call(*args, **kwargs):
+                return attr(*args, **kwargs)
+        else:
+            @functools.wraps(attr)
+            async def call(*args, **kwargs):
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(executor, functools.partial(attr, *args, **kwargs))
+
+        # Cache the wrapper so later lookups skip __getattr__
+        setattr(self, name, call)
+        return call
+
+    async def get_bot(self, bot_id):
+        # Cache hits are answered on the loop without a thread hop
+        row = self.db.get_cached_bot(bot_id)
+        if row is not None:
+            return row
+        return await asyncio.get_running_loop().run_in_executor(self._readers, self.db.get_bot, bot_id)
+
+    async def get_user_auth(self, user_id):
+        auth = self.db.peek_user_auth(user_id)
+        if auth is not None:
+            return auth
+        return await asyncio.get_running_loop().run_in_executor(self._readers, self.db.get_user_auth, user_id)
+
+    async def get_user_plan(self, user_id):
+        auth = await self.get_user_auth(user_id)
+        return (auth.plan if auth else None) or 'free'
+
+    async def add_user(self, user_id, username):
+        if self.db.peek_user_auth(user_id) is not None:
+            return
+        await asyncio.get_running_loop().run_in_executor(self._writer, self.db.add_user, user_id, username)
+
+    async def close(self):
+        def _shutdown():
+            self._readers.shutdown(wait=True)
+            self._writer.shutdown(wait=True)
+            self.db.close()
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, _shutdown)
+        except Exception as e:
+            logger.warning("Failed to close database cleanly: %s", e)
@@ -0,0 +1,117 @@
+import itertools
+import threading
+from collections import OrderedDict
+
+class BotCache:
+    """Process-local LRU cache of `BotRecord`s keyed by bot_id.
+
+    Every change to a bot bumps its version, taken from one global monotonically
+    increasing counter, so callers can tell whether anything changed by comparing
+    a single integer. Versions outlive evicted rows; an unknown bot reports 0.
+    """
+
+    def __init__(self, max_size):
+        self.max_size = max(1, int(max_size))
+        self.hits = 0
+        self.misses = 0
+        self._rows = OrderedDict()
+        self._versions = {}
+        self._clock = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def get(self, bot_id, count_miss=True):
+        with self._lock:
+            row = self._rows.get(bot_id)
+            if row is not None:
+                self._rows.move_to_end(bot_id)
+                self.hits += 1
+            elif count_miss:
+                self.misses += 1
+            return row
+
+    def version(self, bot_id):
+        with self._lock:
+            return self._versions.get(bot_id, 0)
+
+    def put(self, bot_id, row, version):
+        """Store a record read from the DB, unless the bot changed since `version` was taken."""
+        if row is None: return
+        with self._lock:
+            if self._versions.get(bot_id, 0) != version:
+                return
+            self._rows[bot_id] = row
+            self._rows.move_to_end(bot_id)
+            while len(self._rows) > self.max_size:
+                self._rows.popitem(last=False)
+
+    def patch(self, bot_id, values):
+        """Apply {column: value} to a cached record without changing its version."""
+        with self._lock:
+            row = self._rows.get(bot_id)
+            if row is None: return
+            self._rows[bot_id] = row.replace(**values)
+
+    def touch(self, bot_id):
+        with self._lock:
+            self._versions[bot_id] = next(self._clock)
+
+    def invalidate(self, bot_id):
+        with self._lock:
+            self._rows.pop(bot_id, None)
+            self._versions[bot_id] = next(self._clock)
+
+    def forget(self, bot_id):
+        with self._lock:
+            self._rows.pop(bot_id, None)
+            self._versions.pop(bot_id, None)
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': (self.hits / total) if total else 0.0,
+                'size': len(self._rows),
+                'max_size': self.max_size,
+            }
+
+class UserAuthCache:
+    """Process-local map of user_id -> `UserRecord(user_id, status, plan)`.
+
+    Also maintains the number of pending users so the admin panel never has to
+    count them. Writers update it through `set`, which adjusts the counter from
+    the previous status.
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.pending_count = 0
+        self._users = {}
+        self._lock = threading.Lock()
+
+    def get(self, user_id, count_miss=True):
+        with self._lock:
+            auth = self._users.get(user_id)
+            if auth is not None:
+                self.hits += 1
+            elif count_miss:
+                self.misses += 1
+            return auth
+
+    def set(self, auth, previous_status=None):
+        with self._lock:
+            self._users[auth.user_id] = auth
+            if previous_status != auth.status:
+                if previous_status == 'pending': self.pending_count -= 1
+                if auth.status == 'pending': self.pending_count += 1
+
+    def load(self, auth):
+        """Cache a record read from the DB; the pending counter already includes it."""
+        with self._lock:
+            self._users.setdefault(auth.user_id, auth)
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self._users), 'pending': self.pending_count}
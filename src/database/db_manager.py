@@ -1,129 +1,259 @@
 import sqlite3
-from datetime import datetime
-from src.config.config import ADMIN_ID
+import queue
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from src.config.config import (
+    ADMIN_ID, DB_POOL_SIZE, DB_CACHE_SIZE_KB, DB_MMAP_SIZE, DB_STATEMENT_CACHE, BOT_CACHE_SIZE,
+    ERROR_LOG_MAX_ROWS_PER_BOT, ERROR_LOG_MAX_AGE_DAYS, ERROR_LOG_PRUNE_BATCH
+)
+from src.database.migrations import migrate
+from src.database.cache import BotCache, UserAuthCache
+from src.database.models import BotRecord, UserRecord, BOT_LIST_COLUMNS, BOT_BULK_COLUMNS
+from src.utils.helpers import error_fingerprint
+
+# Columns that the enforcement loop writes through the write-behind buffer
+BUFFERED_BOT_COLUMNS = ('remaining_seconds', 'power_remaining', 'last_checked', 'warned_low')
 
 class Database:
-    def __init__(self, db_file):
+    def __init__(self, db_file, pool_size=DB_POOL_SIZE, bot_cache_size=BOT_CACHE_SIZE):
         self.db_file = db_file
+        self.pool_size = max(1, pool_size)
+        self._pool = queue.LifoQueue()
+        self._pool_lock = threading.Lock()
+        self._created = 0
+        self._pending = {}  # bot_id -> {column: value} not yet flushed
+        self._flushing = {}  # batch being written; still overlaid until it is committed
+        self._flush_seq = 0  # bumped whenever a batch leaves the overlay
+        self._pending_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._bot_cache = BotCache(bot_cache_size)
+        self._auth_cache = UserAuthCache()
+        self._log_dirty_bots = set()  # bots that gained error_logs rows since their last cap check
+        self._log_sweep_cursor = 0
+        self._log_lock = threading.Lock()
         self.init_db()
 
-    def init_db(self):
-        conn = sqlite3.connect(self.db_file)
+    # -------------------------------------------------------------------------
+    # Connection pool
+    # -------------------------------------------------------------------------
+    def _connect(self):
+        conn = sqlite3.connect(self.db_file, timeout=30, check_same_thread=False, cached_statements=DB_STATEMENT_CACHE)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA cache_size=-{int(DB_CACHE_SIZE_KB)}")
+        conn.execute(f"PRAGMA mmap_size={int(DB_MMAP_SIZE)}")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        return conn
+
+    def _acquire(self):
+        try:
+            return self._pool.get_nowait()
+        except queue.Empty:
+            pass
+        with self._pool_lock:
+            if self._created < self.pool_size:
+                self._created += 1
+                try:
+                    return self._connect()
+                except Exception:
+                    self._created -= 1
+                    raise
+        return self._pool.get()
+
+    @contextmanager
+    def connection(self):
+        """Borrow a pooled connection; commits on success, rolls back on error."""
+        conn = self._acquire()
+        try:
+            with conn:
+                yield conn
+        finally:
+            self._pool.put(conn)
+
+    @staticmethod
+    def _fetch(conn, record_cls, sql, params=(), one=False):
         c = conn.cursor()
-        # Users table with plan and daily recovery tracking
-        c.execute('''
-            CREATE TABLE IF NOT EXISTS users (
-                user_id INTEGER PRIMARY KEY,
-                username TEXT,
-                status TEXT DEFAULT 'pending',
-                bot_limit INTEGER DEFAULT 3,
-                plan TEXT DEFAULT 'free',
-                last_recovery_date DATE DEFAULT NULL,
-                joined_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        # Bots table extended with time/power/sleep/restart fields
-        c.execute('''
-            CREATE TABLE IF NOT EXISTS bots (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER,
-                token TEXT,
-                name TEXT,
-                status TEXT DEFAULT 'stopped',
-                folder TEXT,
-                main_file TEXT DEFAULT 'main.py',
-                pid INTEGER DEFAULT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                start_time INTEGER DEFAULT NULL,
-                total_seconds INTEGER DEFAULT 0,
-                remaining_seconds INTEGER DEFAULT 0,
-                power_max REAL DEFAULT 100.0,
-                power_remaining REAL DEFAULT 100.0,
-                last_checked TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                sleep_mode INTEGER DEFAULT 0,
-                auto_recovery_used INTEGER DEFAULT 0,
-                restart_count INTEGER DEFAULT 0,
-                last_restart_at TIMESTAMP DEFAULT NULL,
-                last_sleep_reason TEXT DEFAULT NULL,
-                warned_low INTEGER DEFAULT 0,
-                FOREIGN KEY(user_id) REFERENCES users(user_id)
-            )
-        ''')
-        c.execute('''
-            CREATE TABLE IF NOT EXISTS error_logs (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                bot_id INTEGER,
-                error_text TEXT,
-                timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY(bot_id) REFERENCES bots(id)
-            )
-        ''')
-        c.execute('''
-            CREATE TABLE IF NOT EXISTS feedback (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER,
-                text TEXT,
-                timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        conn.commit()
-
-        # Migrations
-        def ensure_column(table, column_def, column_name):
-            c.execute(f"PRAGMA table_info({table})")
-            cols = [r[1] for r in c.fetchall()]
-            if column_name not in cols:
-                c.execute(f"ALTER TABLE {table} ADD COLUMN {column_def}")
-
-        ensure_column('users', "plan TEXT DEFAULT 'free'", 'plan')
-        ensure_column('users', "last_recovery_date DATE DEFAULT NULL", 'last_recovery_date')
-
-        ensure_column('bots', 'start_time INTEGER DEFAULT NULL', 'start_time')
-        ensure_column('bots', 'total_seconds INTEGER DEFAULT 0', 'total_seconds')
-        ensure_column('bots', 'remaining_seconds INTEGER DEFAULT 0', 'remaining_seconds')
-        ensure_column('bots', 'power_max REAL DEFAULT 100.0', 'power_max')
-        ensure_column('bots', 'power_remaining REAL DEFAULT 100.0', 'power_remaining')
-        ensure_column('bots', "last_checked TIMESTAMP DEFAULT CURRENT_TIMESTAMP", 'last_checked')
-        ensure_column('bots', 'sleep_mode INTEGER DEFAULT 0', 'sleep_mode')
-        ensure_column('bots', 'auto_recovery_used INTEGER DEFAULT 0', 'auto_recovery_used')
-        ensure_column('bots', 'restart_count INTEGER DEFAULT 0', 'restart_count')
-        ensure_column('bots', 'last_restart_at TIMESTAMP DEFAULT NULL', 'last_restart_at')
-        ensure_column('bots', "last_sleep_reason TEXT DEFAULT NULL", 'last_sleep_reason')
-        ensure_column('bots', 'warned_low INTEGER DEFAULT 0', 'warned_low')
-
-        conn.commit()
-        conn.close()
+        c.row_factory = record_cls.row_factory
+        c.execute(sql, params)
+        return c.fetchone() if one else c.fetchall()
+
+    def close(self):
+        try:
+            self.flush_bot_resources()
+        except Exception: pass
+        with self._pool_lock:
+            while True:
+                try:
+                    conn = self._pool.get_nowait()
+                except queue.Empty:
+                    break
+                try:
+                    conn.close()
+                except Exception: pass
+                self._created -= 1
+
+    # -------------------------------------------------------------------------
+    # Write-behind buffer for per-tick bot resource updates
+    # -------------------------------------------------------------------------
+    def buffer_bot_resources(self, bot_id, remaining_seconds=None, power_remaining=None, last_checked=None, warned_low=None):
+        """Queue resource changes for `bot_id`; written by the next `flush_bot_resources`."""
+        values = {'remaining_seconds': remaining_seconds, 'power_remaining': power_remaining,
+                  'last_checked': last_checked, 'warned_low': None if warned_low is None else int(bool(warned_low))}
+        with self._pending_lock:
+            entry = self._pending.setdefault(bot_id, {})
+            for col, val in values.items():
+                if val is not None: entry[col] = val
+        self._bot_cache.touch(bot_id)
+
+    def flush_bot_resources(self):
+        """Write all buffered resource changes in one transaction. Returns the number of bots flushed."""
+        with self._flush_lock:
+            with self._pending_lock:
+                pending, self._pending = self._pending, {}
+                self._flushing = pending
+            if not pending:
+                return 0
+            rows = [(e.get('remaining_seconds'), e.get('power_remaining'), e.get('last_checked'), e.get('warned_low'), bot_id)
+                    for bot_id, e in pending.items()]
+            try:
+                with self.connection() as conn:
+                    conn.executemany(
+                        "UPDATE bots SET remaining_seconds = COALESCE(?, remaining_seconds), power_remaining = COALESCE(?, power_remaining), "
+                        "last_checked = COALESCE(?, last_checked), warned_low = COALESCE(?, warned_low) WHERE id = ?",
+                        rows
+                    )
+            except Exception:
+                # Put the batch back unless newer values were buffered meanwhile
+                with self._pending_lock:
+                    for bot_id, e in pending.items():
+                        merged = dict(e)
+                        merged.update(self._pending.get(bot_id, {}))
+                        self._pending[bot_id] = merged
+                    self._flushing = {}
+                    self._flush_seq += 1
+                raise
+            # The flushed values are already what readers saw through the overlay. The touch
+            # rejects a put of a row that was read before the commit.
+            for bot_id, e in pending.items():
+                self._bot_cache.patch(bot_id, e)
+                self._bot_cache.touch(bot_id)
+            with self._pending_lock:
+                self._flushing = {}
+                self._flush_seq += 1
+            return len(rows)
+
+    def _discard_pending(self, bot_id, *columns):
+        # A direct write supersedes buffered values for the same columns. Taking the
+        # flush lock first makes sure an in-flight flush cannot land after it.
+        with self._flush_lock, self._pending_lock:
+            entry = self._pending.get(bot_id)
+            if entry is None: return
+            for col in (columns or BUFFERED_BOT_COLUMNS):
+                entry.pop(col, None)
+            if not entry:
+                del self._pending[bot_id]
+
+    def _overlay_pending(self, bot):
+        with self._pending_lock:
+            return self._apply_pending(bot)
+
+    def _apply_pending(self, bot):
+        # Caller holds _pending_lock; values still pending win over the in-flight batch
+        if bot is None: return bot
+        flushing, pending = self._flushing.get(bot.id), self._pending.get(bot.id)
+        if not flushing and not pending: return bot
+        entry = dict(flushing or {})
+        entry.update(pending or {})
+        return bot.replace(**entry)
+
+    def _read_bots(self, sql, params=(), one=False, on_read=None):
+        """Fetch BotRecords with buffered values applied.
+
+        A batch that commits while the rows are read may be missing both from
+        them and, by the time they are overlaid, from the buffer, so the read
+        is repeated in that case. `on_read(row)` sees the raw row of a read
+        that is kept.
+        """
+        while True:
+            with self._pending_lock:
+                seq = self._flush_seq
+            with self.connection() as conn:
+                rows = self._fetch(conn, BotRecord, sql, params, one=one)
+            with self._pending_lock:
+                if self._flush_seq != seq: continue
+                if one:
+                    result = self._apply_pending(rows)
+                else:
+                    result = [self._apply_pending(r) for r in rows]
+            if on_read is not None:
+                on_read(rows)
+            return result
+
+    def init_db(self):
+        with self.connection() as conn:
+            migrate(conn)
+            self._auth_cache.pending_count = conn.execute("SELECT count(*) FROM users WHERE status = 'pending'").fetchone()[0]
 
     def add_user(self, user_id, username):
-        conn = sqlite3.connect(self.db_file)
-        c = conn.cursor()
+        # Known users are answered from memory; only first contact hits the DB
+        if self._auth_cache.get(user_id, count_miss=False) is not None:
+            return
         status = 'approved' if user_id == ADMIN_ID else 'pending'
-        c.execute("INSERT OR IGNORE INTO users (user_id, username, status) VALUES (?, ?, ?)", (user_id, username, status))
-        conn.commit()
-        conn.close()
+        with self.connection() as conn:
+            inserted = conn.execute("INSERT OR IGNORE INTO users (user_id, username, status) VALUES (?, ?, ?)", (user_id, username, status)).rowcount
+            auth = self._fetch(conn, UserRecord, "SELECT user_id, status, plan FROM users WHERE user_id = ?", (user_id,), one=True)
+        if inserted:
+            self._auth_cache.set(auth)
+        else:
+            self._auth_cache.load(auth)
+
+    def get_user_auth(self, user_id):
+        """Return `UserRecord(user_id, status, plan)` for permission checks, from memory when possible."""
+        auth = self._auth_cache.get(user_id)
+        if auth is None:
+            with self.connection() as conn:
+                auth = self._fetch(conn, UserRecord, "SELECT user_id, status, plan FROM users WHERE user_id = ?", (user_id,), one=True)
+            if auth is not None:
+                self._auth_cache.load(auth)
+        return auth
+
+    def peek_user_auth(self, user_id):
+        return self._auth_cache.get(user_id, count_miss=False)
+
+    def count_pending_users(self):
+        return self._auth_cache.pending_count
+
+    def get_auth_cache_stats(self):
+        return self._auth_cache.stats()
 
     def get_user(self, user_id):
-        conn = sqlite3.connect(self.db_file)
-        c = conn.cursor()
-        c.execute("SELECT * FROM users WHERE user_id = ?", (user_id,))
-        row = c.fetchone()
-        conn.close()
-        return row
+        with self.connection() as conn:
+            return self._fetch(conn, UserRecord, f"SELECT {UserRecord.select_list()} FROM users WHERE user_id = ?", (user_id,), one=True)
 
     def update_user_status(self, user_id, status):
-        conn = sqlite3.connect(self.db_file)
-        c = conn.cursor()
-        c.execute("UPDATE users SET status = ? WHERE user_id = ?", (status, user_id))
-        conn.commit()
-        conn.close()
+        with self.connection() as conn:
+            previous = conn.execute("SELECT status FROM users WHERE user_id = ?", (user_id,)).fetchone()
+            conn.execute("UPDATE users SET status = ? WHERE user_id = ?", (status, user_id))
+            auth = self._fetch(conn, UserRecord, "SELECT user_id, status, plan FROM users WHERE user_id = ?", (user_id,), one=True)
+        if auth is not None:
+            self._auth_cache.set(auth, previous[0] if previous else None)
 
-    def get_pending_users(self):
-        conn = sqlite3.connect(self.db_file)
-        c = conn.cursor()
-        c.execute("SELECT * FROM users WHERE status = 'pending'")
-        rows = c.fetchall()
-        conn.close()
-        return rows
+    def set_user_plan(self, user_id, plan):
+        with self.connection() as conn:
+            conn.execute("UPDATE users SET plan = ? WHERE user_id = ?", (plan, user_id))
+            auth = self._fetch(conn, UserRecord, "SELECT user_id, status, plan FROM users WHERE user_id = ?", (user_id,), one=True)
+        if auth is not None:
+            self._auth_cache.set(auth, auth.status)
+
+    def get_pending_users(self, columns=('user_id', 'username')):
+        with self.connection() as conn:
+            return self._fetch(conn, UserRecord, f"SELECT {UserRecord.select_list(columns)} FROM users WHERE status = 'pending'")
+
+    def get_system_stats(self):
+        """Trigger-maintained counters: bots_total, bots_running, bots_sleeping, users_total."""
+        with self.connection() as conn:
+            return dict(conn.execute("SELECT key, value FROM stats").fetchall())
 
     def add_bot(self, user_id, token, name, folder, main_file='main.py'):
         plan = self.get_user_plan(user_id)
@@ -132,164 +262,196 @@ class Database:
         total_seconds = plan_limits.get(plan, 86400)
         power = plan_power.get(plan, 30.0)
 
-        with sqlite3.connect(self.db_file) as conn:
-            c = conn.cursor()
-            c.execute("INSERT INTO bots (user_id, token, name, folder, main_file, total_seconds, remaining_seconds, power_max, power_remaining) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", 
-                      (user_id, token, name, folder, main_file, total_seconds, total_seconds, power, power))
+        with self.connection() as conn:
+            c = conn.execute("INSERT INTO bots (user_id, token, name, folder, main_file, total_seconds, remaining_seconds, power_max, power_remaining) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                             (user_id, token, name, folder, main_file, total_seconds, total_seconds, power, power))
             return c.lastrowid
 
-    def get_user_bots(self, user_id):
-        conn = sqlite3.connect(self.db_file)
-        c = conn.cursor()
-        c.execute("SELECT id, name, status, pid FROM bots WHERE user_id = ?", (user_id,))
-        rows = c.fetchall()
-        conn.close()
-        return rows
+    def get_user_bots(self, user_id, columns=BOT_LIST_COLUMNS):
+        return self._read_bots(f"SELECT {BotRecord.select_list(columns)} FROM bots WHERE user_id = ?", (user_id,))
 
     def get_bot(self, bot_id):
-        conn = sqlite3.connect(self.db_file)
-        c = conn.cursor()
-        c.execute("SELECT * FROM bots WHERE id = ?", (bot_id,))
-        row = c.fetchone()
-        conn.close()
-        return row
+        row = self._bot_cache.get(bot_id)
+        if row is not None:
+            return self._overlay_pending(row)
+        version = self._bot_cache.version(bot_id)
+        return self._read_bots(f"SELECT {BotRecord.select_list()} FROM bots WHERE id = ?", (bot_id,), one=True,
+                               on_read=lambda raw: self._bot_cache.put(bot_id, raw, version))
 
-    def update_bot_status(self, bot_id, status, pid=None):
-        conn = sqlite3.connect(self.db_file)
-        c = conn.cursor()
-        c.execute("UPDATE bots SET status = ?, pid = ? WHERE id = ?", (status, pid, bot_id))
-        conn.commit()
-        conn.close()
+    def get_cached_bot(self, bot_id):
+        """Return the bot from the cache without touching the DB, or None on a miss."""
+        row = self._bot_cache.get(bot_id, count_miss=False)
+        if row is None: return None
+        return self._overlay_pending(row)
 
-    def add_error_log(self, bot_id, error_text):
-        conn = sqlite3.connect(self.db_file)
-        c = conn.cursor()
-        c.execute("INSERT INTO error_logs (bot_id, error_text) VALUES (?, ?)", (bot_id, error_text))
-        conn.commit()
-        conn.close()
+    def get_bot_version(self, bot_id):
+        """Monotonic change counter for `bot_id`; differs whenever the bot's state changed."""
+        return self._bot_cache.version(bot_id)
+
+    def get_cache_stats(self):
+        return self._bot_cache.stats()
+
+    def update_bot_status(self, bot_id, status, pid=None, launched_at=None):
+        with self.connection() as conn:
+            conn.execute("UPDATE bots SET status = ?, pid = ?, launched_at = ? WHERE id = ?", (status, pid, launched_at, bot_id))
+        self._bot_cache.invalidate(bot_id)
+
+    def set_bot_start_time(self, bot_id, start_time):
+        with self.connection() as conn:
+            conn.execute("UPDATE bots SET start_time = ? WHERE id = ?", (start_time, bot_id))
+        self._bot_cache.invalidate(bot_id)
+
+    def set_warned_low(self, bot_id, warned=True):
+        self._discard_pending(bot_id, 'warned_low')
+        with self.connection() as conn:
+            conn.execute("UPDATE bots SET warned_low = ? WHERE id = ?", (1 if warned else 0, bot_id))
+        self._bot_cache.invalidate(bot_id)
+
+    def set_bot_total_seconds(self, bot_id, total_seconds):
+        # Adding time always re-arms the low-time warning
+        self._discard_pending(bot_id, 'warned_low')
+        with self.connection() as conn:
+            conn.execute("UPDATE bots SET total_seconds = ?, warned_low = 0 WHERE id = ?", (total_seconds, bot_id))
+        self._bot_cache.invalidate(bot_id)
+
+    def add_error_log(self, bot_id, error_text, fingerprint=None, count=1):
+        """Record an error; repeats of the same fingerprint bump `occurrences` instead of adding rows."""
+        fingerprint = fingerprint or error_fingerprint(error_text)
+        now = datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')
+        with self.connection() as conn:
+            # Repeats are the common case for noisy bots, so try the counter bump first
+            updated = conn.execute(
+                "UPDATE error_logs SET occurrences = occurrences + ?, timestamp = ?, error_text = ? WHERE bot_id = ? AND fingerprint = ?",
+                (count, now, error_text, bot_id, fingerprint)
+            ).rowcount
+            if not updated:
+                conn.execute(
+                    "INSERT INTO error_logs (bot_id, error_text, fingerprint, occurrences, first_seen, timestamp) VALUES (?, ?, ?, ?, ?, ?)",
+                    (bot_id, error_text, fingerprint, count, now, now)
+                )
+        if not updated:
+            with self._log_lock:
+                self._log_dirty_bots.add(bot_id)
 
     def get_bot_logs(self, bot_id, limit=5):
-        conn = sqlite3.connect(self.db_file)
-        c = conn.cursor()
-        c.execute("SELECT error_text, timestamp FROM error_logs WHERE bot_id = ? ORDER BY timestamp DESC LIMIT ?", (bot_id, limit))
-        rows = c.fetchall()
-        conn.close()
-        return rows
+        """Latest distinct errors as (error_text, last_seen, occurrences), newest first."""
+        with self.connection() as conn:
+            return conn.execute("SELECT error_text, timestamp, occurrences FROM error_logs WHERE bot_id = ? ORDER BY timestamp DESC LIMIT ?", (bot_id, limit)).fetchall()
+
+    def prune_error_logs(self, max_rows=ERROR_LOG_MAX_ROWS_PER_BOT, max_age_days=ERROR_LOG_MAX_AGE_DAYS, batch=ERROR_LOG_PRUNE_BATCH):
+        """One incremental retention pass; returns the number of rows deleted.
+
+        Caps the row count of up to `batch` bots that gained rows since the last
+        pass, and applies the age limit to the next `batch` bots of a rolling sweep.
+        """
+        with self._log_lock:
+            capped = [self._log_dirty_bots.pop() for _ in range(min(batch, len(self._log_dirty_bots)))]
+        cutoff = (datetime.utcnow() - timedelta(days=max_age_days)).strftime('%Y-%m-%d %H:%M:%S')
+        deleted = 0
+        with self.connection() as conn:
+            for bot_id in capped:
+                # Newest row past the cap; it and everything older goes
+                row = conn.execute("SELECT timestamp, id FROM error_logs WHERE bot_id = ? ORDER BY timestamp DESC, id DESC LIMIT 1 OFFSET ?", (bot_id, max_rows)).fetchone()
+                if row:
+                    deleted += conn.execute("DELETE FROM error_logs WHERE bot_id = ? AND (timestamp < ? OR (timestamp = ? AND id <= ?))",
+                                            (bot_id, row[0], row[0], row[1])).rowcount
+            swept = [r[0] for r in conn.execute("SELECT id FROM bots WHERE id > ? ORDER BY id LIMIT ?", (self._log_sweep_cursor, batch))]
+            self._log_sweep_cursor = swept[-1] if len(swept) == batch else 0
+            for bot_id in swept:
+                deleted += conn.execute("DELETE FROM error_logs WHERE bot_id = ? AND timestamp < ?", (bot_id, cutoff)).rowcount
+        return deleted
 
     def add_feedback(self, user_id, text):
-        conn = sqlite3.connect(self.db_file)
-        c = conn.cursor()
-        c.execute("INSERT INTO feedback (user_id, text) VALUES (?, ?)", (user_id, text))
-        conn.commit()
-        conn.close()
+        with self.connection() as conn:
+            conn.execute("INSERT INTO feedback (user_id, text) VALUES (?, ?)", (user_id, text))
 
     def delete_bot(self, bot_id):
-        conn = sqlite3.connect(self.db_file)
-        c = conn.cursor()
-        c.execute("DELETE FROM bots WHERE id = ?", (bot_id,))
-        c.execute("DELETE FROM error_logs WHERE bot_id = ?", (bot_id,))
-        conn.commit()
-        conn.close()
+        self._discard_pending(bot_id)
+        with self.connection() as conn:
+            conn.execute("DELETE FROM bots WHERE id = ?", (bot_id,))
+            conn.execute("DELETE FROM error_logs WHERE bot_id = ?", (bot_id,))
+        self._bot_cache.forget(bot_id)
 
     def set_bot_time_power(self, bot_id, total_seconds, power_max):
-        conn = sqlite3.connect(self.db_file)
-        c = conn.cursor()
-        c.execute("UPDATE bots SET total_seconds = ?, remaining_seconds = ?, power_max = ?, power_remaining = ? WHERE id = ?",
-                  (total_seconds, total_seconds, power_max, power_max, bot_id))
-        conn.commit()
-        conn.close()
+        self._discard_pending(bot_id, 'remaining_seconds', 'power_remaining')
+        with self.connection() as conn:
+            conn.execute("UPDATE bots SET total_seconds = ?, remaining_seconds = ?, power_max = ?, power_remaining = ? WHERE id = ?",
+                         (total_seconds, total_seconds, power_max, power_max, bot_id))
+        self._bot_cache.invalidate(bot_id)
 
-    def get_all_running_bots(self):
-        conn = sqlite3.connect(self.db_file)
-        c = conn.cursor()
-        c.execute("SELECT * FROM bots WHERE status = 'running'")
-        rows = c.fetchall()
-        conn.close()
-        return rows
+    def get_all_running_bots(self, columns=None):
+        return self._read_bots(f"SELECT {BotRecord.select_list(columns)} FROM bots WHERE status = 'running'")
+
+    def find_bots(self, status=None, user_id=None, plan=None, columns=BOT_BULK_COLUMNS):
+        """Bots matching every given filter (`plan` is the owner's plan), ordered by id."""
+        where, params = [], []
+        if status is not None:
+            where.append("status = ?"); params.append(status)
+        if user_id is not None:
+            where.append("user_id = ?"); params.append(user_id)
+        if plan is not None:
+            where.append("user_id IN (SELECT user_id FROM users WHERE COALESCE(plan, 'free') = ?)"); params.append(plan)
+        sql = f"SELECT {BotRecord.select_list(columns)} FROM bots"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        return self._read_bots(sql + " ORDER BY id", params)
 
     def update_bot_resources(self, bot_id, remaining_seconds=None, power_remaining=None, last_checked=None):
-        conn = sqlite3.connect(self.db_file)
-        c = conn.cursor()
-        updates = []
-        params = []
-        if remaining_seconds is not None:
-            updates.append('remaining_seconds = ?')
-            params.append(remaining_seconds)
-        if power_remaining is not None:
-            updates.append('power_remaining = ?')
-            params.append(power_remaining)
-        if last_checked is not None:
-            updates.append('last_checked = ?')
-            params.append(last_checked)
-        if not updates:
-            conn.close(); return
-        params.append(bot_id)
-        c.execute(f"UPDATE bots SET {', '.join(updates)} WHERE id = ?", params)
-        conn.commit()
-        conn.close()
+        if remaining_seconds is None and power_remaining is None and last_checked is None:
+            return
+        self._discard_pending(bot_id, *[col for col, val in (('remaining_seconds', remaining_seconds), ('power_remaining', power_remaining), ('last_checked', last_checked)) if val is not None])
+        # One fixed statement (instead of per-combination SQL) keeps the prepared statement cache hot
+        with self.connection() as conn:
+            conn.execute(
+                "UPDATE bots SET remaining_seconds = COALESCE(?, remaining_seconds), power_remaining = COALESCE(?, power_remaining), "
+                "last_checked = COALESCE(?, last_checked) WHERE id = ?",
+                (remaining_seconds, power_remaining, last_checked, bot_id)
+            )
+        self._bot_cache.invalidate(bot_id)
 
     def set_sleep_mode(self, bot_id, sleep=1, reason=None):
-        conn = sqlite3.connect(self.db_file)
-        c = conn.cursor()
-        c.execute("UPDATE bots SET sleep_mode = ?, status = 'stopped', last_sleep_reason = ? WHERE id = ?", (1 if sleep else 0, reason, bot_id))
-        conn.commit()
-        conn.close()
+        with self.connection() as conn:
+            conn.execute("UPDATE bots SET sleep_mode = ?, status = 'stopped', last_sleep_reason = ? WHERE id = ?", (1 if sleep else 0, reason, bot_id))
+        self._bot_cache.invalidate(bot_id)
 
     def can_user_recover(self, user_id):
-        conn = sqlite3.connect(self.db_file)
-        c = conn.cursor()
-        c.execute("SELECT last_recovery_date FROM users WHERE user_id = ?", (user_id,))
-        row = c.fetchone()
-        conn.close()
+        with self.connection() as conn:
+            row = conn.execute("SELECT last_recovery_date FROM users WHERE user_id = ?", (user_id,)).fetchone()
         if not row: return False
         last = row[0]
         today = datetime.utcnow().date().isoformat()
         return last != today
 
     def use_user_recovery(self, user_id):
-        conn = sqlite3.connect(self.db_file)
-        c = conn.cursor()
         today = datetime.utcnow().date().isoformat()
-        c.execute("UPDATE users SET last_recovery_date = ? WHERE user_id = ?", (today, user_id))
-        conn.commit()
-        conn.close()
+        with self.connection() as conn:
+            conn.execute("UPDATE users SET last_recovery_date = ? WHERE user_id = ?", (today, user_id))
 
     def mark_bot_auto_recovery_used(self, bot_id):
-        conn = sqlite3.connect(self.db_file)
-        c = conn.cursor()
-        c.execute("UPDATE bots SET auto_recovery_used = 1 WHERE id = ?", (bot_id,))
-        conn.commit()
-        conn.close()
+        with self.connection() as conn:
+            conn.execute("UPDATE bots SET auto_recovery_used = 1 WHERE id = ?", (bot_id,))
+        self._bot_cache.invalidate(bot_id)
 
     def increment_restart(self, bot_id):
-        conn = sqlite3.connect(self.db_file)
-        c = conn.cursor()
-        c.execute("UPDATE bots SET restart_count = restart_count + 1, last_restart_at = ? WHERE id = ?", (datetime.utcnow().isoformat(), bot_id))
-        conn.commit()
-        conn.close()
+        with self.connection() as conn:
+            conn.execute("UPDATE bots SET restart_count = restart_count + 1, last_restart_at = ? WHERE id = ?", (datetime.utcnow().isoformat(), bot_id))
+        self._bot_cache.invalidate(bot_id)
 
     def reset_restart_count(self, bot_id):
-        conn = sqlite3.connect(self.db_file)
-        c = conn.cursor()
-        c.execute("UPDATE bots SET restart_count = 0 WHERE id = ?", (bot_id,))
-        conn.commit()
-        conn.close()
+        with self.connection() as conn:
+            conn.execute("UPDATE bots SET restart_count = 0 WHERE id = ?", (bot_id,))
+        self._bot_cache.invalidate(bot_id)
 
     def update_last_checked(self, bot_id, ts=None):
-        conn = sqlite3.connect(self.db_file)
-        c = conn.cursor()
         if ts is None: ts = datetime.utcnow().isoformat()
-        c.execute("UPDATE bots SET last_checked = ? WHERE id = ?", (ts, bot_id))
-        conn.commit()
-        conn.close()
+        self._discard_pending(bot_id, 'last_checked')
+        with self.connection() as conn:
+            conn.execute("UPDATE bots SET last_checked = ? WHERE id = ?", (ts, bot_id))
+        self._bot_cache.invalidate(bot_id)
 
     def get_user_plan(self, user_id):
-        conn = sqlite3.connect(self.db_file)
-        c = conn.cursor()
-        c.execute("SELECT plan FROM users WHERE user_id = ?", (user_id,))
-        r = c.fetchone()
-        conn.close()
-        return r[0] if r else 'free'
+        auth = self.get_user_auth(user_id)
+        return (auth.plan if auth else None) or 'free'
 
     def log_restart_event(self, bot_id, text):
         self.add_error_log(bot_id, f"[RESTART] {text}")
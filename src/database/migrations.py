@@ -0,0 +1,192 @@
+import logging
+
+logger = logging.getLogger(__name__)
+
+# -----------------------------------------------------------------------------
+# Numbered schema migrations, tracked with PRAGMA user_version.
+# Append new migrations to MIGRATIONS; never edit one that has shipped.
+# -----------------------------------------------------------------------------
+
+def _ensure_column(c, table, column_def, column_name):
+    cols = [r[1] for r in c.execute(f"PRAGMA table_info({table})").fetchall()]
+    if column_name not in cols:
+        c.execute(f"ALTER TABLE {table} ADD COLUMN {column_def}")
+
+def _m1_base_schema(c):
+    # Users table with plan and daily recovery tracking
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS users (
+            user_id INTEGER PRIMARY KEY,
+            username TEXT,
+            status TEXT DEFAULT 'pending',
+            bot_limit INTEGER DEFAULT 3,
+            plan TEXT DEFAULT 'free',
+            last_recovery_date DATE DEFAULT NULL,
+            joined_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    # Bots table extended with time/power/sleep/restart fields
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS bots (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            token TEXT,
+            name TEXT,
+            status TEXT DEFAULT 'stopped',
+            folder TEXT,
+            main_file TEXT DEFAULT 'main.py',
+            pid INTEGER DEFAULT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            start_time INTEGER DEFAULT NULL,
+            total_seconds INTEGER DEFAULT 0,
+            remaining_seconds INTEGER DEFAULT 0,
+            power_max REAL DEFAULT 100.0,
+            power_remaining REAL DEFAULT 100.0,
+            last_checked TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            sleep_mode INTEGER DEFAULT 0,
+            auto_recovery_used INTEGER DEFAULT 0,
+            restart_count INTEGER DEFAULT 0,
+            last_restart_at TIMESTAMP DEFAULT NULL,
+            last_sleep_reason TEXT DEFAULT NULL,
+            warned_low INTEGER DEFAULT 0,
+            FOREIGN KEY(user_id) REFERENCES users(user_id)
+        )
+    ''')
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS error_logs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            bot_id INTEGER,
+            error_text TEXT,
+            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY(bot_id) REFERENCES bots(id)
+        )
+    ''')
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS feedback (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            text TEXT,
+            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    # Databases created by V3.x predate these columns
+    _ensure_column(c, 'users', "plan TEXT DEFAULT 'free'", 'plan')
+    _ensure_column(c, 'users', "last_recovery_date DATE DEFAULT NULL", 'last_recovery_date')
+
+    _ensure_column(c, 'bots', 'start_time INTEGER DEFAULT NULL', 'start_time')
+    _ensure_column(c, 'bots', 'total_seconds INTEGER DEFAULT 0', 'total_seconds')
+    _ensure_column(c, 'bots', 'remaining_seconds INTEGER DEFAULT 0', 'remaining_seconds')
+    _ensure_column(c, 'bots', 'power_max REAL DEFAULT 100.0', 'power_max')
+    _ensure_column(c, 'bots', 'power_remaining REAL DEFAULT 100.0', 'power_remaining')
+    _ensure_column(c, 'bots', "last_checked TIMESTAMP DEFAULT CURRENT_TIMESTAMP", 'last_checked')
+    _ensure_column(c, 'bots', 'sleep_mode INTEGER DEFAULT 0', 'sleep_mode')
+    _ensure_column(c, 'bots', 'auto_recovery_used INTEGER DEFAULT 0', 'auto_recovery_used')
+    _ensure_column(c, 'bots', 'restart_count INTEGER DEFAULT 0', 'restart_count')
+    _ensure_column(c, 'bots', 'last_restart_at TIMESTAMP DEFAULT NULL', 'last_restart_at')
+    _ensure_column(c, 'bots', "last_sleep_reason TEXT DEFAULT NULL", 'last_sleep_reason')
+    _ensure_column(c, 'bots', 'warned_low INTEGER DEFAULT 0', 'warned_low')
+
+def _m2_hot_path_indexes(c):
+    # The enforcer's running scan, per-user lists, the pending-users panel and
+    # newest-first log retrieval.
+    c.execute("CREATE INDEX IF NOT EXISTS idx_bots_running ON bots(id) WHERE status = 'running'")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_bots_user_id ON bots(user_id)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_users_status ON users(status)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_error_logs_bot_ts ON error_logs(bot_id, timestamp, error_text)")
+
+def _m3_stats_counters(c):
+    # Aggregate counters kept current by triggers so the status screen never counts rows
+    c.execute("CREATE TABLE IF NOT EXISTS stats (key TEXT PRIMARY KEY, value INTEGER NOT NULL DEFAULT 0) WITHOUT ROWID")
+    c.execute('''
+        INSERT OR REPLACE INTO stats (key, value) VALUES
+            ('bots_total', (SELECT count(*) FROM bots)),
+            ('bots_running', (SELECT count(*) FROM bots WHERE status = 'running')),
+            ('bots_sleeping', (SELECT count(*) FROM bots WHERE sleep_mode = 1)),
+            ('users_total', (SELECT count(*) FROM users))
+    ''')
+    c.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_stats_bots_insert AFTER INSERT ON bots BEGIN
+            UPDATE stats SET value = value + 1 WHERE key = 'bots_total';
+            UPDATE stats SET value = value + (NEW.status IS 'running') WHERE key = 'bots_running';
+            UPDATE stats SET value = value + (NEW.sleep_mode IS 1) WHERE key = 'bots_sleeping';
+        END
+    ''')
+    c.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_stats_bots_delete AFTER DELETE ON bots BEGIN
+            UPDATE stats SET value = value - 1 WHERE key = 'bots_total';
+            UPDATE stats SET value = value - (OLD.status IS 'running') WHERE key = 'bots_running';
+            UPDATE stats SET value = value - (OLD.sleep_mode IS 1) WHERE key = 'bots_sleeping';
+        END
+    ''')
+    c.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_stats_bots_update AFTER UPDATE OF status, sleep_mode ON bots BEGIN
+            UPDATE stats SET value = value + (NEW.status IS 'running') - (OLD.status IS 'running') WHERE key = 'bots_running';
+            UPDATE stats SET value = value + (NEW.sleep_mode IS 1) - (OLD.sleep_mode IS 1) WHERE key = 'bots_sleeping';
+        END
+    ''')
+    c.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_stats_users_insert AFTER INSERT ON users BEGIN
+            UPDATE stats SET value = value + 1 WHERE key = 'users_total';
+        END
+    ''')
+    c.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_stats_users_delete AFTER DELETE ON users BEGIN
+            UPDATE stats SET value = value - 1 WHERE key = 'users_total';
+        END
+    ''')
+
+def _m4_error_log_dedup(c):
+    # Repeat occurrences of the same (normalized) error collapse into one row;
+    # `timestamp` becomes the last-seen time.
+    _ensure_column(c, 'error_logs', 'fingerprint TEXT DEFAULT NULL', 'fingerprint')
+    _ensure_column(c, 'error_logs', 'occurrences INTEGER DEFAULT 1', 'occurrences')
+    _ensure_column(c, 'error_logs', 'first_seen TIMESTAMP DEFAULT NULL', 'first_seen')
+    c.execute("UPDATE error_logs SET first_seen = timestamp WHERE first_seen IS NULL")
+    c.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_error_logs_fingerprint ON error_logs(bot_id, fingerprint)")
+    # Covering index for get_bot_logs now that it also returns the occurrence count
+    c.execute("DROP INDEX IF EXISTS idx_error_logs_bot_ts")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_error_logs_recent ON error_logs(bot_id, timestamp, occurrences, error_text)")
+
+def _m5_process_identity(c):
+    # Start time of the process behind `pid`, so a restarted host can tell a
+    # surviving bot from an unrelated process that reused the pid.
+    _ensure_column(c, 'bots', 'launched_at REAL DEFAULT NULL', 'launched_at')
+
+MIGRATIONS = [
+    (1, _m1_base_schema),
+    (2, _m2_hot_path_indexes),
+    (3, _m3_stats_counters),
+    (4, _m4_error_log_dedup),
+    (5, _m5_process_identity),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+def get_schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+def migrate(conn):
+    """Bring the schema up to LATEST_VERSION; a no-op single pragma read when already current."""
+    version = get_schema_version(conn)
+    if version >= LATEST_VERSION:
+        return version
+    if conn.in_transaction:
+        conn.commit()
+    for number, migration in MIGRATIONS:
+        if number <= version:
+            continue
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Another process may have migrated while we waited for the write lock
+            if get_schema_version(conn) >= number:
+                conn.execute("COMMIT")
+                continue
+            migration(conn)
+            conn.execute(f"PRAGMA user_version = {int(number)}")
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        logger.info("Applied database migration %s (%s)", number, migration.__name__)
+    return get_schema_version(conn)
@@ -0,0 +1,64 @@
+BOT_COLUMNS = (
+    'id', 'user_id', 'token', 'name', 'status', 'folder', 'main_file', 'pid', 'created_at',
+    'start_time', 'total_seconds', 'remaining_seconds', 'power_max', 'power_remaining',
+    'last_checked', 'sleep_mode', 'auto_recovery_used', 'restart_count', 'last_restart_at',
+    'last_sleep_reason', 'warned_low', 'launched_at',
+)
+
+USER_COLUMNS = ('user_id', 'username', 'status', 'bot_limit', 'plan', 'last_recovery_date', 'joined_at')
+
+# Projections used by the hot paths
+BOT_LIST_COLUMNS = ('id', 'name', 'status', 'remaining_seconds', 'power_remaining', 'last_checked', 'sleep_mode')
+BOT_ENFORCE_COLUMNS = ('id', 'user_id', 'name', 'status', 'pid', 'remaining_seconds', 'power_remaining', 'last_checked', 'warned_low')
+BOT_BULK_COLUMNS = ('id', 'user_id', 'status', 'remaining_seconds', 'power_remaining', 'sleep_mode')
+BOT_RECONCILE_COLUMNS = ('id', 'user_id', 'status', 'folder', 'main_file', 'pid', 'launched_at', 'remaining_seconds', 'power_remaining', 'last_checked', 'sleep_mode')
+
+class Record:
+    """Compact slot-based row. Only the columns that were selected are set."""
+    __slots__ = ()
+    COLUMNS = ()
+
+    def __init__(self, **fields):
+        for name, value in fields.items():
+            setattr(self, name, value)
+
+    @classmethod
+    def row_factory(cls, cursor, row):
+        rec = cls.__new__(cls)
+        for col, value in zip(cursor.description, row):
+            setattr(rec, col[0], value)
+        return rec
+
+    @classmethod
+    def select_list(cls, columns=None):
+        columns = columns or cls.COLUMNS
+        unknown = set(columns) - set(cls.COLUMNS)
+        if unknown:
+            raise ValueError(f"Unknown {cls.__name__} columns: {sorted(unknown)}")
+        return ', '.join(columns)
+
+    def fields(self):
+        return {name: getattr(self, name) for name in self.COLUMNS if hasattr(self, name)}
+
+    def replace(self, **changes):
+        rec = self.__class__.__new__(self.__class__)
+        for name, value in self.fields().items():
+            setattr(rec, name, value)
+        for name, value in changes.items():
+            setattr(rec, name, value)
+        return rec
+
+    def __eq__(self, other):
+        return type(self) is type(other) and self.fields() == other.fields()
+
+    def __repr__(self):
+        inner = ', '.join(f"{k}={v!r}" for k, v in self.fields().items())
+        return f"{self.__class__.__name__}({inner})"
+
+class BotRecord(Record):
+    __slots__ = BOT_COLUMNS
+    COLUMNS = BOT_COLUMNS
+
+class UserRecord(Record):
+    __slots__ = USER_COLUMNS
+    COLUMNS = USER_COLUMNS
@@ -1,24 +1,20 @@
 import os
 import time
 import logging
-import sqlite3
 import shutil
 import re
 import html
 import asyncio
+import functools
 import subprocess
 from datetime import datetime
-try:
-    import psutil
-except ImportError:
-    psutil = None
 
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes, ConversationHandler
 from telegram.error import BadRequest
 
-from src.config.config import ADMIN_ID, DEVELOPER_USERNAME, DB_FILE, BOTS_DIR
-from src.utils.helpers import seconds_to_human, render_bar
+from src.config.config import ADMIN_ID, DEVELOPER_USERNAME, BOTS_DIR
+from src.utils.helpers import seconds_to_human, render_bar, effective_remaining
 
 logger = logging.getLogger(__name__)
 
@@ -32,10 +28,10 @@ class BotHandlers:
 
     async def start(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         user = update.effective_user
-        self.db.add_user(user.id, user.username)
-        user_data = self.db.get_user(user.id)
+        await self.db.add_user(user.id, user.username)
+        user_data = await self.db.get_user_auth(user.id)
         
-        if user_data[2] == 'pending' and user.id != ADMIN_ID:
+        if user_data.status == 'pending' and user.id != ADMIN_ID:
             await update.message.reply_text("⏳ <b>طلبك قيد المراجعة</b>\nسيتم إشعارك فور موافقة المالك على دخولك.", parse_mode="HTML")
             try:
                 await context.application.bot.send_message(
@@ -50,7 +46,7 @@ class BotHandlers:
             except Exception: pass
             return
 
-        if user_data[2] == 'blocked':
+        if user_data.status == 'blocked':
             await update.message.reply_text("🚫 تم حظرك من استخدام البوت.")
             return
 
@@ -73,9 +69,9 @@ class BotHandlers:
         query = update.callback_query
         await query.answer()
         user = update.effective_user
-        user_data = self.db.get_user(user.id)
+        user_data = await self.db.get_user_auth(user.id)
         
-        if user_data[2] != 'approved' and user.id != ADMIN_ID:
+        if user_data.status != 'approved' and user.id != ADMIN_ID:
             await query.edit_message_text("🚫 لا تملك صلاحية الوصول.")
             return
 
@@ -105,6 +101,7 @@ class BotHandlers:
         
         last_update = 0
         refresh_interval = 10 
+        bot, bot_version = None, None
 
         while context.user_data.get('auto_refresh', False):
             try:
@@ -118,33 +115,36 @@ class BotHandlers:
                 if now - last_update < refresh_interval:
                     continue
 
-                bot = self.db.get_bot(bot_id)
+                # Only re-read the record when something about the bot changed
+                version = await self.db.get_bot_version(bot_id)
+                if bot is None or version != bot_version:
+                    bot, bot_version = await self.db.get_bot(bot_id), version
                 if not bot: break
                 
-                cpu, mem = self.pm.get_bot_usage(bot_id)
-                status_icon = "🟢" if bot[4] == "running" else "🔴"
+                cpu, mem = await self.pm.get_bot_usage(bot_id)
+                status_icon = "🟢" if bot.status == "running" else "🔴"
                 
                 text = (
-                    f"🤖 <b>إدارة البوت: {html.escape(bot[3])}</b>\n"
+                    f"🤖 <b>إدارة البوت: {html.escape(bot.name)}</b>\n"
                     f"━━━━━━━━━━━━━━\n"
-                    f"🆔 ID: <code>{bot[0]}</code>\n"
-                    f"📡 الحالة: {status_icon} {bot[4]}\n"
+                    f"🆔 ID: <code>{bot.id}</code>\n"
+                    f"📡 الحالة: {status_icon} {bot.status}\n"
                     f"🖥 المعالج: <code>{cpu}%</code>\n"
                     f"🧠 الذاكرة: <code>{mem:.2f} MB</code>\n"
-                    f"📄 الملف: <code>{html.escape(bot[6])}</code>\n"
+                    f"📄 الملف: <code>{html.escape(bot.main_file)}</code>\n"
                     f"━━━━━━━━━━━━━━\n"
                     f"⏱ <i>تحديث تلقائي نشط (كل {refresh_interval} ثوانٍ)...</i>"
                 )
                 
                 keyboard = []
-                if bot[4] == "stopped":
+                if bot.status == "stopped":
                     keyboard.append([InlineKeyboardButton("▶️ تشغيل", callback_data=f"start_{bot_id}")])
                 else:
                     keyboard.append([InlineKeyboardButton("⏹ إيقاف", callback_data=f"stop_{bot_id}")])
                 
                 keyboard.extend([
                     [InlineKeyboardButton("📂 الملفات", callback_data=f"files_{bot_id}"), InlineKeyboardButton("📜 السجلات", callback_data=f"logs_{bot_id}")],
-                    [InlineKeyboardButton("🗑 حذف البوت", callback_data=f"confirm_del_{bot_id}")],
+                    [InlineKeyboardButton("📺 المخرجات المباشرة", callback_data=f"output_{bot_id}"), InlineKeyboardButton("🗑 حذف البوت", callback_data=f"confirm_del_{bot_id}")],
                     [InlineKeyboardButton("🔙 عودة", callback_data="my_bots")]
                 ])
                 
@@ -190,7 +190,7 @@ class BotHandlers:
     async def handle_feedback(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         user = update.effective_user
         text = update.message.text
-        self.db.add_feedback(user.id, text)
+        await self.db.add_feedback(user.id, text)
         
         try:
             await context.bot.send_message(
@@ -210,40 +210,41 @@ class BotHandlers:
         context.user_data['auto_refresh'] = False
         
         bot_id = int(query.data.split("_")[1])
-        bot = self.db.get_bot(bot_id)
+        bot = await self.db.get_bot(bot_id)
         if not bot:
             await query.edit_message_text("❌ البوت غير موجود.")
             return
 
-        remaining = bot[11]
-        power = bot[13]
-        status_icon = "🟢" if bot[4] == "running" else "🔴"
-        time_bar = render_bar((remaining / bot[10] * 100) if bot[10] else 0)
+        remaining = effective_remaining(bot)
+        power = bot.power_remaining
+        status_icon = "🟢" if bot.status == "running" else "🔴"
+        time_bar = render_bar((remaining / bot.total_seconds * 100) if bot.total_seconds else 0)
         power_bar = render_bar(power)
         expires_text = f"ينتهي في: {seconds_to_human(remaining)}" if remaining and remaining>0 else "منتهي"
 
         text = (
-            f"🤖 *إدارة البوت: {bot[3]}*\n"
+            f"🤖 *إدارة البوت: {bot.name}*\n"
             f"━━━━━━━━━━━━━━\n"
-            f"🆔 ID: `{bot[0]}`\n"
-            f"📡 الحالة: {status_icon} {bot[4]}\n"
+            f"🆔 ID: `{bot.id}`\n"
+            f"📡 الحالة: {status_icon} {bot.status}\n"
             f"⏳ الوقت المتبقي: `{seconds_to_human(remaining)}` - {expires_text}\n"
             f"{time_bar}\n"
             f"⚡ الطاقة المتبقية: `{power}%`\n"
             f"{power_bar}\n"
-            f"📄 الملف: `{bot[6]}`\n"
+            f"📄 الملف: `{bot.main_file}`\n"
             f"━━━━━━━━━━━━━━"
         )
 
         keyboard = []
-        if bot[4] == "stopped":
+        if bot.status == "stopped":
             keyboard.append([InlineKeyboardButton("▶️ تشغيل", callback_data=f"start_{bot_id}")])
         else:
             keyboard.append([InlineKeyboardButton("⏹ إيقاف", callback_data=f"stop_{bot_id}")])
 
         keyboard.extend([
             [InlineKeyboardButton("⏳ Hosting Time", callback_data=f"timepanel_{bot_id}"), InlineKeyboardButton("📂 الملفات", callback_data=f"files_{bot_id}")],
-            [InlineKeyboardButton("📜 السجلات", callback_data=f"logs_{bot_id}"), InlineKeyboardButton("🗑 حذف البوت", callback_data=f"confirm_del_{bot_id}")],
+            [InlineKeyboardButton("📜 السجلات", callback_data=f"logs_{bot_id}"), InlineKeyboardButton("📺 المخرجات المباشرة", callback_data=f"output_{bot_id}")],
+            [InlineKeyboardButton("🗑 حذف البوت", callback_data=f"confirm_del_{bot_id}")],
             [InlineKeyboardButton("🔙 عودة", callback_data="my_bots")]
         ])
 
@@ -257,17 +258,63 @@ class BotHandlers:
         context.user_data['auto_refresh'] = False
         
         bot_id = int(query.data.split("_")[1])
-        logs = self.db.get_bot_logs(bot_id)
+        logs = await self.db.get_bot_logs(bot_id)
         
         text = "📜 *سجل الأخطاء الحقيقية فقط:*\n\n"
         if not logs:
             text += "لا توجد أخطاء برمجية مسجلة حالياً."
-        for err, ts in logs:
-            text += f"⏰ `{ts}`\n❌ `{err[:300]}...`\n\n"
+        for err, ts, count in logs:
+            repeat = f" (×{count})" if count and count > 1 else ""
+            text += f"⏰ `{ts}`{repeat}\n❌ `{err[:300]}...`\n\n"
         
         keyboard = [[InlineKeyboardButton("🔙 عودة", callback_data=f"manage_{bot_id}")]]
         await query.edit_message_text(text, reply_markup=InlineKeyboardMarkup(keyboard), parse_mode="Markdown")
 
+    async def live_output(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        query = update.callback_query
+        await query.answer()
+        context.user_data['menu_token'] = context.user_data.get('menu_token', 0) + 1
+        context.user_data['auto_refresh'] = False
+
+        bot_id = int(query.data.split("_")[1])
+        bot = await self.db.get_bot(bot_id)
+        if not bot:
+            await query.edit_message_text("❌ البوت غير موجود.")
+            return
+
+        def fit(data, limit):
+            # Escaping grows the text; keep dropping the oldest output until it fits
+            raw = data.decode('utf-8', 'replace')
+            body = html.escape(raw, quote=False)
+            while len(body) > limit:
+                raw = raw[len(body) - limit:]
+                body = html.escape(raw, quote=False)
+            return body
+
+        out, err = await self.pm.recent_output(bot, 6000)
+        # Telegram caps a message at 4096 chars; leave room for the header and tags
+        if err is None:
+            body = fit(out, 3500)
+            sections = [f"<pre>{body}</pre>"] if body.strip() else []
+        else:
+            sections = []
+            for title, data in (("stdout", out), ("stderr", err)):
+                body = fit(data, 1700)
+                if body.strip():
+                    sections.append(f"<b>{title}:</b>\n<pre>{body}</pre>")
+
+        text = f"📺 <b>المخرجات المباشرة: {html.escape(bot.name)}</b>\n━━━━━━━━━━━━━━\n"
+        text += "\n".join(sections) if sections else "لا توجد مخرجات بعد."
+
+        keyboard = [
+            [InlineKeyboardButton("🔄 تحديث", callback_data=f"output_{bot_id}")],
+            [InlineKeyboardButton("🔙 عودة", callback_data=f"manage_{bot_id}")]
+        ]
+        try:
+            await query.edit_message_text(text, reply_markup=InlineKeyboardMarkup(keyboard), parse_mode="HTML")
+        except BadRequest as e:
+            if "Message is not modified" not in str(e): raise
+
     async def show_time_panel(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         query = update.callback_query
         await query.answer()
@@ -275,17 +322,17 @@ class BotHandlers:
         context.user_data['auto_refresh'] = False
         
         bot_id = int(query.data.split("_")[1])
-        bot = self.db.get_bot(bot_id)
+        bot = await self.db.get_bot(bot_id)
         if not bot:
             await query.edit_message_text("❌ البوت غير موجود.")
             return
-        remaining = bot[11]
-        total = bot[10]
-        power = bot[13]
-        plan = self.db.get_user_plan(bot[1])
+        remaining = effective_remaining(bot)
+        total = bot.total_seconds
+        power = bot.power_remaining
+        plan = await self.db.get_user_plan(bot.user_id)
 
         text = (
-            f"⏳ *لوحة استضافة الوقت والطاقة: {bot[3]}*\n"
+            f"⏳ *لوحة استضافة الوقت والطاقة: {bot.name}*\n"
             f"━━━━━━━━━━━━━━\n"
             f"💼 الخطة: *{plan}*\n"
             f"⏳ الوقت المستغرق: `{seconds_to_human(total - remaining)}`\n"
@@ -302,7 +349,7 @@ class BotHandlers:
             [InlineKeyboardButton("➕ 24 ساعة", callback_data=f"add_time_{bot_id}_86400"), InlineKeyboardButton("➕ 7 أيام", callback_data=f"add_time_{bot_id}_604800")],
         ]
 
-        if bot[15] == 1 and self.db.can_user_recover(bot[1]):
+        if bot.sleep_mode == 1 and await self.db.can_user_recover(bot.user_id):
             keyboard.append([InlineKeyboardButton("🔧 استعادة (Auto-Recovery)", callback_data=f"recover_{bot_id}")])
 
         keyboard.append([InlineKeyboardButton("🔙 عودة", callback_data=f"manage_{bot_id}")])
@@ -312,55 +359,60 @@ class BotHandlers:
         query = update.callback_query
         await query.answer()
         bot_id = int(query.data.split("_")[1])
-        bot = self.db.get_bot(bot_id)
+        bot = await self.db.get_bot(bot_id)
         if not bot: return
-        if not self.db.can_user_recover(bot[1]):
+        if not await self.db.can_user_recover(bot.user_id):
             await query.edit_message_text("❌ لقد استخدمت استعادة اليوم بالفعل. حاول غداً.")
             return
-        if bot[15] == 0:
+        if bot.sleep_mode == 0:
             await query.edit_message_text("❌ البوت ليس في وضع السكون.")
             return
-        self.db.use_user_recovery(bot[1])
-        self.db.mark_bot_auto_recovery_used(bot_id)
-        self.db.set_bot_time_power(bot_id, total_seconds=3600, power_max=20.0)
-        self.db.update_bot_resources(bot_id, remaining_seconds=3600, power_remaining=20.0, last_checked=datetime.utcnow().isoformat())
-        self.db.set_sleep_mode(bot_id, False)
-        success, msg = await self.pm.start_bot(bot_id, context.application, use_recovery=True)
-        if success:
-            await query.edit_message_text("✅ تم استعادة البوت وتشغيله باستخدام Auto-Recovery المجانية.")
-        else:
-            await query.edit_message_text(f"⚠️ تم استعادة الموارد لكن فشل التشغيل: {msg}")
+        await self.db.use_user_recovery(bot.user_id)
+        await self.db.mark_bot_auto_recovery_used(bot_id)
+        await self.db.set_bot_time_power(bot_id, total_seconds=3600, power_max=20.0)
+        await self.db.update_bot_resources(bot_id, remaining_seconds=3600, power_remaining=20.0, last_checked=datetime.utcnow().isoformat())
+        await self.db.set_sleep_mode(bot_id, False)
+
+        async def report(success, msg):
+            if success:
+                await query.edit_message_text("✅ تم استعادة البوت وتشغيله باستخدام Auto-Recovery المجانية.")
+            else:
+                await query.edit_message_text(f"⚠️ تم استعادة الموارد لكن فشل التشغيل: {msg}")
+
+        await self._start_in_background(context, bot, query, report, use_recovery=True)
 
     async def add_time_action(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         query = update.callback_query
         await query.answer()
         parts = query.data.split("_")
         bot_id = int(parts[2]); seconds = int(parts[3])
-        bot = self.db.get_bot(bot_id)
+        bot = await self.db.get_bot(bot_id)
         if not bot: return
-        user_plan = self.db.get_user_plan(bot[1])
+        user_plan = await self.db.get_user_plan(bot.user_id)
         plan_limits = {'free': 86400, 'pro': 604800, 'ultra': 10**12}
         plan_max = plan_limits.get(user_plan, 86400)
-        current_total = bot[10] or 0
+        current_total = bot.total_seconds or 0
         if current_total + seconds > plan_max:
             await query.answer("⚠️ لا يمكنك تجاوز حد خطتك.")
             return
         added_power = min(100.0, (seconds / plan_max) * 100.0)
         new_total = current_total + seconds
-        new_remaining = (bot[11] or 0) + seconds
-        new_power = min(100.0, (bot[13] or 0) + added_power)
-        self.db.update_bot_resources(bot_id, remaining_seconds=new_remaining, power_remaining=new_power, last_checked=datetime.utcnow().isoformat())
-        import sqlite3
-        with sqlite3.connect(DB_FILE) as conn:
-            conn.execute("UPDATE bots SET total_seconds = ?, warned_low = 0 WHERE id = ?", (new_total, bot_id))
-
-        if bot[15] == 1:
-            self.db.set_sleep_mode(bot_id, False)
-            success, msg = await self.pm.start_bot(bot_id, context.application)
-            if success:
-                await query.edit_message_text("✅ تمت إضافة الوقت بنجاح وتم إيقاظ البوت وتشغيله.")
-            else:
-                await query.edit_message_text(f"✅ تمت إضافة الوقت بنجاح. ولكن: {msg}")
+        new_remaining = effective_remaining(bot) + seconds
+        new_power = min(100.0, (bot.power_remaining or 0) + added_power)
+        await self.db.update_bot_resources(bot_id, remaining_seconds=new_remaining, power_remaining=new_power, last_checked=datetime.utcnow().isoformat())
+        await self.db.set_bot_total_seconds(bot_id, new_total)
+        await self.pm.reschedule(bot_id)
+
+        if bot.sleep_mode == 1:
+            await self.db.set_sleep_mode(bot_id, False)
+
+            async def report(success, msg):
+                if success:
+                    await query.edit_message_text("✅ تمت إضافة الوقت بنجاح وتم إيقاظ البوت وتشغيله.")
+                else:
+                    await query.edit_message_text(f"✅ تمت إضافة الوقت بنجاح. ولكن: {msg}")
+
+            await self._start_in_background(context, bot, query, report)
         else:
             await query.edit_message_text("✅ تمت إضافة الوقت والطاقة بنجاح.")
 
@@ -369,21 +421,20 @@ class BotHandlers:
         await query.answer()
         context.user_data['menu_token'] = context.user_data.get('menu_token', 0) + 1
         context.user_data['auto_refresh'] = False
-        bots = self.db.get_user_bots(update.effective_user.id)
+        bots = await self.db.get_user_bots(update.effective_user.id)
         
         if not bots:
             await query.edit_message_text("📂 لا تملك أي بوتات مستضافة حالياً.", reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("🔙 عودة", callback_data="main_menu")]]))
             return
 
         keyboard = []
-        for bid, name, status, _ in bots:
-            icon = "🟢" if status == "running" else "🔴"
-            bot = self.db.get_bot(bid)
-            remaining = bot[11]
+        for bot in bots:
+            icon = "🟢" if bot.status == "running" else "🔴"
+            remaining = effective_remaining(bot)
             expires = seconds_to_human(remaining) if remaining and remaining>0 else "منتهي"
-            sleep_icon = " 🛌" if bot[15]==1 else ""
-            label = f"{icon} {name}{sleep_icon} — ⏳ {expires} — ⚡ {int(bot[13] or 0)}%"
-            keyboard.append([InlineKeyboardButton(label, callback_data=f"manage_{bid}")])
+            sleep_icon = " 🛌" if bot.sleep_mode==1 else ""
+            label = f"{icon} {bot.name}{sleep_icon} — ⏳ {expires} — ⚡ {int(bot.power_remaining or 0)}%"
+            keyboard.append([InlineKeyboardButton(label, callback_data=f"manage_{bot.id}")])
         
         keyboard.append([InlineKeyboardButton("🔙 عودة", callback_data="main_menu")])
         await query.edit_message_text("📂 *قائمة بوتاتك المستضافة:*", reply_markup=InlineKeyboardMarkup(keyboard), parse_mode="Markdown")
@@ -392,21 +443,17 @@ class BotHandlers:
         query = update.callback_query
         await query.answer()
         
-        if psutil:
-            cpu = psutil.cpu_percent()
-            mem = psutil.virtual_memory().percent
-            usage_text = f"🖥 المعالج: `{cpu}%`\n🧠 الذاكرة: `{mem}%`"
+        host = self.pm.host_stats.snapshot()
+        if host['cpu'] is not None:
+            usage_text = f"🖥 المعالج: `{host['cpu']}%`\n🧠 الذاكرة: `{host['mem']}%`"
         else:
             usage_text = "⚠️ معلومات النظام غير متوفرة."
         
-        running_bots = len(self.db.get_all_running_bots())
-        conn = sqlite3.connect(DB_FILE)
-        c = conn.cursor()
-        c.execute("SELECT count(*) FROM bots")
-        total_bots = c.fetchone()[0]
-        c.execute("SELECT count(*) FROM users")
-        total_users = c.fetchone()[0]
-        conn.close()
+        stats = await self.db.get_system_stats()
+        running_bots = stats.get('bots_running', 0)
+        sleeping_bots = stats.get('bots_sleeping', 0)
+        total_bots = stats.get('bots_total', 0)
+        total_users = stats.get('users_total', 0)
         
         text = (
             f"📊 *إحصائيات النظام الحية*\n"
@@ -415,6 +462,7 @@ class BotHandlers:
             f"👥 المستخدمين: `{total_users}`\n"
             f"🤖 البوتات المستضافة: `{total_bots}`\n"
             f"🚀 البوتات المشغلة حالياً: `{running_bots}`\n"
+            f"🛌 البوتات في وضع السكون: `{sleeping_bots}`\n"
             f"━━━━━━━━━━━━━━"
         )
         await query.edit_message_text(text, reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("🔙 عودة", callback_data="main_menu")]]), parse_mode="Markdown")
@@ -423,21 +471,107 @@ class BotHandlers:
         query = update.callback_query
         await query.answer()
         if update.effective_user.id != ADMIN_ID: return
-        pending = self.db.get_pending_users()
+        pending = await self.db.count_pending_users()
         keyboard = [
-            [InlineKeyboardButton(f"👥 طلبات الانضمام ({len(pending)})", callback_data="pending_users")],
+            [InlineKeyboardButton(f"👥 طلبات الانضمام ({pending})", callback_data="pending_users")],
+            [InlineKeyboardButton("⚙️ العمليات الجماعية", callback_data="bulk_panel")],
             [InlineKeyboardButton("🔙 عودة", callback_data="main_menu")]
         ]
         await query.edit_message_text("👑 *لوحة تحكم المالك*", reply_markup=InlineKeyboardMarkup(keyboard), parse_mode="Markdown")
 
+    def _bulk_text(self, job):
+        if job is None:
+            return "⚙️ <b>العمليات الجماعية</b>\n━━━━━━━━━━━━━━\nلا توجد عملية جارية."
+        names = {'start': 'تشغيل', 'stop': 'إيقاف', 'restart': 'إعادة تشغيل'}
+        elapsed = int((job.finished_at or time.time()) - job.started_at)
+        if job.running:
+            state = "⏳ قيد التنفيذ" + (" (جاري الإلغاء)" if job.cancelled else "")
+        else:
+            state = "🛑 أُلغيت" if job.cancelled else "✅ اكتملت"
+        text = (
+            f"⚙️ <b>عملية جماعية: {names.get(job.action, job.action)}</b>\n"
+            f"━━━━━━━━━━━━━━\n"
+            f"📡 الحالة: {state}\n"
+            f"📊 التقدم: {render_bar(job.percent)} ({job.done}/{job.total})\n"
+            f"✅ نجح: <code>{job.succeeded}</code> | ❌ فشل: <code>{len(job.failed)}</code>\n"
+            f"🔀 التوازي الحالي: <code>{job.concurrency}</code>\n"
+            f"⏱ المدة: {seconds_to_human(elapsed)}"
+        )
+        if job.failed:
+            text += "\n━━━━━━━━━━━━━━\n" + "\n".join(f"• <code>{bot_id}</code>: {html.escape(str(msg))[:80]}" for bot_id, msg in job.failed[-5:])
+        return text
+
+    def _bulk_keyboard(self, job):
+        if job is not None and job.running:
+            keyboard = [[InlineKeyboardButton("🛑 إلغاء العملية", callback_data="bulk_cancel")]]
+        else:
+            keyboard = [
+                [InlineKeyboardButton("▶️ تشغيل كل البوتات المؤهلة", callback_data="bulk_start_all")],
+                [InlineKeyboardButton("♻️ إعادة تشغيل البوتات العاملة", callback_data="bulk_restart_running")],
+                [InlineKeyboardButton(f"♻️ إعادة تشغيل خطة {plan}", callback_data=f"bulk_restart_plan_{plan}") for plan in ('free', 'pro', 'ultra')],
+            ]
+        keyboard.append([InlineKeyboardButton("🔙 عودة", callback_data="admin_panel")])
+        return InlineKeyboardMarkup(keyboard)
+
+    async def bulk_panel(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        query = update.callback_query
+        await query.answer()
+        if update.effective_user.id != ADMIN_ID: return
+        job = self.pm.bulk_job
+        await query.edit_message_text(self._bulk_text(job), reply_markup=self._bulk_keyboard(job), parse_mode="HTML")
+        if job is not None and job.running:
+            context.application.create_task(self._bulk_progress(query, context, job))
+
+    async def bulk_action(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        query = update.callback_query
+        await query.answer()
+        if update.effective_user.id != ADMIN_ID: return
+        action = query.data[len("bulk_"):]
+        if action == "cancel":
+            if self.pm.bulk_job is not None: self.pm.bulk_job.cancel()
+            await query.edit_message_text(self._bulk_text(self.pm.bulk_job), reply_markup=self._bulk_keyboard(self.pm.bulk_job), parse_mode="HTML")
+            return
+        if action == "start_all":
+            job = await self.pm.start_all_eligible(context.application)
+        elif action == "restart_running":
+            job = await self.pm.restart_where(context.application)
+        elif action.startswith("restart_plan_"):
+            job = await self.pm.restart_where(context.application, plan=action[len("restart_plan_"):])
+        else:
+            return
+        if job is None:
+            await query.message.reply_text("⏳ توجد عملية جماعية أخرى قيد التنفيذ.")
+            return
+        await query.edit_message_text(self._bulk_text(job), reply_markup=self._bulk_keyboard(job), parse_mode="HTML")
+        context.application.create_task(self._bulk_progress(query, context, job))
+
+    async def _bulk_progress(self, query, context, job, interval=2):
+        """Keep the panel message current until the job ends or the admin opens another menu."""
+        menu_token = context.user_data.get('menu_token', 0) + 1
+        context.user_data['menu_token'] = menu_token
+        context.user_data['auto_refresh'] = False
+        while job.running:
+            await asyncio.sleep(interval)
+            if context.user_data.get('menu_token') != menu_token: return
+            try:
+                await query.edit_message_text(self._bulk_text(job), reply_markup=self._bulk_keyboard(job), parse_mode="HTML")
+            except BadRequest as e:
+                if "Message is not modified" not in str(e): return
+            except Exception:
+                return
+        if context.user_data.get('menu_token') != menu_token: return
+        try:
+            await query.edit_message_text(self._bulk_text(job), reply_markup=self._bulk_keyboard(job), parse_mode="HTML")
+        except Exception: pass
+
     async def list_pending_users(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         query = update.callback_query
         await query.answer()
-        pending = self.db.get_pending_users()
+        pending = await self.db.get_pending_users()
         if not pending:
             await query.edit_message_text("✅ لا توجد طلبات معلقة.", reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("🔙 عودة", callback_data="admin_panel")]]))
             return
-        keyboard = [[InlineKeyboardButton(f"👤 @{u[1]} ({u[0]})", callback_data=f"viewuser_{u[0]}")] for u in pending]
+        keyboard = [[InlineKeyboardButton(f"👤 @{u.username} ({u.user_id})", callback_data=f"viewuser_{u.user_id}")] for u in pending]
         keyboard.append([InlineKeyboardButton("🔙 عودة", callback_data="admin_panel")])
         await query.edit_message_text("👥 *الطلبات المعلقة:*", reply_markup=InlineKeyboardMarkup(keyboard), parse_mode="Markdown")
 
@@ -450,13 +584,13 @@ class BotHandlers:
             user_id = int(data_parts[1])
             
             if action == "approve":
-                self.db.update_user_status(user_id, 'approved')
+                await self.db.update_user_status(user_id, 'approved')
                 await query.edit_message_text(f"✅ تم قبول المستخدم <code>{user_id}</code> بنجاح.", parse_mode="HTML")
                 try:
                     await context.bot.send_message(chat_id=user_id, text="🎉 <b>تم قبول طلبك بنجاح!</b> يمكنك الآن استخدام البوت عبر /start", parse_mode="HTML")
                 except Exception: pass
             elif action == "reject":
-                self.db.update_user_status(user_id, 'blocked')
+                await self.db.update_user_status(user_id, 'blocked')
                 await query.edit_message_text(f"❌ تم رفض وحظر المستخدم <code>{user_id}</code>.", parse_mode="HTML")
                 try:
                     await context.bot.send_message(chat_id=user_id, text="🚫 نعتذر، تم رفض طلب انضمامك.")
@@ -471,19 +605,19 @@ class BotHandlers:
         context.user_data['auto_refresh'] = False
         
         bot_id = int(query.data.split("_")[1])
-        bot = self.db.get_bot(bot_id)
-        bot_path = os.path.join(BOTS_DIR, bot[5])
+        bot = await self.db.get_bot(bot_id)
+        bot_path = os.path.join(BOTS_DIR, bot.folder)
         files = [f for f in os.listdir(bot_path) if os.path.isfile(os.path.join(bot_path, f))]
         keyboard = [[InlineKeyboardButton(f"📄 {f}", callback_data=f"fview_{bot_id}_{f}")] for f in files]
         keyboard.append([InlineKeyboardButton("🔙 عودة", callback_data=f"manage_{bot_id}")])
-        await query.edit_message_text(f"📁 *ملفات البوت: {bot[3]}*", reply_markup=InlineKeyboardMarkup(keyboard), parse_mode="Markdown")
+        await query.edit_message_text(f"📁 *ملفات البوت: {bot.name}*", reply_markup=InlineKeyboardMarkup(keyboard), parse_mode="Markdown")
 
     async def file_view(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         query = update.callback_query
         await query.answer()
         _, bot_id, filename = query.data.split("_", 2)
-        bot = self.db.get_bot(int(bot_id))
-        file_path = os.path.join(BOTS_DIR, bot[5], filename)
+        bot = await self.db.get_bot(int(bot_id))
+        file_path = os.path.join(BOTS_DIR, bot.folder, filename)
         try:
             with open(file_path, 'r', encoding='utf-8') as f:
                 content = f.read()[:1000]
@@ -496,11 +630,11 @@ class BotHandlers:
         query = update.callback_query
         await query.answer()
         _, bot_id, filename = query.data.split("_", 2)
-        bot = self.db.get_bot(int(bot_id))
-        if filename == bot[6]:
+        bot = await self.db.get_bot(int(bot_id))
+        if filename == bot.main_file:
             await query.message.reply_text("❌ لا يمكن حذف الملف الرئيسي.")
             return
-        os.remove(os.path.join(BOTS_DIR, bot[5], filename))
+        os.remove(os.path.join(BOTS_DIR, bot.folder, filename))
         query.data = f"files_{bot_id}"
         await self.list_files(update, context)
 
@@ -531,7 +665,7 @@ class BotHandlers:
         
         context.user_data['new_bot'] = {'name': doc.file_name, 'folder': folder, 'main_file': doc.file_name}
         if token:
-            self.db.add_bot(update.effective_user.id, token, doc.file_name, folder, doc.file_name)
+            await self.db.add_bot(update.effective_user.id, token, doc.file_name, folder, doc.file_name)
             await update.message.reply_text("✅ تم الكشف عن التوكن وإضافة البوت!")
             return ConversationHandler.END
         else:
@@ -541,7 +675,7 @@ class BotHandlers:
     async def handle_manual_token(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         token = update.message.text
         data = context.user_data['new_bot']
-        self.db.add_bot(update.effective_user.id, token, data['name'], data['folder'], data['main_file'])
+        await self.db.add_bot(update.effective_user.id, token, data['name'], data['folder'], data['main_file'])
         await update.message.reply_text("✅ تمت الإضافة بنجاح!")
         return ConversationHandler.END
 
@@ -560,15 +694,36 @@ class BotHandlers:
 
         folder = f"gh_{user.id}_{int(time.time())}"
         dest = os.path.join(BOTS_DIR, folder)
+        cmd = ["git", "clone", url, dest]
         try:
-            proc = subprocess.run(["git", "clone", url, dest], capture_output=True, text=True, timeout=120)
+            proc = await asyncio.create_subprocess_exec(*cmd, stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.PIPE)
+            try:
+                _, err = await asyncio.wait_for(proc.communicate(), 120)
+            except asyncio.TimeoutError:
+                proc.kill()
+                await proc.wait()
+                raise subprocess.TimeoutExpired(cmd, 120)
             if proc.returncode != 0:
-                await update.message.reply_text(f"❌ فشل الاستنساخ: {proc.stderr[:500]}")
+                await update.message.reply_text(f"❌ فشل الاستنساخ: {err.decode('utf-8', 'replace')[:500]}")
                 return ConversationHandler.END
         except Exception as e:
             await update.message.reply_text(f"❌ خطأ: {e}")
             return ConversationHandler.END
 
+        found, token, req_found = await asyncio.get_running_loop().run_in_executor(None, self._inspect_repo, dest)
+        context.user_data['gh_deploy'] = {'folder': folder, 'path': dest, 'main_file': found, 'token': token, 'has_reqs': req_found}
+
+        text = f"🔎 تم استنساخ المستودع. ملف التشغيل: `{found or 'غير موجود'}`\n"
+        if req_found: text += "🔧 يوجد ملف requirements.txt\n"
+        text += "✅ تم اكتشاف توكن\n" if token else "⚠️ لم يتم اكتشاف توكن تلقائياً.\n"
+        
+        keyboard = [[InlineKeyboardButton("✅ نشر", callback_data="gh_confirm")], [InlineKeyboardButton("❌ إلغاء", callback_data="gh_cancel")]]
+        await update.message.reply_text(text, reply_markup=InlineKeyboardMarkup(keyboard), parse_mode="Markdown")
+        return WAIT_DEPLOY_CONFIRM
+
+    @staticmethod
+    def _inspect_repo(dest):
+        """(entry file, token found in the sources, has requirements.txt) of a cloned repo."""
         found = None
         for c in ['main.py', 'bot.py', 'app.py']:
             for root, dirs, files in os.walk(dest):
@@ -589,15 +744,7 @@ class BotHandlers:
             if token: break
 
         req_found = any('requirements.txt' in files for root, dirs, files in os.walk(dest))
-        context.user_data['gh_deploy'] = {'folder': folder, 'path': dest, 'main_file': found, 'token': token, 'has_reqs': req_found}
-
-        text = f"🔎 تم استنساخ المستودع. ملف التشغيل: `{found or 'غير موجود'}`\n"
-        if req_found: text += "🔧 يوجد ملف requirements.txt\n"
-        text += "✅ تم اكتشاف توكن\n" if token else "⚠️ لم يتم اكتشاف توكن تلقائياً.\n"
-        
-        keyboard = [[InlineKeyboardButton("✅ نشر", callback_data="gh_confirm")], [InlineKeyboardButton("❌ إلغاء", callback_data="gh_cancel")]]
-        await update.message.reply_text(text, reply_markup=InlineKeyboardMarkup(keyboard), parse_mode="Markdown")
-        return WAIT_DEPLOY_CONFIRM
+        return found, token, req_found
 
     async def handle_gh_confirm(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         query = update.callback_query
@@ -605,7 +752,7 @@ class BotHandlers:
         data = context.user_data.get('gh_deploy')
         if not data: return ConversationHandler.END
         folder, main_file, token = data['folder'], data['main_file'] or 'main.py', data['token']
-        bot_id = self.db.add_bot(update.effective_user.id, token, os.path.basename(folder), folder, main_file)
+        bot_id = await self.db.add_bot(update.effective_user.id, token, os.path.basename(folder), folder, main_file)
         await query.edit_message_text(f"✅ تم نشر المستودع بنجاح. ID: {bot_id}")
         return ConversationHandler.END
 
@@ -613,7 +760,7 @@ class BotHandlers:
         query = update.callback_query
         await query.answer()
         data = context.user_data.get('gh_deploy')
-        if data: shutil.rmtree(data['path'], ignore_errors=True)
+        if data: await asyncio.get_running_loop().run_in_executor(None, functools.partial(shutil.rmtree, data['path'], ignore_errors=True))
         await query.edit_message_text("❌ تم إلغاء النشر.")
         return ConversationHandler.END
 
@@ -621,15 +768,46 @@ class BotHandlers:
         query = update.callback_query
         await query.answer()
         bot_id = int(query.data.split("_")[1])
-        success, msg = await self.pm.start_bot(bot_id, context.application)
-        await query.message.reply_text(msg)
+        bot = await self.db.get_bot(bot_id)
+        if not bot:
+            await query.message.reply_text("❌ البوت غير موجود.")
+            return
+        await self._start_in_background(context, bot, query, lambda success, msg: query.message.reply_text(msg))
+
+    async def _start_in_background(self, context, bot, query, report, **kwargs):
+        """Start the bot as an application task and pass the result to `await report(success, msg)`.
+
+        Building the bot's environment can take minutes, and updates are
+        handled one at a time, so the handler must not wait for it.
+        """
+        if not self.pm.envs.is_ready(os.path.join(BOTS_DIR, bot.folder)):
+            await query.message.reply_text("⏳ جاري تجهيز بيئة البوت وتثبيت المتطلبات، سيبدأ التشغيل بعد اكتمالها...")
+
+        async def run():
+            try:
+                success, msg = await self.pm.start_bot(bot.id, context.application, **kwargs)
+            except Exception as e:
+                logger.exception("Failed to start bot %s: %s", bot.id, e)
+                success, msg = False, str(e)
+            try:
+                await report(success, msg)
+            except Exception as e:
+                logger.warning("Could not report the start of bot %s: %s", bot.id, e)
+
+        context.application.create_task(run())
 
     async def stop_bot_action(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         query = update.callback_query
         await query.answer()
         bot_id = int(query.data.split("_")[1])
-        self.pm.stop_bot(bot_id)
-        await query.message.reply_text("🛑 تم الإيقاف.")
+        # A bot that ignores SIGTERM takes BOT_STOP_TIMEOUT to stop; do not hold up other updates
+        pending = await query.message.reply_text("⏳ جاري الإيقاف...")
+
+        async def stop():
+            await self.pm.stop_bot(bot_id)
+            await pending.edit_text("🛑 تم الإيقاف.")
+
+        self._in_background(context, stop(), f"stop of bot {bot_id}")
 
     async def confirm_delete(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         query = update.callback_query
@@ -644,9 +822,28 @@ class BotHandlers:
         query = update.callback_query
         await query.answer()
         bot_id = int(query.data.split("_")[1])
-        bot = self.db.get_bot(bot_id)
-        self.pm.stop_bot(bot_id)
-        if bot: shutil.rmtree(os.path.join(BOTS_DIR, bot[5]), ignore_errors=True)
-        self.db.delete_bot(bot_id)
-        await query.message.reply_text("🗑 تم الحذف.")
-        await self.my_bots(update, context)
+        bot = await self.db.get_bot(bot_id)
+        await query.edit_message_text("⏳ جاري حذف البوت...")
+
+        async def delete():
+            await self.pm.stop_bot(bot_id)
+            if self.pm.output is not None:
+                self.pm.output.forget(bot_id)
+            if bot:
+                # A large bot folder would otherwise stall every other update while it is removed
+                await asyncio.get_running_loop().run_in_executor(None, functools.partial(shutil.rmtree, os.path.join(BOTS_DIR, bot.folder), ignore_errors=True))
+            await self.db.delete_bot(bot_id)
+            await query.message.reply_text("🗑 تم الحذف.")
+            await self.my_bots(update, context)
+
+        self._in_background(context, delete(), f"deletion of bot {bot_id}")
+
+    @staticmethod
+    def _in_background(context, coro, what):
+        """Run `coro` as an application task so the update handler returns at once."""
+        async def run():
+            try:
+                await coro
+            except Exception as e:
+                logger.warning("Background %s failed: %s", what, e)
+        context.application.create_task(run())
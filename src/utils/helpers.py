@@ -1,4 +1,9 @@
+import os
+import re
+import time
+import hashlib
 import logging
+from datetime import datetime, timezone
 
 logger = logging.getLogger(__name__)
 
@@ -19,6 +24,28 @@ def seconds_to_human(s):
     return ' '.join(parts)
 
 
+def utc_timestamp(value):
+    """Epoch seconds for a naive UTC timestamp as stored in the DB, or None."""
+    try:
+        return datetime.fromisoformat(value).replace(tzinfo=timezone.utc).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+def effective_remaining(bot, now=None):
+    """Hosting seconds `bot` has left right now.
+
+    While a bot runs, `remaining_seconds` is a checkpoint taken at
+    `last_checked`, so the time since then is subtracted here instead of being
+    written back periodically.
+    """
+    remaining = int(bot.remaining_seconds or 0)
+    if bot.status != 'running': return remaining
+    since = utc_timestamp(bot.last_checked)
+    if since is None: return remaining
+    now = time.time() if now is None else now
+    return max(0, int(remaining - max(0.0, now - since)))
+
+
 def render_bar(percent, length=12):
     try:
         p = max(0, min(100, int(float(percent))))
@@ -27,3 +54,26 @@ def render_bar(percent, length=12):
         p = 0
     full = int((p / 100.0) * length)
     return '█' * full + '░' * (length - full) + f" {p}%"
+
+
+# Parts of an error message that change between otherwise identical failures:
+# memory addresses, UUIDs and any run of digits (line numbers, ids, timestamps).
+_ERROR_VOLATILE_RE = re.compile(r"0x[0-9a-fA-F]+|[0-9a-fA-F]{8}-(?:[0-9a-fA-F]{4}-){3}[0-9a-fA-F]{12}|\d+")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+def normalize_error_text(text):
+    return _WHITESPACE_RE.sub(' ', _ERROR_VOLATILE_RE.sub('#', text or '')).strip()
+
+def error_fingerprint(text):
+    return hashlib.sha1(normalize_error_text(text).encode('utf-8', 'replace')).hexdigest()[:16]
+
+def read_file_tail(path, nbytes):
+    """Last `nbytes` of a file (b'' if it does not exist)."""
+    try:
+        with open(path, 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            size = f.tell()
+            f.seek(max(0, size - nbytes))
+            return f.read()
+    except OSError:
+        return b''
@@ -0,0 +1,43 @@
+"""Query-plan regression tests: the hot read paths must stay on their indexes."""
+import pytest
+
+from src.database.db_manager import Database
+
+@pytest.fixture
+def db(tmp_path):
+    # One pooled connection, so the trace callback sees every statement
+    database = Database(str(tmp_path / "plans.db"), pool_size=1)
+    yield database
+    database.close()
+
+def query_plan(db, call):
+    """EXPLAIN QUERY PLAN details of every SELECT that `call()` runs."""
+    statements = []
+    with db.connection() as conn:
+        conn.set_trace_callback(statements.append)
+    try:
+        call()
+    finally:
+        with db.connection() as conn:
+            conn.set_trace_callback(None)
+    selects = [sql for sql in statements if sql.lstrip().upper().startswith("SELECT")]
+    assert selects, "no SELECT was executed"
+    with db.connection() as conn:
+        return [row[3] for sql in selects for row in conn.execute("EXPLAIN QUERY PLAN " + sql)]
+
+def test_running_bots_use_partial_index(db):
+    plan = query_plan(db, db.get_all_running_bots)
+    assert any("USING INDEX idx_bots_running" in step for step in plan), plan
+
+def test_user_bots_use_user_index(db):
+    plan = query_plan(db, lambda: db.get_user_bots(42))
+    assert any("USING INDEX idx_bots_user_id (user_id=?)" in step for step in plan), plan
+
+def test_pending_users_use_status_index(db):
+    plan = query_plan(db, db.get_pending_users)
+    assert any("USING INDEX idx_users_status (status=?)" in step for step in plan), plan
+
+def test_bot_logs_use_covering_index_without_sort(db):
+    plan = query_plan(db, lambda: db.get_bot_logs(7))
+    assert any("USING COVERING INDEX idx_error_logs_recent (bot_id=?)" in step for step in plan), plan
+    assert not any("TEMP B-TREE" in step for step in plan), plan
@@ -0,0 +1,82 @@
+"""Reads must see buffered bot resources while a flush is writing them."""
+import threading
+from contextlib import contextmanager
+
+import pytest
+
+from src.database.db_manager import Database
+from src.database.models import BotRecord
+
+class _GatedConnection:
+    """Proxy that parks executemany() before the surrounding transaction commits."""
+
+    def __init__(self, conn, in_flight, release):
+        self._conn = conn
+        self._in_flight = in_flight
+        self._release = release
+
+    def executemany(self, *args):
+        cursor = self._conn.executemany(*args)
+        self._in_flight.set()
+        assert self._release.wait(5)
+        return cursor
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+@pytest.fixture
+def db(tmp_path):
+    database = Database(str(tmp_path / "buffer.db"), pool_size=3)
+    yield database
+    database.close()
+
+def _flush_in_background(db):
+    """Start a flush that stops between its UPDATE and the commit; returns (thread, release)."""
+    in_flight, release = threading.Event(), threading.Event()
+    plain = db.connection
+
+    @contextmanager
+    def gated():
+        with plain() as conn:
+            yield _GatedConnection(conn, in_flight, release)
+
+    db.connection = gated
+    flusher = threading.Thread(target=db.flush_bot_resources)
+    flusher.start()
+    assert in_flight.wait(5)
+    db.connection = plain
+    return flusher, release
+
+def test_read_during_flush_sees_buffered_values(db):
+    bot_id = db.add_bot(1, "t", "b", "b")
+    assert db.get_bot(bot_id).power_remaining == 30.0
+    db.buffer_bot_resources(bot_id, power_remaining=5.0)
+    db._bot_cache.invalidate(bot_id)  # force the read below to hit the DB
+
+    flusher, release = _flush_in_background(db)
+    try:
+        # Runs on another pooled connection, before the batch is committed
+        assert db.get_bot(bot_id).power_remaining == 5.0
+        assert [b.power_remaining for b in db.get_user_bots(1)] == [5.0]
+    finally:
+        release.set()
+        flusher.join()
+
+    assert db.get_bot(bot_id).power_remaining == 5.0
+    db._bot_cache.invalidate(bot_id)
+    assert db.get_bot(bot_id).power_remaining == 5.0
+
+def test_row_read_before_flush_commit_is_not_cached(db):
+    bot_id = db.add_bot(1, "t", "b", "b")
+    db.buffer_bot_resources(bot_id, power_remaining=5.0)
+    db._bot_cache.invalidate(bot_id)
+    version = db._bot_cache.version(bot_id)
+    with db.connection() as conn:
+        stale = db._fetch(conn, BotRecord, f"SELECT {BotRecord.select_list()} FROM bots WHERE id = ?", (bot_id,), one=True)
+    assert stale.power_remaining == 30.0
+
+    db.flush_bot_resources()
+    # A reader that took its version before the commit must not cache what it read
+    db._bot_cache.put(bot_id, stale, version)
+    assert db._bot_cache.get(bot_id, count_miss=False) is None
+    assert db.get_bot(bot_id).power_remaining == 5.0